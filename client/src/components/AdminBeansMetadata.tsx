@@ -657,7 +657,7 @@ const AdminBeansMetadata: React.FC = () => {
             width: 'w-1/6',
             render: (_, row) => (
                 <img
-                    src={row.src}
+                    src={row.thumbnail || row.src}
                     alt={`Bean submitted by ${row.userName}`}
                     className="h-16 w-16 object-cover rounded-md border border-gray-200 cursor-pointer"
                     onClick={() => handleImageClick(row)}
@@ -17,6 +17,7 @@ interface BeanDetection {
 
 type PredictedImage = {
     src: string;
+    thumbnail?: string;
     is_validated?: boolean;
     predictions: BeanDetection[] | {
         area: number;
@@ -36,6 +37,7 @@ type PredictedImage = {
 type AdminImage = {
     id: string;
     src: string;
+    thumbnail?: string;
     bean_type?: string; // For single bean predictions (legacy)
     is_validated: boolean;
     location: string;
@@ -455,7 +457,7 @@ const GalleryComponent: React.FC<GalleryComponentProps> = ({
                         {viewMode === 'grid' ? (
                             <div className="grid gap-3 grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 auto-rows-max">
                                 {(currentFolderImages.length > 0 ? currentFolderImages : images).map((image, idx) => {
-                                    const src = typeof image === 'string' ? image : image.src;
+                                    const src = typeof image === 'string' ? image : image.thumbnail || image.src;
                                     const isClickable = type !== 'simple';
                                     
                                     return (
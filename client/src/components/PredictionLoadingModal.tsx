@@ -2,9 +2,10 @@ import React from 'react';
 
 interface PredictionLoadingModalProps {
   isOpen: boolean;
+  progress?: { done: number; total: number } | null;
 }
 
-const PredictionLoadingModal: React.FC<PredictionLoadingModalProps> = ({ isOpen }) => {
+const PredictionLoadingModal: React.FC<PredictionLoadingModalProps> = ({ isOpen, progress }) => {
   if (!isOpen) return null;
 
   return (
@@ -20,6 +21,11 @@ const PredictionLoadingModal: React.FC<PredictionLoadingModalProps> = ({ isOpen
           <p className="text-gray-600 text-sm">
             Analyzing coffee beans and extracting features...
           </p>
+          {progress && progress.total > 1 && (
+            <p className="text-gray-600 text-sm mt-2">
+              {progress.done} of {progress.total} images processed
+            </p>
+          )}
         </div>
       </div>
     </div>
@@ -9,8 +9,9 @@ export interface TableColumn {
 
 export interface PaginationProps {
   currentPage: number;
-  totalPages: number;
-  totalItems: number;
+  // Unknown for keyset-paginated lists, which only know whether there is a next page
+  totalPages?: number;
+  totalItems?: number;
   itemsPerPage: number;
   hasNext?: boolean;
   hasPrevious?: boolean;
@@ -42,7 +43,9 @@ const PaginationControls = memo(({ pagination }: { pagination: PaginationProps }
   return (
     <div className="flex items-center justify-between py-3 px-4 bg-gray-50 border-b border-gray-200">
       <div className="text-sm text-gray-700 font-accent">
-        Showing page {currentPage} of {totalPages} ({totalItems} total items)
+        Showing page {currentPage}
+        {totalPages !== undefined && ` of ${totalPages}`}
+        {totalItems !== undefined && ` (${totalItems} total items)`}
       </div>
       <div className="flex gap-2">
         <button
@@ -54,7 +57,7 @@ const PaginationControls = memo(({ pagination }: { pagination: PaginationProps }
         </button>
         <button
           onClick={handleNextClick}
-          disabled={!hasNext && currentPage === totalPages}
+          disabled={hasNext === undefined ? currentPage === totalPages : !hasNext}
           className="button-accent px-3 py-1 text-sm border border-gray-300 rounded-lg font-accent disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-100 transition-colors"
         >
           Next
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, ScatterChart, Scatter, LineChart, Line } from 'recharts';
 import StatCard from '@/components/StatCard';
+import type { BoxplotStats } from '@/interfaces/global';
 
 interface FeatureStats {
   [featureName: string]: {
@@ -10,9 +11,9 @@ interface FeatureStats {
   };
 }
 
-interface BoxplotFeatures {
+interface BoxplotSummary {
   [featureName: string]: {
-    [farmName: string]: number[];
+    [farmName: string]: BoxplotStats;
   };
 }
 
@@ -22,7 +23,7 @@ interface BeanAnalyticsChartProps {
   minConfidence: number;
   maxConfidence: number;
   featureStats: FeatureStats;
-  boxplotFeatures?: BoxplotFeatures;
+  boxplotSummary?: BoxplotSummary;
 }
 
 const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
@@ -31,7 +32,7 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
   minConfidence,
   maxConfidence,
   featureStats,
-  boxplotFeatures
+  boxplotSummary
 }) => {
   const [selectedFeature, setSelectedFeature] = useState<string>('area');
   const [selectedFarm, setSelectedFarm] = useState<string>('all');
@@ -92,36 +93,22 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
 
   const statistics = getStatistics();
 
-  // Create histogram data for selected farm and feature
+  // Five-number summary of the selected farm and feature (from the server's boxplot_summary)
   const getDistributionData = () => {
-    if (selectedFarm === 'all' || !boxplotFeatures || !boxplotFeatures[selectedFeature] || !boxplotFeatures[selectedFeature][selectedFarm]) {
+    if (selectedFarm === 'all' || !boxplotSummary || !boxplotSummary[selectedFeature] || !boxplotSummary[selectedFeature][selectedFarm]) {
       return [];
     }
 
-    const values = boxplotFeatures[selectedFeature][selectedFarm];
-    
-    if (!values || values.length === 0) return [];
-
-    // Determine bin size based on the range of values
-    const min = Math.min(...values);
-    const max = Math.max(...values);
-    const range = max - min;
-    
-    // Create approximately 20-30 bins
-    const numBins = Math.min(30, Math.max(10, Math.ceil(range / 10)));
-    const binSize = range / numBins;
+    const stats = boxplotSummary[selectedFeature][selectedFarm];
+    if (!stats.count) return [];
 
-    // Create bins
-    const bins: { [key: string]: number } = {};
-    values.forEach(value => {
-      const binKey = (Math.floor(value / binSize) * binSize).toFixed(2);
-      bins[binKey] = (bins[binKey] || 0) + 1;
-    });
-
-    // Convert to array format for Recharts
-    return Object.entries(bins)
-      .map(([value, count]) => ({ value: parseFloat(value), count }))
-      .sort((a, b) => a.value - b.value);
+    return [
+      { label: 'Min', value: stats.min },
+      { label: 'Q1', value: stats.q1 },
+      { label: 'Median', value: stats.median },
+      { label: 'Q3', value: stats.q3 },
+      { label: 'Max', value: stats.max },
+    ];
   };
 
   const distributionData = getDistributionData();
@@ -357,9 +344,9 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
                   >
                     <CartesianGrid strokeDasharray="3 3" stroke="#f0f0f0" />
                     <XAxis
-                      dataKey="value"
+                      dataKey="label"
                       label={{ 
-                        value: `${displayNames[selectedFeature]} Value`, 
+                        value: 'Statistic', 
                         position: 'insideBottom', 
                         offset: -10,
                         style: { fontWeight: 600 }
@@ -369,7 +356,7 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
                     />
                     <YAxis
                       label={{ 
-                        value: 'Count', 
+                        value: `${displayNames[selectedFeature]} Value`, 
                         angle: -90, 
                         position: 'insideLeft',
                         style: { fontWeight: 600 }
@@ -385,10 +372,9 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
                         fontSize: '14px',
                         fontWeight: 500
                       }}
-                      formatter={(value: number) => [value, 'Count']}
-                      labelFormatter={(label: number) => `Value: ${label.toFixed(2)}`}
+                      formatter={(value: number) => [value.toFixed(2), displayNames[selectedFeature]]}
                     />
-                    <Bar dataKey="count" fill="var(--arabica-brown)" radius={[4, 4, 0, 0]} />
+                    <Bar dataKey="value" fill="var(--arabica-brown)" radius={[4, 4, 0, 0]} />
                   </BarChart>
                 </ResponsiveContainer>
               ) : (
@@ -399,7 +385,7 @@ const BeanAnalyticsChart: React.FC<BeanAnalyticsChartProps> = ({
                     </svg>
                     <p className="text-gray-600 font-medium mb-2">No Distribution Data Available</p>
                     <p className="text-sm text-gray-500">
-                      No raw data available for this farm and feature combination.
+                      No beans measured for this farm and feature combination.
                     </p>
                   </div>
                 </div>
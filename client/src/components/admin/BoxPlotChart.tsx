@@ -1,10 +1,11 @@
 import React, { useMemo, useState } from 'react';
 import { ResponsiveBoxPlot } from '@nivo/boxplot';
+import type { AdminStats, BoxplotStats } from '@/interfaces/global';
 
 interface BoxPlotData {
   group: string;
-  farms: string[];
-  data: Array<{ farm: string; value: number }>;
+  overall: BoxplotStats;
+  farms: { [farm: string]: BoxplotStats };
 }
 
 interface BoxPlotChartProps {
@@ -13,7 +14,6 @@ interface BoxPlotChartProps {
 }
 
 interface ProcessedBoxData {
-  group: string;
   mu: number;
   sd: number;
   n: number;
@@ -23,148 +23,71 @@ interface ProcessedBoxData {
   median: number;
   q3: number;
   outliers: number[];
+  outlierCount: number;
   lowerBound: number;
   upperBound: number;
 }
 
-interface FarmProcessedData {
+interface FarmProcessedData extends ProcessedBoxData {
   farm: string;
-  mu: number;
-  sd: number;
-  n: number;
-  min: number;
-  max: number;
-  q1: number;
-  median: number;
-  q3: number;
-  outliers: number[];
-  lowerBound: number;
-  upperBound: number;
 }
 
-const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value' }) => {
-  const [selectedFeature, setSelectedFeature] = useState<string>(data[0]?.group || '');
-
-  // Calculate statistics for all features (overall)
-  const allProcessedData = useMemo(() => {
-    return data.map(item => {
-      // Get all values across all farms for overall statistics
-      const allValues = item.data.map(d => d.value);
-      const sorted = [...allValues].sort((a, b) => a - b);
-      const n = sorted.length;
-      
-      if (n === 0) {
-        return null;
-      }
-      
-      // Calculate quartiles
-      const q1Index = Math.floor(n * 0.25);
-      const medianIndex = Math.floor(n * 0.5);
-      const q3Index = Math.floor(n * 0.75);
-      
-      const q1 = sorted[q1Index];
-      const median = sorted[medianIndex];
-      const q3 = sorted[q3Index];
-      
-      // Calculate IQR and outlier boundaries
-      const iqr = q3 - q1;
-      const lowerBound = q1 - 1.5 * iqr;
-      const upperBound = q3 + 1.5 * iqr;
-      
-      // Find outliers
-      const outliers = sorted.filter(val => val < lowerBound || val > upperBound);
-      
-      // Calculate mean and standard deviation
-      const mean = sorted.reduce((sum, val) => sum + val, 0) / n;
-      const variance = sorted.reduce((sum, val) => sum + Math.pow(val - mean, 2), 0) / n;
-      const sd = Math.sqrt(variance);
-      
-      return {
-        group: item.group,
-        mu: mean,
-        sd: sd,
-        n: n,
-        min: sorted[0],
-        max: sorted[sorted.length - 1],
-        q1: q1,
-        median: median,
-        q3: q3,
-        outliers: outliers,
-        lowerBound: lowerBound,
-        upperBound: upperBound
-      };
-    }).filter((item): item is ProcessedBoxData => item !== null);
-  }, [data]);
-
-  // Calculate statistics per farm for the selected feature
-  const farmProcessedData = useMemo(() => {
-    const selectedFeatureData = data.find(item => item.group === selectedFeature);
-    if (!selectedFeatureData) return [];
-
-    // Group data by farm
-    const farmGroups: { [farm: string]: number[] } = {};
-    selectedFeatureData.data.forEach(({ farm, value }) => {
-      if (!farmGroups[farm]) {
-        farmGroups[farm] = [];
-      }
-      farmGroups[farm].push(value);
-    });
-
-    // Calculate statistics for each farm
-    return Object.entries(farmGroups).map(([farm, values]) => {
-      const sorted = [...values].sort((a, b) => a - b);
-      const n = sorted.length;
-
-      if (n === 0) return null;
-
-      const q1Index = Math.floor(n * 0.25);
-      const medianIndex = Math.floor(n * 0.5);
-      const q3Index = Math.floor(n * 0.75);
-
-      const q1 = sorted[q1Index];
-      const median = sorted[medianIndex];
-      const q3 = sorted[q3Index];
-
-      const iqr = q3 - q1;
-      const lowerBound = q1 - 1.5 * iqr;
-      const upperBound = q3 + 1.5 * iqr;
+// The dashboard's boxplot_summary / boxplot_overall, one entry per feature
+export const toBoxPlotData = (stats: AdminStats): BoxPlotData[] => {
+  if (!stats.boxplot_summary || !stats.boxplot_overall) return [];
+  return Object.keys(stats.boxplot_overall).map(featureName => ({
+    group: featureName.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase()),
+    overall: stats.boxplot_overall[featureName],
+    farms: stats.boxplot_summary[featureName] || {}
+  }));
+};
 
-      const outliers = sorted.filter(val => val < lowerBound || val > upperBound);
+const processStats = (stats: BoxplotStats): ProcessedBoxData => {
+  const iqr = stats.q3 - stats.q1;
+  return {
+    mu: stats.mean,
+    sd: stats.sd,
+    n: stats.count,
+    min: stats.min,
+    max: stats.max,
+    q1: stats.q1,
+    median: stats.median,
+    q3: stats.q3,
+    outliers: stats.outliers,
+    outlierCount: stats.outlier_count,
+    lowerBound: stats.q1 - 1.5 * iqr,
+    upperBound: stats.q3 + 1.5 * iqr
+  };
+};
 
-      const mean = sorted.reduce((sum, val) => sum + val, 0) / n;
-      const variance = sorted.reduce((sum, val) => sum + Math.pow(val - mean, 2), 0) / n;
-      const sd = Math.sqrt(variance);
+// Nivo computes the boxes from raw points; five points at the whiskers and
+// quartiles reproduce the server's summary exactly with quantiles 0/.25/.5/.75/1
+const NIVO_QUANTILES: [number, number, number, number, number] = [0, 0.25, 0.5, 0.75, 1];
 
-      return {
-        farm,
-        mu: mean,
-        sd: sd,
-        n: n,
-        min: sorted[0],
-        max: sorted[sorted.length - 1],
-        q1: q1,
-        median: median,
-        q3: q3,
-        outliers: outliers,
-        lowerBound: lowerBound,
-        upperBound: upperBound
-      };
-    }).filter((item): item is FarmProcessedData => item !== null);
-  }, [data, selectedFeature]);
+const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value' }) => {
+  const [selectedFeature, setSelectedFeature] = useState<string>(data[0]?.group || '');
 
-  const selectedData = allProcessedData.find(item => item.group === selectedFeature);
   const selectedFeatureData = data.find(item => item.group === selectedFeature);
+  const selectedData = selectedFeatureData ? processStats(selectedFeatureData.overall) : undefined;
 
-  const nivoData = useMemo(() => {
-    if (!selectedFeatureData || !selectedData) return [];
-    
-    const formattedData = selectedFeatureData.data.map(({ farm, value }) => ({
-      group: farm,
-      value: value
+  // Statistics per farm for the selected feature
+  const farmProcessedData = useMemo((): FarmProcessedData[] => {
+    if (!selectedFeatureData) return [];
+    return Object.entries(selectedFeatureData.farms).map(([farm, stats]) => ({
+      farm,
+      ...processStats(stats)
     }));
-    
-    return formattedData;
-  }, [selectedFeature, selectedFeatureData, selectedData]);
+  }, [selectedFeatureData]);
+
+  const nivoData = useMemo(() => {
+    if (!selectedFeatureData) return [];
+    return Object.entries(selectedFeatureData.farms).flatMap(([farm, stats]) =>
+      [stats.whisker_low, stats.q1, stats.median, stats.q3, stats.whisker_high].map(value => ({
+        group: farm,
+        value
+      }))
+    );
+  }, [selectedFeatureData]);
 
   if (!data || data.length === 0) {
     return (
@@ -229,15 +152,15 @@ const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value'
           <div className="text-[10px] text-gray-500">All farms combined</div>
         </div>
         <div className={`rounded px-3 py-2 border ${
-          selectedData.outliers.length > 0 
+          selectedData.outlierCount > 0 
             ? 'bg-red-50 border-red-200' 
             : 'bg-gray-50 border-gray-200'
         }`}>
           <div className="text-gray-600 font-medium">Total Outliers</div>
           <div className={`text-lg font-bold ${
-            selectedData.outliers.length > 0 ? 'text-red-700' : 'text-gray-700'
+            selectedData.outlierCount > 0 ? 'text-red-700' : 'text-gray-700'
           }`}>
-            {selectedData.outliers.length}
+            {selectedData.outlierCount}
           </div>
           <div className="text-[10px] text-gray-500">All farms combined</div>
         </div>
@@ -248,6 +171,7 @@ const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value'
         <ResponsiveBoxPlot
           data={nivoData}
           margin={{ top: 40, right: 60, bottom: 100, left: 80 }}
+          quantiles={NIVO_QUANTILES}
           minValue="auto"
           maxValue="auto"
           padding={0.12}
@@ -343,10 +267,10 @@ const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value'
                       <span className="text-gray-600">Std Dev:</span>
                       <span className="font-medium">{farmData.sd.toFixed(2)}</span>
                     </div>
-                    {farmData.outliers.length > 0 && (
+                    {farmData.outlierCount > 0 && (
                       <div className="flex justify-between gap-4 text-red-600 mt-1">
                         <span>Outliers:</span>
-                        <span className="font-bold">{farmData.outliers.length}</span>
+                        <span className="font-bold">{farmData.outlierCount}</span>
                       </div>
                     )}
                   </div>
@@ -404,16 +328,16 @@ const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value'
             </div>
             <div className="flex justify-between border-t border-gray-300 pt-1">
               <span className="text-gray-600">Total Outliers:</span>
-              <span className={`font-bold ${selectedData.outliers.length > 0 ? 'text-red-600' : 'text-green-600'}`}>
-                {selectedData.outliers.length}
+              <span className={`font-bold ${selectedData.outlierCount > 0 ? 'text-red-600' : 'text-green-600'}`}>
+                {selectedData.outlierCount}
               </span>
             </div>
-            {selectedData.outliers.length > 0 && (
+            {selectedData.outlierCount > 0 && (
               <>
                 <div className="flex justify-between text-red-600">
                   <span>Outlier %:</span>
                   <span className="font-medium">
-                    {((selectedData.outliers.length / selectedData.n) * 100).toFixed(1)}%
+                    {((selectedData.outlierCount / selectedData.n) * 100).toFixed(1)}%
                   </span>
                 </div>
                 <div className="mt-2 pt-2 border-t border-gray-300">
@@ -422,9 +346,9 @@ const BoxPlotChart: React.FC<BoxPlotChartProps> = ({ data, yAxisLabel = 'Value'
                     {selectedData.outliers.slice(0, 10).map((val, idx) => (
                       <div key={idx}>{val.toFixed(2)}</div>
                     ))}
-                    {selectedData.outliers.length > 10 && (
+                    {selectedData.outlierCount > 10 && (
                       <div className="text-gray-500 italic">
-                        ... and {selectedData.outliers.length - 10} more
+                        ... and {selectedData.outlierCount - 10} more
                       </div>
                     )}
                   </div>
@@ -107,6 +107,22 @@ export interface UserActivity {
   total: number;
 }
 
+// Five-number summary of one feature, computed by the server
+export interface BoxplotStats {
+  count: number;
+  min: number;
+  q1: number;
+  median: number;
+  q3: number;
+  max: number;
+  mean: number;
+  sd: number;
+  whisker_low: number;
+  whisker_high: number;
+  outlier_count: number;
+  outliers: number[]; // capped sample, farthest from the median first
+}
+
 export interface AdminStats {
   users: number;
   validated: number;
@@ -140,11 +156,14 @@ export interface AdminStats {
       mode: Array<{ farm: string; value: number }>;
     };
   };
-  boxplot_features: {
+  boxplot_summary: {
     [featureName: string]: {
-      [farmName: string]: number[];
+      [farmName: string]: BoxplotStats;
     };
   };
+  boxplot_overall: {
+    [featureName: string]: BoxplotStats;
+  };
   shape_size_distribution: {
     [farmName: string]: Array<{
       size: string;
@@ -183,6 +202,7 @@ export interface UserManagementUser {
   last_login: string,
   username: string,
   role: 'farmer' | 'researcher' | 'admin',
+  roles?: ('farmer' | 'researcher' | 'admin')[],
   location__name: string,
   location_id: string,
   email: string,
@@ -220,6 +240,8 @@ export interface BeanDetection {
 export interface AdminPredictedImage {
   id: string;
   src: string;
+  thumbnail?: string; // WebP derivatives of src
+  preview?: string;
   userId: string;
   userName: string;
   userRole: 'farmer' | 'researcher';
@@ -264,6 +286,8 @@ export interface PaginationData {
 export interface BeanImage {
   id: string;
   src: string;
+  thumbnail?: string; // WebP derivatives of src
+  preview?: string;
   userId: string;
   userName: string;
   userRole: 'farmer' | 'researcher';
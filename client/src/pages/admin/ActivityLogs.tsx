@@ -29,45 +29,19 @@ interface Filters {
   dateRange: string;
 }
 
-// Temporary data service
-const getActivityLogs = async (filters: Partial<Filters> = {}): Promise<ActivityLog[]> => {
-    
-  const logs: ActivityLog[] = await AdminService.getActivityLogs();
-  console.log("DEBUG: Fetched activity logs from AdminService filtered success status", logs.filter(log => log.status === "success"));
-  
-  return logs.filter(log => {
-    // User type filter
-    if (filters.userType && filters.userType !== 'all' && log.userType !== filters.userType) return false;
-    
-    // Status filter
-    if (filters.status && filters.status !== 'all' && log.status !== filters.status) return false;
-    
-    // Search filter
-    if (filters.search && !log.action.toLowerCase().includes(filters.search.toLowerCase()) && 
-        !log.user.toLowerCase().includes(filters.search.toLowerCase())) return false;
-    
-    // Date range filter
-    if (filters.dateRange && filters.dateRange !== 'all') {
-      const logDate = new Date(log.timestamp);
-      const now = new Date();
-      const diffTime = now.getTime() - logDate.getTime();
-      const diffDays = diffTime / (1000 * 3600 * 24);
-      
-      switch (filters.dateRange) {
-        case '1day':
-          if (diffDays > 1) return false;
-          break;
-        case '7days':
-          if (diffDays > 7) return false;
-          break;
-        case '30days':
-          if (diffDays > 30) return false;
-          break;
-      }
-    }
-    
-    return true;
-  });
+const DATE_RANGE_DAYS: Record<string, number> = { '1day': 1, '7days': 7, '30days': 30 };
+
+// Filtering happens on the server; each call returns one page
+const getActivityLogs = async (filters: Partial<Filters> = {}, cursor?: string | null) => {
+  const params: Record<string, string> = {};
+  if (filters.userType && filters.userType !== 'all') params.user_type = filters.userType;
+  if (filters.status && filters.status !== 'all') params.status = filters.status;
+  if (filters.search) params.q = filters.search;
+  if (filters.dateRange && DATE_RANGE_DAYS[filters.dateRange]) {
+    params.since = new Date(Date.now() - DATE_RANGE_DAYS[filters.dateRange] * 24 * 3600 * 1000).toISOString();
+  }
+  if (cursor) params.cursor = cursor;
+  return AdminService.getActivityLogsPage(params);
 };
 
 export default function ActivityLogs() {
@@ -79,6 +53,7 @@ export default function ActivityLogs() {
     dateRange: '7days'
   });
   const [currentPage, setCurrentPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [showDeleteModal, setShowDeleteModal] = useState(false);
   const [deleteStep, setDeleteStep] = useState<'backup' | 'confirm'>('backup');
   const [deleteConfirmText, setDeleteConfirmText] = useState('');
@@ -93,12 +68,23 @@ export default function ActivityLogs() {
 
   useEffect(() => {
     const fetchLogs = async () => {
-      const filteredLogs = await getActivityLogs(filters);
-      setLogs(filteredLogs);
+      const page = await getActivityLogs(filters);
+      setLogs(page.logs);
+      setNextCursor(page.nextCursor);
+      setCurrentPage(1);
     };
     fetchLogs();
   }, [filters]);
 
+  const goToNextPage = async () => {
+    if (currentPage === totalPages && nextCursor) {
+      const page = await getActivityLogs(filters, nextCursor);
+      setLogs(prev => [...prev, ...page.logs]);
+      setNextCursor(page.nextCursor);
+    }
+    setCurrentPage(prev => prev + 1);
+  };
+
   const getStatusBadge = (status: string) => {
     const colors: Record<string, string> = {
       success: 'bg-green-100 text-green-800 px-2 py-1 rounded-full text-xs',
@@ -362,10 +348,10 @@ export default function ActivityLogs() {
           Entries
         </h2>
         {/* Pagination */}
-        {totalPages > 1 && (
+        {(totalPages > 1 || nextCursor) && (
           <div className="flex items-center justify-between mb-2">
             <div className="text-sm text-gray-600">
-              Showing {indexOfFirstLog + 1} to {Math.min(indexOfLastLog, logs.length)} of {logs.length} entries
+              Showing {indexOfFirstLog + 1} to {Math.min(indexOfLastLog, logs.length)} of {logs.length}{nextCursor ? '+' : ''} entries
             </div>
             <div className="flex space-x-2">
               <button
@@ -376,8 +362,8 @@ export default function ActivityLogs() {
                 Previous
               </button>
               <button
-                onClick={() => setCurrentPage(prev => Math.min(prev + 1, totalPages))}
-                disabled={currentPage === totalPages}
+                onClick={goToNextPage}
+                disabled={currentPage >= totalPages && !nextCursor}
                 className="button-accent px-3 py-1 border border-gray-300 rounded text-sm disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50"
               >
                 Next
@@ -22,7 +22,7 @@ import type {
 import DashboardHeader from '@/components/DashboardHeader';
 import { BarChart, DatabaseIcon, Pi, HardDrive as StorageIcon } from 'lucide-react';
 import ShapeSizeDistribution from '@/components/admin/ShapeSizeDistribution';
-import BoxPlotChart from '@/components/admin/BoxPlotChart';
+import BoxPlotChart, { toBoxPlotData } from '@/components/admin/BoxPlotChart';
 
 export default function AdminDashboard() {
   const [adminStats, setAdminStats] = useState<AdminStats | null>(null);
@@ -30,11 +30,7 @@ export default function AdminDashboard() {
   const [beanSubmissions, setBeanSubmissions] = useState<BeanSubmission[]>([]);
   const [userLogs, setUserLogs] = useState<UserLog[]>([]);
   const [systemStatus, setSystemStatus] = useState<SystemStatus | null>(null);
-  const [boxPlotData, setBoxPlotData] = useState<Array<{ 
-    group: string; 
-    farms: string[];
-    data: Array<{ farm: string; value: number }>;
-  }>>([]);
+  const [boxPlotData, setBoxPlotData] = useState<ReturnType<typeof toBoxPlotData>>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -76,29 +72,8 @@ export default function AdminDashboard() {
         setUserLogs(logs);
         setSystemStatus(status);
 
-        // Prepare boxplot data from boxplot_features
-        if (stats.boxplot_features) {
-          const features = Object.keys(stats.boxplot_features);
-          const boxData = features.map(featureName => {
-            const farms = stats.boxplot_features[featureName];
-            const farmNames = Object.keys(farms);
-            
-            // Flatten all farm values into single array with farm labels
-            const allValues: Array<{ farm: string; value: number }> = [];
-            farmNames.forEach(farmName => {
-              farms[farmName].forEach(value => {
-                allValues.push({ farm: farmName, value });
-              });
-            });
-            
-            return {
-              group: featureName.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase()),
-              farms: farmNames,
-              data: allValues
-            };
-          });
-          setBoxPlotData(boxData);
-        }
+        // Boxplots come summarized by the server (boxplot_summary)
+        setBoxPlotData(toBoxPlotData(stats));
 
         // Update sizeDb based on payment plan
         if (status?.paymentPlan?.plan_type) {
@@ -138,29 +113,8 @@ export default function AdminDashboard() {
       setUserLogs(logs);
       setSystemStatus(status);
 
-      // Prepare boxplot data from boxplot_features
-      if (stats.boxplot_features) {
-        const features = Object.keys(stats.boxplot_features);
-        const boxData = features.map(featureName => {
-          const farms = stats.boxplot_features[featureName];
-          const farmNames = Object.keys(farms);
-          
-          // Flatten all farm values into single array with farm labels
-          const allValues: Array<{ farm: string; value: number }> = [];
-          farmNames.forEach(farmName => {
-            farms[farmName].forEach(value => {
-              allValues.push({ farm: farmName, value });
-            });
-          });
-          
-          return {
-            group: featureName.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase()),
-            farms: farmNames,
-            data: allValues
-          };
-        });
-        setBoxPlotData(boxData);
-      }
+      // Boxplots come summarized by the server (boxplot_summary)
+      setBoxPlotData(toBoxPlotData(stats));
 
       // Update sizeDb based on payment plan
       if (status?.paymentPlan?.plan_type) {
@@ -435,7 +389,7 @@ export default function AdminDashboard() {
               minConfidence={adminStats.min_confidence}
               maxConfidence={adminStats.max_confidence}
               featureStats={adminStats.feature_stats}
-              boxplotFeatures={adminStats.boxplot_features}
+              boxplotSummary={adminStats.boxplot_summary}
             />
           </div>
         </div>
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import TableComponent from '@/components/TableComponent';
 import type { TableColumn } from '@/components/TableComponent';
 import AdminService from '@/services/adminService';
-import type { UserManagementUser, PaginationData } from '@/interfaces/global';
+import type { UserManagementUser } from '@/interfaces/global';
 import PageHeader from '@/components/PageHeader';
 
 
@@ -11,14 +11,11 @@ interface UserManagementProps { }
 
 const UserManagement: React.FC<UserManagementProps> = () => {
   const [users, setUsers] = useState<UserManagementUser[]>([]);
-  const [pagination, setPagination] = useState<PaginationData>({
-    currentPage: 1,
-    totalPages: 1,
-    totalItems: 0,
-    itemsPerPage: 10,
-    hasNext: false,
-    hasPrevious: false
-  });
+  // Keyset pages: cursors[i] fetches page i + 1 ('' is the first page)
+  const itemsPerPage = 10;
+  const [currentPage, setCurrentPage] = useState(1);
+  const [cursors, setCursors] = useState<string[]>(['']);
+  const [hasNext, setHasNext] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [locations, setLocations] = useState<{ id: string; name: string }[]>([]); 
@@ -55,7 +52,7 @@ const UserManagement: React.FC<UserManagementProps> = () => {
   // Fetch users data
   useEffect(() => {
     loadUsers();
-  }, [pagination.currentPage]);
+  }, [currentPage]);
 
   // Debounced search effect for username
   useEffect(() => {
@@ -81,14 +78,18 @@ const UserManagement: React.FC<UserManagementProps> = () => {
       if (roleFilter !== 'all') searchParams.role = roleFilter;
       if (locationFilter !== 'all') searchParams.location = locationFilter;
       
-      const result = await AdminService.getUsers(
-        pagination.currentPage,
-        pagination.itemsPerPage,
+      const result = await AdminService.getUsersPage(
+        cursors[currentPage - 1] ?? '',
+        itemsPerPage,
         Object.keys(searchParams).length > 0 ? searchParams : undefined
       );
       
       setUsers(result.data);
-      setPagination(result.pagination);
+      setHasNext(result.hasNext);
+      if (result.nextCursor) {
+        const nextCursor = result.nextCursor;
+        setCursors(prev => [...prev.slice(0, currentPage), nextCursor]);
+      }
     } catch (err) {
       console.error('Error fetching users:', err);
       setError('Failed to load users. Please try again.');
@@ -108,23 +109,28 @@ const UserManagement: React.FC<UserManagementProps> = () => {
 
   // Handle pagination
   const handlePageChange = (page: number) => {
-    setPagination(prev => ({ ...prev, currentPage: page }));
+    setCurrentPage(page);
+  };
+
+  const resetPages = () => {
+    setCurrentPage(1);
+    setCursors(['']);
   };
 
   // Handle search changes with pagination reset
   const handleSearchChange = (value: string) => {
     setSearchTerm(value);
-    setPagination(prev => ({ ...prev, currentPage: 1 }));
+    resetPages();
   };
 
   const handleRoleFilterChange = (value: 'all' | 'farmer' | 'researcher' | 'admin') => {
     setRoleFilter(value);
-    setPagination(prev => ({ ...prev, currentPage: 1 }));
+    resetPages();
   };
 
   const handleLocationFilterChange = (value: string) => {
     setLocationFilter(value);
-    setPagination(prev => ({ ...prev, currentPage: 1 }));
+    resetPages();
   };
 
   // // Handle form submission
@@ -285,14 +291,15 @@ const UserManagement: React.FC<UserManagementProps> = () => {
       key: 'role',
       label: 'Role',
       width: 'w-1/6',
-      render: (value) => (
-        <span className={`inline-block px-2 py-1 rounded-full text-xs font-accent ${value === 'admin' ? 'bg-red-100 text-red-800' :
-          value === 'researcher' ? 'bg-blue-100 text-blue-800' :
+      // Users can hold several roles; show each one
+      render: (value, row) => (row.roles?.length ? row.roles : [value]).map((role: string) => (
+        <span key={role} className={`inline-block px-2 py-1 mr-1 rounded-full text-xs font-accent ${role === 'admin' ? 'bg-red-100 text-red-800' :
+          role === 'researcher' ? 'bg-blue-100 text-blue-800' :
             'bg-green-100 text-green-800'
           }`}>
-          {value}
+          {role}
         </span>
-      )
+      ))
     },
     {
       key: 'location__name',
@@ -466,12 +473,10 @@ const UserManagement: React.FC<UserManagementProps> = () => {
             className="min-h-[400px]"
             rowClassName={(row) => row.is_deleted ? 'bg-[var(--fadin-gray)]' : ''}
             pagination={{
-              currentPage: pagination.currentPage,
-              totalPages: pagination.totalPages,
-              totalItems: pagination.totalItems,
-              itemsPerPage: pagination.itemsPerPage,
-              hasNext: pagination.hasNext,
-              hasPrevious: pagination.hasPrevious,
+              currentPage,
+              itemsPerPage,
+              hasNext,
+              hasPrevious: currentPage > 1,
               onPageChange: handlePageChange
             }}
             showPaginationTop={true}
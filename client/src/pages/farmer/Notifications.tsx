@@ -163,6 +163,10 @@ const Notifications: React.FC = () => {
     const [userId, setUserId] = useState<string | null>(null);
     const [userRole, setUserRole] = useState<string | null>(null);
     const [isLoading, setIsLoading] = useState(false);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+    // Across every page, not just the ones loaded
+    const [unreadCount, setUnreadCount] = useState(0);
     const [showBroadcastModal, setShowBroadcastModal] = useState(false);
     const [showClearModal, setShowClearModal] = useState(false);
 
@@ -189,21 +193,18 @@ const Notifications: React.FC = () => {
         getUser();
     }, []);
 
-    const getNotifications = async (userId: string): Promise<NotifAttributes[]> => {
-        const response = await NotificationsService.getNotifications(userId);
-        if (!response) {
-            throw new Error('Failed to fetch notifications');
-        }
-        return response;
-    }
-
     const fetchNotifications = async () => {
         if (!userId) return;
         
         setIsLoading(true);
         try {
-            const notifications = await getNotifications(userId);
-            setNotifs(notifications);
+            const [page, unread] = await Promise.all([
+                NotificationsService.getNotifications(userId),
+                NotificationsService.getUnreadCount(userId),
+            ]);
+            setNotifs(page.notifications);
+            setNextCursor(page.nextCursor);
+            setUnreadCount(unread);
         } catch (error) {
             console.error('Failed to fetch notifications:', error);
         } finally {
@@ -211,17 +212,40 @@ const Notifications: React.FC = () => {
         }
     };
 
+    const loadOlderNotifications = async () => {
+        if (!userId || !nextCursor) return;
+
+        setIsLoadingMore(true);
+        try {
+            const page = await NotificationsService.getNotifications(userId, nextCursor);
+            // Skip anything the stream already delivered
+            setNotifs(prev => [...prev, ...page.notifications.filter(notif => !prev.some(existing => existing.id === notif.id))]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Failed to load older notifications:', error);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchNotifications();
+        if (!userId) return;
+        // New notifications arrive over the stream instead of by refetching
+        return NotificationsService.subscribe(userId, (incoming) => {
+            setNotifs(prev => prev.some(notif => notif.id === incoming.id) ? prev : [incoming, ...prev]);
+            if (!incoming.read) setUnreadCount(count => count + 1);
+        });
     }, [userId]);
 
     const handleMarkAsRead = async (notificationId: string) => {
         try {
-            await NotificationsService.markAsRead(notificationId);
+            await NotificationsService.markAsRead(notificationId, userId ?? undefined);
             // Update local state
             setNotifs(prev => prev.map(notif => 
                 notif.id === notificationId ? { ...notif, read: true } : notif
             ));
+            setUnreadCount(count => Math.max(0, count - 1));
         } catch (error) {
             console.error('Failed to mark notification as read:', error);
         }
@@ -234,6 +258,7 @@ const Notifications: React.FC = () => {
             await NotificationsService.markAllAsRead(userId);
             // Update local state
             setNotifs(prev => prev.map(notif => ({ ...notif, read: true })));
+            setUnreadCount(0);
         } catch (error) {
             console.error('Failed to mark all notifications as read:', error);
         }
@@ -258,6 +283,8 @@ const Notifications: React.FC = () => {
             await NotificationsService.clearNotifications(userId);
             // Clear local state
             setNotifs([]);
+            setNextCursor(null);
+            setUnreadCount(0);
             setShowClearModal(false);
             showSuccess('Notifications Cleared', 'All notifications cleared successfully!');
         } catch (error) {
@@ -297,8 +324,6 @@ const Notifications: React.FC = () => {
         }
     };
 
-    const unreadCount = notifs.filter(notif => !notif.read).length;
-    
   return (
       <div className="w-full h-full max-w-7xl bg-white p-6 mx-auto">
 
@@ -383,6 +408,17 @@ const Notifications: React.FC = () => {
                                 </div>
                             </div>
                         ))}
+                        {nextCursor && (
+                            <div className="flex justify-center pt-2">
+                                <button
+                                    onClick={loadOlderNotifications}
+                                    disabled={isLoadingMore}
+                                    className="button-secondary px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:opacity-50 transition-colors"
+                                >
+                                    {isLoadingMore ? 'Loading...' : 'Load older notifications'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 ) : (
                     <EmptyStateNotice icon={<BellIcon />} message="No Notifications." />
@@ -56,6 +56,7 @@ const GallerySection: React.FC<GallerySectionProps> = ({ activeTab }) => {
     // Convert BeanImage to format expected by GalleryComponent (predicted type)
     const convertedImages = filteredImages.map(img => ({
         src: img.src,
+        thumbnail: img.thumbnail,
         is_validated: img.is_validated,
         predictions: img.predictions
     }));
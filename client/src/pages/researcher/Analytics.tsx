@@ -5,18 +5,14 @@ import CardComponent from '@/components/CardComponent';
 import CorrelationMatrixChart from '@/components/admin/CorrelationMatrixChart';
 import { useCachedAdminService } from '@/hooks/useCachedServices';
 import type { AdminStats } from '@/interfaces/global';
-import BoxPlotChart from '@/components/admin/BoxPlotChart';
+import BoxPlotChart, { toBoxPlotData } from '@/components/admin/BoxPlotChart';
 import ShapeSizeDistribution from '@/components/admin/ShapeSizeDistribution';
 
 
 const Analytics: React.FC = () => {
   const [adminStats, setAdminStats] = useState<AdminStats | null>(null);
   const [loading, setLoading] = useState(true);
-  const [boxPlotData, setBoxPlotData] = useState<Array<{ 
-    group: string; 
-    farms: string[];
-    data: Array<{ farm: string; value: number }>;
-  }>>([]);
+  const [boxPlotData, setBoxPlotData] = useState<ReturnType<typeof toBoxPlotData>>([]);
 
   // Initialize cached services
   const cachedAdminService = useCachedAdminService();
@@ -28,29 +24,8 @@ const Analytics: React.FC = () => {
         const stats = await cachedAdminService.getAdminStats();
         setAdminStats(stats);
         
-        // Prepare boxplot data from boxplot_features
-        if (stats.boxplot_features) {
-          const features = Object.keys(stats.boxplot_features);
-          const boxData = features.map(featureName => {
-            const farms = stats.boxplot_features[featureName];
-            const farmNames = Object.keys(farms);
-            
-            // Flatten all farm values into single array with farm labels
-            const allValues: Array<{ farm: string; value: number }> = [];
-            farmNames.forEach(farmName => {
-              farms[farmName].forEach(value => {
-                allValues.push({ farm: farmName, value });
-              });
-            });
-            
-            return {
-              group: featureName.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase()),
-              farms: farmNames,
-              data: allValues
-            };
-          });
-          setBoxPlotData(boxData);
-        }
+        // Boxplots come summarized by the server (boxplot_summary)
+        setBoxPlotData(toBoxPlotData(stats));
       } catch (err) {
         console.error('Error fetching analytics data:', err);
       } finally {
@@ -314,7 +314,7 @@ const Annotations: React.FC = () => {
                                 {/* Image */}
                                 <div className="aspect-square relative overflow-hidden">
                                     <img
-                                        src={image.src}
+                                        src={image.thumbnail || image.src}
                                         alt={`Bean sample from ${image.userName}`}
                                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                                     />
@@ -59,6 +59,7 @@ const BeansGallery: React.FC = () => {
   const convertedImages = filteredImages.map(img => ({
     id: img.id,
     src: img.src,
+    thumbnail: img.thumbnail,
     predictions: img.predictions,
     userName: img.userName,
     userRole: img.userRole,
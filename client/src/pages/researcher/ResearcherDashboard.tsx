@@ -119,7 +119,7 @@ const ResearcherDashboard: React.FC = () => {
                 minConfidence={adminStats.min_confidence}
                 maxConfidence={adminStats.max_confidence}
                 featureStats={adminStats.feature_stats}
-                boxplotFeatures={adminStats.boxplot_features}
+                boxplotSummary={adminStats.boxplot_summary}
               />
             }}
           />
@@ -23,6 +23,7 @@ const UploadBodySection: React.FC<UploadBodySectionProps> = ({ activeTab, onFile
   const [showCamera, setShowCamera] = useState(false);
   const [isUploading, setIsUploading] = useState(false);
   const [isPredicting, setIsPredicting] = useState(false);
+  const [predictionProgress, setPredictionProgress] = useState<{ done: number; total: number } | null>(null);
   const [showPredictionResult, setShowPredictionResult] = useState(false);
   const [showMultiImageResult, setShowMultiImageResult] = useState(false);
   const [predictionData, setPredictionData] = useState<{
@@ -74,16 +75,19 @@ const UploadBodySection: React.FC<UploadBodySectionProps> = ({ activeTab, onFile
       if (activeTab === 'Predict Image') {
         // Show prediction loading modal
         setIsPredicting(true);
+        setPredictionProgress({ done: 0, total: imagesToUpload.length });
         setShowPreviewModal(false);
         
+        // Results stream in per image, so the modal can show progress
         response = await storageService.predictImage({
           user_id,
           comment: comment,
           save_to_db: true, // Always save to database for predictions
           ...(imagesToUpload.length === 1 ? { image: imagesToUpload[0] } : { images: imagesToUpload })
-        });
+        }, (_image, done, total) => setPredictionProgress({ done, total }));
         
         setIsPredicting(false);
+        setPredictionProgress(null);
         
         // Handle new multi-image response structure
         if (response && response.images && response.images.length > 0) {
@@ -139,6 +143,7 @@ const UploadBodySection: React.FC<UploadBodySectionProps> = ({ activeTab, onFile
       }
     } catch (error: any) {
       setIsPredicting(false);
+      setPredictionProgress(null);
       showError("Upload failed", error.message, { autoClose: false });
     } finally {
       setIsUploading(false);
@@ -299,7 +304,7 @@ const UploadBodySection: React.FC<UploadBodySectionProps> = ({ activeTab, onFile
         />
 
         {/* Prediction Loading Modal */}
-        <PredictionLoadingModal isOpen={isPredicting} />
+        <PredictionLoadingModal isOpen={isPredicting} progress={predictionProgress} />
 
         {/* Prediction Result Modal (Legacy - for old single image results) */}
         <PredictionResultModal
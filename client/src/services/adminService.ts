@@ -767,6 +767,47 @@ export class AdminService {
     }
   }
 
+  // One keyset page of users, newest first; pass nextCursor back ('' for the
+  // first page). Unlike getUsers this stays cheap however many users exist.
+  static async getUsersPage(
+    cursor: string,
+    limit: number = 10,
+    searchParams?: {
+      search_username?: string;
+      role?: string;
+      location?: string;
+    }
+  ): Promise<{ data: UserManagementUser[]; hasNext: boolean; nextCursor: string | null }> {
+    try {
+      const params = new URLSearchParams();
+      params.append('cursor', cursor);
+      params.append('limit', limit.toString());
+
+      if (searchParams?.search_username) params.append('search_username', searchParams.search_username);
+      if (searchParams?.role && searchParams.role !== 'all') params.append('role', searchParams.role);
+      if (searchParams?.location && searchParams.location !== 'all') params.append('location', searchParams.location);
+
+      const res = await fetch(
+        `${import.meta.env.VITE_HOST_BE}/api/users/get-users/?${params}`
+      );
+
+      if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+      }
+
+      const result = await res.json();
+
+      return {
+        data: result.data || [],
+        hasNext: result.pagination?.hasNext ?? false,
+        nextCursor: result.pagination?.nextCursor ?? null
+      };
+    } catch (error) {
+      console.error("Error fetching users:", error);
+      throw error;
+    }
+  }
+
   static async createUser(userData: {
     first_name: string;
     last_name: string;
@@ -928,23 +969,35 @@ export class AdminService {
   }
 
   // Activity logs
-  static async getActivityLogs(): Promise<ActivityLog[]> {
+  // One page of logs, newest first; pass nextCursor back to get the next page
+  static async getActivityLogsPage(
+    params: Record<string, string> = {}
+  ): Promise<{ logs: ActivityLog[]; nextCursor: string | null }> {
     try {
+      const query = new URLSearchParams(params).toString();
       const response = await fetch(
-        `${import.meta.env.VITE_HOST_BE}/api/activity/logs/`,
+        `${import.meta.env.VITE_HOST_BE}/api/activity/logs/${query ? `?${query}` : ''}`,
         {
           method: "GET",
           headers: { "Content-Type": "application/json" },
         }
       );
-      await new Promise((resolve) => setTimeout(resolve, 100));
-      return await response.json();
+      const data = await response.json();
+      return {
+        logs: Array.isArray(data) ? data : [],
+        nextCursor: response.headers.get("X-Next-Cursor"),
+      };
     } catch (error) {
       console.error("Error fetching activity logs:", error);
       throw error;
     }
   }
 
+  static async getActivityLogs(params: Record<string, string> = {}): Promise<ActivityLog[]> {
+    const { logs } = await AdminService.getActivityLogsPage(params);
+    return logs;
+  }
+
   static async deleteAllActivityLogs(): Promise<boolean> {
     try {
       const response = await fetch(
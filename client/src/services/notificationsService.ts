@@ -1,11 +1,13 @@
 import type { NotifAttributes } from '@/interfaces/global';
 
 export class NotificationsService {
-  // Get all notifications for a user
-  static async getNotifications(userId: string): Promise<NotifAttributes[]> {
+  // One page of a user's notifications, newest first. Pass the returned
+  // nextCursor back in to load the next (older) page; it is null on the last one.
+  static async getNotifications(userId: string, cursor?: string | null): Promise<{ notifications: NotifAttributes[]; nextCursor: string | null }> {
     try {
       console.log('Fetching notifications for user:', userId);
-      const response = await fetch(`${import.meta.env.VITE_HOST_BE}/api/notifications/get-list/${userId}`);
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${import.meta.env.VITE_HOST_BE}/api/notifications/get-list/${userId}/${params}`);
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -14,22 +16,59 @@ export class NotificationsService {
       const data = await response.json();
       
       // Transform backend data to match frontend interface
-      return data.map((notif: any) => ({
+      return {
+        notifications: data.map((notif: any) => ({
+          id: notif.id.toString(),
+          title: notif.title,
+          message: notif.message,
+          timestamp: notif.created_at,
+          read: notif.is_read,
+          type: notif.type as 'info' | 'alert' | 'system',
+        })),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+      };
+    } catch (error) {
+      console.error('Error fetching notifications:', error);
+      throw error;
+    }
+  }
+
+  // Unread notifications for a user (cheap to poll)
+  static async getUnreadCount(userId: string): Promise<number> {
+    try {
+      const response = await fetch(`${import.meta.env.VITE_HOST_BE}/api/notifications/unread-count/${userId}/`);
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      return data.unread;
+    } catch (error) {
+      console.error('Error fetching unread count:', error);
+      throw error;
+    }
+  }
+
+  // Push new notifications as they are sent; returns a function that closes the stream
+  static subscribe(userId: string, onNotification: (notification: NotifAttributes) => void): () => void {
+    const source = new EventSource(`${import.meta.env.VITE_HOST_BE}/api/notifications/stream/${userId}/`);
+    source.addEventListener('notification', (event) => {
+      const notif = JSON.parse((event as MessageEvent).data);
+      onNotification({
         id: notif.id.toString(),
         title: notif.title,
         message: notif.message,
         timestamp: notif.created_at,
         read: notif.is_read,
         type: notif.type as 'info' | 'alert' | 'system',
-      }));
-    } catch (error) {
-      console.error('Error fetching notifications:', error);
-      throw error;
-    }
+      });
+    });
+    return () => source.close();
   }
 
   // Mark notification as read
-  static async markAsRead(notificationId: string): Promise<boolean> {
+  static async markAsRead(notificationId: string, userId?: string): Promise<boolean> {
     try {
       const response = await fetch(`${import.meta.env.VITE_HOST_BE}/api/notifications/mark-as-read/`, {
         method: 'POST',
@@ -37,7 +76,8 @@ export class NotificationsService {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          notification_id: notificationId
+          notification_id: notificationId,
+          user_id: userId
         })
       });
 
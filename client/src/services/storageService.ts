@@ -4,6 +4,7 @@ import type {
   FarmFolder,
   PaginationData,
   MultiImageProcessingResponse,
+  ProcessedImageResult,
   Location
 } from "@/interfaces/global";
 import { supabase } from "@/lib/supabaseClient";
@@ -358,11 +359,19 @@ class StorageService {
     }
   }
 
-  async predictImage(data: UploadImageRequest): Promise<MultiImageProcessingResponse> {
+  // With onImage, results are streamed (NDJSON) and reported per image as each one finishes
+  async predictImage(
+    data: UploadImageRequest,
+    onImage?: (image: ProcessedImageResult, done: number, total: number) => void
+  ): Promise<MultiImageProcessingResponse> {
     try {
       const formData = new FormData();
       formData.append("user_id", data.user_id);
 
+      if (onImage) {
+        formData.append("stream", "ndjson");
+      }
+
       if (data.comment) {
         formData.append("comment", data.comment);
       }
@@ -381,14 +390,27 @@ class StorageService {
         });
       }
 
-      const response = await fetch(`${this.baseURL}/process/`, {
+      // The server answers 429 with Retry-After while its CV slots are busy
+      let response = await fetch(`${this.baseURL}/process/`, {
         method: "POST",
         body: formData,
       });
+      for (let attempt = 1; response.status === 429 && attempt <= 3; attempt++) {
+        const retryAfter = Number(response.headers.get("Retry-After")) || 5;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+        response = await fetch(`${this.baseURL}/process/`, {
+          method: "POST",
+          body: formData,
+        });
+      }
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => null);
-        throw new Error(errorData?.message || "Failed to predict image(s)");
+        throw new Error(errorData?.error || errorData?.message || "Failed to predict image(s)");
+      }
+
+      if (onImage && response.body) {
+        return await this.readPredictionStream(response.body, onImage);
       }
 
       return await response.json();
@@ -397,6 +419,44 @@ class StorageService {
     }
   }
 
+  private async readPredictionStream(
+    body: ReadableStream<Uint8Array>,
+    onImage: (image: ProcessedImageResult, done: number, total: number) => void
+  ): Promise<MultiImageProcessingResponse> {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    const images: ProcessedImageResult[] = [];
+    let summary = null as Omit<MultiImageProcessingResponse, "images"> | null;
+    let buffered = "";
+
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const event = JSON.parse(line);
+      if (event.event === "image") {
+        images.push(event.data);
+        onImage(event.data, images.length, event.total);
+      } else if (event.event === "done") {
+        summary = event.data;
+      }
+    };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split("\n");
+      buffered = lines.pop() ?? "";
+      lines.forEach(handleLine);
+    }
+    handleLine(buffered + decoder.decode());
+
+    return {
+      images,
+      total_images_processed: summary?.total_images_processed ?? images.length,
+      total_beans_detected: summary?.total_beans_detected ?? images.reduce((sum, image) => sum + image.beans.length, 0),
+    };
+  }
+
   async submitImage(data: UploadImageRequest): Promise<UploadImageResponse> {
     try {
       const formData = new FormData();
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from services.activity_log_retention import (
+    ACTIVITY_LOG_MONTHS_AHEAD, ACTIVITY_LOG_RETENTION_MONTHS, ensure_partitions,
+    expired_partitions, purge_expired_partitions
+)
+
+
+class Command(BaseCommand):
+    help = 'Remove activity log months older than the retention period and create the upcoming monthly partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=ACTIVITY_LOG_RETENTION_MONTHS,
+            help=f'Months of logs to keep, counting the current one back (default: {ACTIVITY_LOG_RETENTION_MONTHS})',
+        )
+        parser.add_argument(
+            '--detach',
+            action='store_true',
+            help='Detach expired partitions instead of dropping them (keeps them as plain tables)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the partitions that would be removed',
+        )
+
+    def handle(self, *args, **options):
+        months = options['months']
+
+        if options['dry_run']:
+            for name, month in expired_partitions(months):
+                self.stdout.write(f'Would remove {name} ({month:%Y-%m})')
+            return
+
+        created = ensure_partitions(ACTIVITY_LOG_MONTHS_AHEAD)
+        removed = purge_expired_partitions(months, detach=options['detach'])
+        for name in removed:
+            self.stdout.write(f"{'Detached' if options['detach'] else 'Dropped'} {name}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Removed {len(removed)} expired partition(s), created {created} upcoming partition(s).'
+            )
+        )
@@ -1,70 +1,119 @@
+import base64
+import uuid
+from datetime import datetime
+from django.db import connection
 from django.utils import timezone
 from django.http import JsonResponse
 from rest_framework.decorators import api_view
 from services.supabase_service import supabase
 from models.models import ActivityLog, Notification, User, Role
+from services.activity_log_retention import truncate_activity_logs
 from services.activity_logger import log_user_activity, send_notification_to_admins
 
 
+ACTIVITY_LOG_PAGE_SIZE = 100
+ACTIVITY_LOG_MAX_PAGE_SIZE = 500
+
+ACTIVITY_LOG_COLUMNS = ['id', 'timestamp', 'user', 'userType', 'action', 'resource', 'status', 'details']
+
+
+def encode_log_cursor(created_at, log_id):
+    raw = f"{created_at.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_log_cursor(cursor_value):
+    created_at, log_id = base64.urlsafe_b64decode(cursor_value.encode()).decode().split('|', 1)
+    return datetime.fromisoformat(created_at), int(log_id)
+
+
+def activity_log_filters(params):
+    """
+    WHERE conditions and params for the list filters:
+    action, status, resource, user_id, user_type (role name),
+    since/until (ISO timestamps) and q (action or user name, case-insensitive).
+    Raises ValueError for a malformed user_id or timestamp.
+    """
+    conditions = []
+    values = {}
+    for field in ('action', 'status', 'resource'):
+        if params.get(field):
+            conditions.append(f"al.{field} = %({field})s")
+            values[field] = params[field]
+    if params.get('user_id'):
+        conditions.append("al.user_id = %(user_id)s")
+        # A non-UUID would make Postgres fail the uuid cast with a 500
+        values['user_id'] = str(uuid.UUID(params['user_id']))
+    if params.get('user_type'):
+        conditions.append("r.name = %(user_type)s")
+        values['user_type'] = params['user_type']
+    if params.get('since'):
+        conditions.append("al.created_at >= %(since)s")
+        values['since'] = datetime.fromisoformat(params['since'])
+    if params.get('until'):
+        conditions.append("al.created_at < %(until)s")
+        values['until'] = datetime.fromisoformat(params['until'])
+    if params.get('q'):
+        escaped = params['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(
+            "(al.action ILIKE %(q)s OR CONCAT(u.first_name, ' ', u.last_name) ILIKE %(q)s)"
+        )
+        values['q'] = f"%{escaped}%"
+    return conditions, values
+
+
 @api_view(['GET', 'DELETE'])
 def activity_log_list(request):
     if request.method == 'GET':
-        # Fetch activity logs from Supabase activity logs
-        # Get activity logs with related user and role information
-        response = ActivityLog.objects.select_related('user__userrole__role').all().values(
-            'id',
-            'created_at',
-            'user__id',
-            'user__first_name',
-            'user__last_name',
-            'user__username',
-            'user__userrole__role__name',
-            'action',
-            'description'
-        )
-        print(f"DEBUG: Fetched beautified: {list(response)} activity logs from Supabase")
-        
-        # Converting to response format
-        resource = ''
-        status = ''
-        details = ''
-        data = []
-        for log in response:
-            if log['description'].count('->') == 3 and log['description'].count(';') == 2:
-                resource = log['description'].split(';')[2].split('->')[1]
-                status = log['description'].split(';')[0].split('->')[1]
-                details = log['description'].split(';')[1].split('->')[1]
-            else:
-                resource = ''
-                status = ''
-                details = ''
-
-            data.append({
-                'id': log['id'],
-                'timestamp': log['created_at'],
-                'user': (log['user__first_name'] or '') + ' ' + (log['user__last_name'] or ''),
-                'userType': log['user__userrole__role__name'],
-                'action': log['action'],
-                # log['description'] example is "status->success;details->Exported Stuffs here;resource->hello.jpg"
-
-                'resource': resource,
-                'status': status,
-                'details': details
-            })
-
-        if not response:
+        # Newest first, ?limit=N per page (default 100, max 500), filtered by
+        # activity_log_filters(). The body is an array; pass the X-Next-Cursor
+        # header back as ?cursor= for the next page (absent on the last page).
+        # Every page is an index range scan on created_at, however large the
+        # table is.
+        try:
+            limit = min(max(int(request.GET.get('limit', ACTIVITY_LOG_PAGE_SIZE)), 1), ACTIVITY_LOG_MAX_PAGE_SIZE)
+            conditions, params = activity_log_filters(request.GET)
+            cursor_value = request.GET.get('cursor')
+            if cursor_value:
+                params['after_created'], params['after_id'] = decode_log_cursor(cursor_value)
+                conditions.append("(al.created_at, al.id) < (%(after_created)s, %(after_id)s)")
+        except ValueError:
+            return JsonResponse({'error': 'Invalid filter or cursor'}, status=400)
+
+        params['limit'] = limit + 1
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT al.id, al.created_at,
+                       COALESCE(u.first_name, '') || ' ' || COALESCE(u.last_name, ''),
+                       r.name, al.action, al.resource, al.status, al.details
+                FROM public.activity_logs al
+                LEFT JOIN public.users u ON u.id = al.user_id
+                LEFT JOIN public.user_roles ur ON ur.user_id = al.user_id
+                LEFT JOIN public.roles r ON r.id = ur.role_id
+                {where_clause}
+                ORDER BY al.created_at DESC, al.id DESC
+                LIMIT %(limit)s
+            """, params)
+            data = [dict(zip(ACTIVITY_LOG_COLUMNS, row)) for row in cursor.fetchall()]
+
+        next_cursor = None
+        if len(data) > limit:
+            data = data[:limit]
+            next_cursor = encode_log_cursor(data[-1]['timestamp'], data[-1]['id'])
+
+        if not data and not cursor_value and not request.GET:
             return JsonResponse({'error': 'No activity logs found'}, status=404)
-        return JsonResponse(list(data), safe=False)
+        response = JsonResponse(data, safe=False)
+        if next_cursor:
+            response['X-Next-Cursor'] = next_cursor
+        return response
 
     elif request.method == 'DELETE':
         # Delete all activity logs from database (alternative endpoint)
         try:
-            # Get count before deletion for notification
-            total_logs = ActivityLog.objects.count()
-            
-            # Delete all logs using Django ORM instead of Supabase direct call
-            response = ActivityLog.objects.all().delete()
-            deleted_count = response[0]
+            # TRUNCATE every monthly partition instead of deleting row by row
+            deleted_count = truncate_activity_logs()
             
             if deleted_count == 0:
                 # Send notification that no logs were deleted
@@ -156,12 +205,8 @@ def activity_log_delete(request, log_id):
 def activity_log_delete_all(request):
     # Delete all activity logs from database
     try:
-        # Get count before deletion for notification
-        total_logs = ActivityLog.objects.count()
-        
-        # Delete all logs
-        response = ActivityLog.objects.all().delete()
-        deleted_count = response[0]
+        # TRUNCATE every monthly partition instead of deleting row by row
+        deleted_count = truncate_activity_logs()
         
         if deleted_count == 0:
             # Send notification that no logs were deleted
@@ -0,0 +1,143 @@
+import io
+import math
+import time
+import numpy as np
+import pandas as pd
+import polars as pl
+from django.core.management.base import BaseCommand
+from apps.analytics.views import make_histogram
+from services.analytics_engine import (
+    ASPECT_RATIO, CORRELATION_COLUMNS, FEATURE_SCHEMA, FEATURE_STATS_COLUMNS, ROUNDNESS,
+    correlation_matrix, feature_stats_by_farm, histogram
+)
+
+
+def synthetic_beans(rows, farms, seed):
+    """Plausible, correlated bean measurements spread over `farms` farms."""
+    rng = np.random.default_rng(seed)
+    location_id = rng.integers(1, farms + 1, rows)
+    major = rng.normal(9.5, 1.2, rows).clip(4) + location_id * 0.05
+    minor = (major * rng.uniform(0.6, 0.9, rows)).clip(2)
+    area = math.pi / 4 * major * minor * rng.normal(1, 0.03, rows)
+    perimeter = math.pi * (3 * (major + minor) / 2 - np.sqrt((3 * major + minor) * (major + 3 * minor) / 4))
+    convex_area = area * rng.uniform(1.0, 1.08, rows)
+    columns = {
+        'location_id': location_id,
+        'farm_name': np.array([f"Farm {i}" for i in range(farms + 1)])[location_id],
+        'area': area,
+        'perimeter': perimeter,
+        'major_axis_length': major,
+        'minor_axis_length': minor,
+        'extent': rng.uniform(0.6, 0.85, rows),
+        'eccentricity': np.sqrt(1 - (minor / major) ** 2),
+        'convex_area': convex_area,
+        'solidity': area / convex_area,
+        'mean_intensity': rng.normal(110, 20, rows),
+        'equivalent_diameter': np.sqrt(4 * area / math.pi),
+    }
+    # Keep the precision the database stores (numeric(20, 5))
+    return {
+        name: values.round(5) if values.dtype.kind == 'f' else values
+        for name, values in columns.items()
+    }
+
+
+def pandas_path(tuples):
+    """What the dashboard did before: cursor tuples -> pandas / Python lists."""
+    columns = list(FEATURE_SCHEMA)
+    df = pd.DataFrame(tuples, columns=columns)
+    corr = df[CORRELATION_COLUMNS].corr()
+
+    grouped = df.groupby(['location_id', 'farm_name'])[FEATURE_STATS_COLUMNS]
+    means = grouped.mean()
+    medians = grouped.median()
+    modes = grouped.agg(lambda values: values.round(2).mode().min())
+
+    aspect, roundness = [], []
+    for row in tuples:
+        major, minor, perimeter, area = row[4], row[5], row[3], row[2]
+        aspect.append(major / minor if minor else 0)
+        roundness.append((4 * 3.1416 * area) / (perimeter ** 2) if perimeter else 0)
+    hist_aspect = make_histogram(aspect, 0.1)
+    hist_roundness = make_histogram(roundness, 0.05)
+    return corr, means, medians, modes, hist_aspect, hist_roundness
+
+
+def polars_path(csv_bytes):
+    """The analytics engine: COPY CSV -> Polars lazy frames."""
+    frame = pl.read_csv(io.BytesIO(csv_bytes), schema=FEATURE_SCHEMA).lazy()
+    return (
+        correlation_matrix(frame),
+        feature_stats_by_farm(frame),
+        histogram(frame, ASPECT_RATIO, bin_size=0.1),
+        histogram(frame, ROUNDNESS, bin_size=0.05),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare the Polars analytics engine against the old pandas path on synthetic beans (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1_000_000,
+            help='Number of synthetic beans (default: 1,000,000)',
+        )
+        parser.add_argument(
+            '--farms',
+            type=int,
+            default=12,
+            help='Number of synthetic farms (default: 12)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        rows, farms = options['rows'], options['farms']
+        self.stdout.write(f'Generating {rows:,} beans across {farms} farms...')
+        columns = synthetic_beans(rows, farms, options['seed'])
+
+        # Inputs as each path receives them from the database (not timed)
+        frame = pl.DataFrame(columns).select(list(FEATURE_SCHEMA))
+        tuples = list(frame.iter_rows())
+        csv_bytes = frame.write_csv().encode()
+
+        start = time.perf_counter()
+        corr, means, medians, modes, pd_hist_aspect, pd_hist_roundness = pandas_path(tuples)
+        pandas_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corr_feats, stats, pl_hist_aspect, pl_hist_roundness = polars_path(csv_bytes)
+        polars_seconds = time.perf_counter() - start
+
+        # Parity between the two paths
+        corr_diff = max(
+            abs(cell['y'] - float(corr.at[row['id'], cell['x']]))
+            for row in corr_feats for cell in row['data']
+        )
+        stat_diff = 0.0
+        for feature in FEATURE_STATS_COLUMNS:
+            for stat, expected in (('mean', means), ('median', medians), ('mode', modes)):
+                by_farm = {farm: value for (_, farm), value in expected[feature].items()}
+                for entry in stats[feature][stat]:
+                    stat_diff = max(stat_diff, abs(entry['value'] - float(by_farm[entry['farm']])))
+        hist_mismatch = 0
+        for old, new in ((pd_hist_aspect, pl_hist_aspect), (pd_hist_roundness, pl_hist_roundness)):
+            old_counts = {b['value']: b['count'] for b in old}
+            new_counts = {b['value']: b['count'] for b in new}
+            hist_mismatch += sum(
+                1 for bin_ in old_counts.keys() | new_counts.keys()
+                if old_counts.get(bin_) != new_counts.get(bin_)
+            )
+
+        self.stdout.write(f'pandas path: {pandas_seconds:.2f}s')
+        self.stdout.write(f'polars path: {polars_seconds:.2f}s ({pandas_seconds / polars_seconds:.1f}x)')
+        self.stdout.write(f'max |correlation difference|: {corr_diff:.2e}')
+        self.stdout.write(f'max |mean/median/mode difference|: {stat_diff:.2e}')
+        self.stdout.write(f'histogram bins with different counts: {hist_mismatch}')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from services.fake_status_server import FakeStatusServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake Supabase status page locally (set SUPABASE_STATUS_URL to the printed URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Port to listen on (default: 8765)',
+        )
+        parser.add_argument(
+            '--indicator',
+            default='none',
+            help='Overall status indicator to report: none, minor, major, critical (default: none)',
+        )
+        parser.add_argument(
+            '--status-code',
+            type=int,
+            default=200,
+            help='HTTP status to answer with (default: 200)',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0,
+            help='Seconds to wait before answering, to simulate a slow upstream (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        server = FakeStatusServer(
+            port=options['port'],
+            indicator=options['indicator'],
+            status_code=options['status_code'],
+            delay=options['delay'],
+        )
+        with server:
+            self.stdout.write(self.style.SUCCESS(f'Fake status page at {server.url} (Ctrl+C to stop)'))
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from services.analytics_cube import refresh_analytics_cube
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the analytics_cube materialized view behind the admin dashboard filters'
+
+    def handle(self, *args, **options):
+        if refresh_analytics_cube():
+            self.stdout.write(self.style.SUCCESS('Analytics cube refreshed.'))
+        else:
+            self.stdout.write('Another worker is already refreshing the analytics cube.')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from services.scatter_sampler import refresh_scatter_sample, SCATTER_REFRESH_BATCH
+
+
+class Command(BaseCommand):
+    help = 'Feed newly extracted beans into the stratified scatter reservoirs until caught up'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SCATTER_REFRESH_BATCH,
+            help=f'Beans consumed per transaction (default: {SCATTER_REFRESH_BATCH})',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            consumed = refresh_scatter_sample(batch_size=options['batch_size'])
+            if consumed == 0:
+                break
+            total += consumed
+            self.stdout.write(f'Consumed {consumed} beans')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Scatter sample refreshed. Consumed {total} beans.')
+        )
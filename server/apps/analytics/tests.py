@@ -1,3 +1,40 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import SimpleTestCase
+from services.fake_status_server import FakeStatusServer
+from services.health_poller import HealthPoller
 
-# Create your tests here.
+
+PLAN = {'plan_type': 'pro', 'end_date': None, 'current_bill': 25.0, 'days_remaining': 12}
+
+
+# The poller thread has its own database connection, which SimpleTestCase
+# does not block; stub the lookups so nothing reads or writes the database
+@mock.patch('services.health_poller.fetch_payment_plan', return_value=PLAN)
+@mock.patch('services.health_poller.fetch_uptime', return_value='3 days')
+class HealthPollerTests(SimpleTestCase):
+
+    def poll(self, server):
+        poller = HealthPoller(status_url=server.url, interval=60, timeout=2)
+        try:
+            return poller.snapshot()
+        finally:
+            poller.stop()
+
+    def test_first_snapshot_waits_for_the_first_poll(self, fetch_uptime, fetch_payment_plan):
+        with FakeStatusServer(indicator='minor', delay=0.2) as server:
+            snapshot = self.poll(server)
+        self.assertEqual(snapshot['serverStatus'], 'minor')
+        self.assertEqual(snapshot['databaseStatus'], 'operational')
+        self.assertEqual(snapshot['systemUptime'], '3 days')
+        self.assertEqual(snapshot['paymentPlan'], PLAN)
+        self.assertIsNotNone(snapshot['checkedAt'])
+        fetch_uptime.assert_called_once_with()
+        fetch_payment_plan.assert_called_once_with()
+
+    def test_upstream_error_reports_unknown(self, fetch_uptime, fetch_payment_plan):
+        with FakeStatusServer(status_code=503) as server:
+            snapshot = self.poll(server)
+        self.assertEqual(snapshot['serverStatus'], 'unknown')
+        self.assertEqual(snapshot['lastBackup'], 'Failed to fetch')
+        self.assertEqual(snapshot['systemUptime'], '3 days')
+        self.assertEqual(snapshot['paymentPlan'], PLAN)
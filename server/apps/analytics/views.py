@@ -4,13 +4,15 @@ from django.http import JsonResponse
 from django.db import connection
 from services.supabase_service import supabase
 from models.models import UserImage, User
+from services.scatter_sampler import get_scatter_sample, scatter_refresher
+from services.analytics_engine import feature_summary_cache
+from services.health_poller import health_poller
+from services.analytics_cube import (
+    cube_refresher, dashboard_filters, query_analytics_cube
+)
 import math
-import numpy as np
-import pandas as pd
 from collections import Counter
-import requests
 from datetime import datetime, timedelta
-from django.utils import timezone
 
 # === Farmer Dashboard ファルマー　❘ 農家
 @api_view(['GET'])
@@ -369,91 +371,42 @@ def render_researcher_dashboard(request, uiid):
 def render_admin_dashboard(request):
     # query 
     data = {}
-    location_id = None # 6 -> 7 -> 8 ->
-    role = None  # "researcher"
-    year = None  # 2025
+    # Optional filters: ?location_id=6&role=researcher&year=2025&month=9
+    try:
+        location_id = int(request.GET['location_id']) if request.GET.get('location_id') else None
+        year = int(request.GET['year']) if request.GET.get('year') else None
+        month = int(request.GET['month']) if request.GET.get('month') else None
+    except ValueError:
+        return JsonResponse({"error": "location_id, year and month must be integers"}, status=400)
+    if month is not None and not 1 <= month <= 12:
+        return JsonResponse({"error": "month must be between 1 and 12"}, status=400)
+    role = request.GET.get('role') or None
+    raw = request.GET.get('raw', 'false').lower() == 'true'
+
+    # Counters come from the pre-aggregated cube, rebuilt in the background
+    # every ANALYTICS_CUBE_MAX_AGE seconds (never inside this request)
+    cube_refresher.start()
+    cube = query_analytics_cube(location_id, role, year, month)
+
+    # The remaining per-bean statistics still read the raw tables, filtered
+    # with the same meaning as the cube keys
+    conditions, params = dashboard_filters(location_id, role, year, month)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
     with connection.cursor() as cursor:
-        image_count = """
-        SELECT COUNT(*) FROM images;
-        """
         user_count = """
         SELECT COUNT(*) FROM users WHERE is_deleted = FALSE;
         """
 
-        validated_count = """
-        SELECT COUNT(DISTINCT image_id) FROM annotations WHERE (label->>'is_validated')::boolean = true;
-        """
-        unvalidated_count = """
-        SELECT COUNT(DISTINCT image_id) FROM annotations WHERE (label->>'is_validated')::boolean = false;
-        """          
-
-        count_bean_types = """
-        SELECT predicted_label->>'bean_type' AS bean_type, COUNT(DISTINCT predictions.id) as count
-        FROM predictions
-        JOIN images ON predictions.image_id = images.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        count_top_uploaders = """
+        count_top_uploaders = f"""
         SELECT users.id, users.first_name, users.last_name, COUNT(DISTINCT images.id) as upload_count
         FROM users
         JOIN user_images ON users.id = user_images.user_id
         JOIN images ON user_images.image_id = images.id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        total_beans_predicted_per_farm = """
-        SELECT images.location_id as loc_id,  
-                COUNT(DISTINCT CASE 
-                  WHEN (a.label->>'is_validated')::boolean = false 
-                  THEN a.id 
-                END
-                ) as pending, 
-                COUNT(DISTINCT CASE 
-                  WHEN (a.label->>'is_validated')::boolean = true 
-                  THEN a.id 
-                END
-                ) as validated
-        FROM images 
-        JOIN annotations a ON images.id = a.image_id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
+        {where_clause}
+        GROUP BY users.id, users.first_name, users.last_name ORDER BY upload_count DESC LIMIT 10;
         """
 
-        beans_features = """
-        SELECT ef.major_axis_length, ef.minor_axis_length, ef.perimeter, ef.area, ef.solidity, ef.extent, ef.eccentricity, ef.mean_intensity
-        FROM extracted_features ef TABLESAMPLE SYSTEM (100)
-        JOIN predictions p ON ef.prediction_id = p.id
-        JOIN images ON p.image_id = images.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        if location_id or role or year:
-            count_bean_types += " WHERE"
-            count_top_uploaders += " WHERE"
-            total_beans_predicted_per_farm += " WHERE"
-
-            conditions = []
-            params = []
-            if location_id:
-                conditions.append(" images.location_id = %s")
-                params.append(location_id)
-            if role:
-                conditions.append(" roles.name = %s")
-                params.append(role)
-            if year:
-                conditions.append(" EXTRACT(YEAR FROM images.upload_date) = %s")
-                params.append(year)
-            count_bean_types += " AND".join(conditions)
-            count_top_uploaders += " AND".join(conditions)
-            total_beans_predicted_per_farm += " AND".join(conditions)
-        count_bean_types += " GROUP BY bean_type;"
-        count_top_uploaders += " GROUP BY users.id, users.first_name, users.last_name ORDER BY upload_count DESC LIMIT 10;"
-        total_beans_predicted_per_farm += " GROUP BY images.location_id;"
-
         # System Statistics Queries
 
         # DB SIZE with 500mb limit on free plan while in pro 8gb
@@ -479,17 +432,8 @@ def render_admin_dashboard(request):
         ORDER BY total_bytes DESC;
         """
 
-            
-        cursor.execute(image_count)
-        uploads = cursor.fetchall()
         cursor.execute(user_count)
         users = cursor.fetchall()
-        cursor.execute(validated_count)
-        validated = cursor.fetchall()
-        cursor.execute(unvalidated_count)
-        unvalidated = cursor.fetchall()
-        cursor.execute(count_bean_types, [location_id, role, year])
-        bean_types = cursor.fetchall()
         
         cursor.execute(db_size_distribution_stats)
         db_size = cursor.fetchall()
@@ -498,10 +442,7 @@ def render_admin_dashboard(request):
         cursor.execute(total_db_size)
         total_db = cursor.fetchall()
 
-        bean_type_data = {}
-        for bean_type, count in bean_types:
-            bean_type_data[bean_type] = count
-        cursor.execute(count_top_uploaders, [location_id, role, year])
+        cursor.execute(count_top_uploaders, params)
         top_uploaders = cursor.fetchall()
         top_uploader_data = []
         for user_id, first_name, last_name, upload_count in top_uploaders:
@@ -510,312 +451,99 @@ def render_admin_dashboard(request):
                 "name": f"{first_name} {last_name}",
                 "upload_count": upload_count
             })
-        cursor.execute(total_beans_predicted_per_farm, [location_id, role, year])
-        farms = cursor.fetchall()
-        farm_data = {}
-        for loc_id, pend, val in farms:
-            farm_data[f"{loc_id}"] = {
-                "pending": pend,
-                "validated": val
-            }
         # Total beans predicted, Avg , Median and Mode(round into two decimal places first) Bean Features, Total Predictions, Average Confidence score, min and max of confidence score.
 
         # Bean Analytics Queries
         
-        # Total predictions query
-        total_predictions_query = """
-        SELECT COUNT(*) FROM predictions p
-        JOIN images ON p.image_id = images.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        
         # Confidence score statistics
-        confidence_stats_query = """
+        confidence_stats_query = f"""
         SELECT AVG(CAST(predicted_label->>'confidence' AS FLOAT)) as avg_confidence,
                MIN(CAST(predicted_label->>'confidence' AS FLOAT)) as min_confidence,
                MAX(CAST(predicted_label->>'confidence' AS FLOAT)) as max_confidence
         FROM predictions p
         JOIN images ON p.image_id = images.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
+        {where_clause}
         """
         
-        # Feature statistics per farm
-        features_stats_query = """
-        SELECT images.location_id,
-               l.name as farm_name,
-               -- Area statistics
-               AVG(ef.area) as area_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.area) as area_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.area, 2)) as area_mode,
-               -- Perimeter statistics  
-               AVG(ef.perimeter) as perimeter_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.perimeter) as perimeter_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.perimeter, 2)) as perimeter_mode,
-               -- Major axis length statistics
-               AVG(ef.major_axis_length) as major_axis_length_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.major_axis_length) as major_axis_length_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.major_axis_length, 2)) as major_axis_length_mode,
-               -- Minor axis length statistics
-               AVG(ef.minor_axis_length) as minor_axis_length_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.minor_axis_length) as minor_axis_length_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.minor_axis_length, 2)) as minor_axis_length_mode,
-               -- Extent statistics
-               AVG(ef.extent) as extent_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.extent) as extent_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.extent, 2)) as extent_mode,
-               -- Eccentricity statistics
-               AVG(ef.eccentricity) as eccentricity_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.eccentricity) as eccentricity_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.eccentricity, 2)) as eccentricity_mode,
-               -- Convex area statistics
-               AVG(ef.convex_area) as convex_area_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.convex_area) as convex_area_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.convex_area, 2)) as convex_area_mode,
-               -- Solidity statistics
-               AVG(ef.solidity) as solidity_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.solidity) as solidity_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.solidity, 2)) as solidity_mode,
-               -- Mean intensity statistics
-               AVG(ef.mean_intensity) as mean_intensity_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.mean_intensity) as mean_intensity_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.mean_intensity, 2)) as mean_intensity_mode,
-               -- Equivalent diameter statistics
-               AVG(ef.equivalent_diameter) as equivalent_diameter_mean,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ef.equivalent_diameter) as equivalent_diameter_median,
-               MODE() WITHIN GROUP (ORDER BY ROUND(ef.equivalent_diameter, 2)) as equivalent_diameter_mode
-        FROM extracted_features ef
-        JOIN predictions p ON ef.prediction_id = p.id
-        JOIN images ON p.image_id = images.id
-        JOIN locations l ON images.location_id = l.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        
-        # Apply filters if needed
-        if location_id or role or year:
-            total_predictions_query += " WHERE"
-            confidence_stats_query += " WHERE"
-            features_stats_query += " WHERE"
-            
-            conditions = []
-            params = []
-            if location_id:
-                conditions.append(" images.location_id = %s")
-                params.append(location_id)
-            if role:
-                conditions.append(" roles.name = %s")
-                params.append(role)
-            if year:
-                conditions.append(" EXTRACT(YEAR FROM images.upload_date) = %s")
-                params.append(year)
-            
-            condition_str = " AND".join(conditions)
-            total_predictions_query += condition_str
-            confidence_stats_query += condition_str
-            features_stats_query += condition_str
-            
-            cursor.execute(total_predictions_query, params)
-            total_predictions = cursor.fetchone()
-            cursor.execute(confidence_stats_query, params)
-            confidence_stats = cursor.fetchone()
-            cursor.execute(features_stats_query + " GROUP BY images.location_id, l.name", params)
-            features_stats = cursor.fetchall()
-        else:
-            cursor.execute(total_predictions_query)
-            total_predictions = cursor.fetchone()
-            cursor.execute(confidence_stats_query)
-            confidence_stats = cursor.fetchone()
-            cursor.execute(features_stats_query + " GROUP BY images.location_id, l.name")
-            features_stats = cursor.fetchall()
-        
-        # Process feature statistics data
-        feature_stats_data = {}
-        feature_names = [
-            'area', 'perimeter', 'major_axis_length', 'minor_axis_length', 
-            'extent', 'eccentricity', 'convex_area', 'solidity', 
-            'mean_intensity', 'equivalent_diameter'
-        ]
-        
-        for feature in feature_names:
-            feature_stats_data[feature] = {
-                'mean': [],
-                'median': [], 
-                'mode': []
-            }
-        
-        for row in features_stats:
-            location_id_stats = row[0]
-            farm_name = row[1] if row[1] else f'Farm {location_id_stats}'
-            for i, feature in enumerate(feature_names):
-                mean_idx = 2 + (i * 3)
-                median_idx = 3 + (i * 3)
-                mode_idx = 4 + (i * 3)
-                
-                feature_stats_data[feature]['mean'].append({
-                    'farm': farm_name,
-                    'value': float(row[mean_idx]) if row[mean_idx] is not None else 0
-                })
-                feature_stats_data[feature]['median'].append({
-                    'farm': farm_name,
-                    'value': float(row[median_idx]) if row[median_idx] is not None else 0
-                })
-                feature_stats_data[feature]['mode'].append({
-                    'farm': farm_name,
-                    'value': float(row[mode_idx]) if row[mode_idx] is not None else 0
-                })
+        cursor.execute(confidence_stats_query, params)
+        confidence_stats = cursor.fetchone()
 
-        # Feature Correlations
+        # Per-farm feature statistics, the correlation matrix and the
+        # histograms are cached per filter combination and recomputed in the
+        # background (services/analytics_engine.py)
+        bean_summary = feature_summary_cache.get(location_id, role, year, month)
+        feature_stats_data = bean_summary['feature_stats']
 
-        # Correlation Matrix for Bean Features
-        features_query = """
-        SELECT ef.major_axis_length, ef.minor_axis_length, ef.perimeter, ef.area, ef.solidity, 
-               ef.extent, ef.eccentricity, ef.mean_intensity, ef.convex_area, ef.equivalent_diameter
-        FROM extracted_features ef 
-        JOIN predictions p ON ef.prediction_id = p.id
-        JOIN images ON p.image_id = images.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        
-        if location_id or role or year:
-            features_query += " WHERE"
-            conditions = []
-            params = []
-            if location_id:
-                conditions.append(" images.location_id = %s")
-                params.append(location_id)
-            if role:
-                conditions.append(" roles.name = %s")
-                params.append(role)
-            if year:
-                conditions.append(" EXTRACT(YEAR FROM images.upload_date) = %s")
-                params.append(year)
-            features_query += " AND".join(conditions)
-            cursor.execute(features_query, params)
-        else:
-            cursor.execute(features_query)
-        
-        features_data = cursor.fetchall()
-
-        # Create DataFrame for correlation calculation
-        feature_columns = [
-            'major_axis_length', 'minor_axis_length', 'perimeter', 'area', 'solidity',
-            'extent', 'eccentricity', 'mean_intensity', 'convex_area', 'equivalent_diameter'
-        ]
-        
-        corr_feats = []
-        if features_data:
-            df = pd.DataFrame(features_data, columns=feature_columns)
-            print(f"DataFrame shape: {df.shape}")
-            print(f"Features data length: {len(features_data)}")
-            print(df.head())
-            corr = df.corr()
-            print(f"Correlation matrix shape: {corr.shape}")
-            print(corr)
-            
-            # Convert to a JSON structure usable by frontend
-            for row_var in corr.index:
-                row_data = {
-                    "id": row_var,
-                    "data": [{"x": col_var, "y": float(corr.at[row_var, col_var])} for col_var in corr.columns]
-                }
-                corr_feats.append(row_data)
-            print(corr_feats)
-        
+        # Feature Correlations
+        corr_feats = bean_summary['correlations']
 
         # Aspect Ratio and Roundness (Checking for Patterns in Bean Shapes)
-        cursor.execute(beans_features, [location_id, role, year])
-        beans_features = cursor.fetchall()
-        scatter_ratio_roundness = []
-
-        for bean in beans_features:
-            scatter_ratio_roundness.append({
-                "aspect_ratio": float(bean[0]) / float(bean[1]) if bean[1] != 0 else 0,
-                "roundness": (4 * 3.1416 * float(bean[3])) / (float(bean[2]) ** 2) if bean[2] != 0 else 0
-            })
-        
-        # Histogram
-        bin_size = 0.1
-        aspect_ratios = [d["aspect_ratio"] for d in scatter_ratio_roundness]
-        roundnesses = [d["roundness"] for d in scatter_ratio_roundness]
-
-        hist_aspect = make_histogram(aspect_ratios, bin_size=0.1)
-        hist_roundness = make_histogram(roundnesses, bin_size=0.05)
-        
-        # Raw feature data for boxplot analysis (all records) grouped by farm
-        raw_features_query = """
-        SELECT images.location_id, l.name as farm_name,
-               ef.area, ef.perimeter, ef.major_axis_length, ef.minor_axis_length, 
-               ef.extent, ef.eccentricity, ef.solidity, ef.mean_intensity,
-               ef.convex_area, ef.equivalent_diameter
-        FROM extracted_features ef 
-        JOIN predictions p ON ef.prediction_id = p.id
-        JOIN images ON p.image_id = images.id
-        JOIN locations l ON images.location_id = l.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        """
-        
-        if location_id or role or year:
-            raw_features_query += " WHERE"
-            conditions = []
-            params = []
-            if location_id:
-                conditions.append(" images.location_id = %s")
-                params.append(location_id)
-            if role:
-                conditions.append(" roles.name = %s")
-                params.append(role)
-            if year:
-                conditions.append(" EXTRACT(YEAR FROM images.upload_date) = %s")
-                params.append(year)
-            raw_features_query += " AND".join(conditions)
+        # The scatter reads bounded reservoir samples stratified by the cube
+        # keys, fed with new beans in the background (scatter_refresher)
+        scatter_refresher.start()
+        scatter_ratio_roundness = get_scatter_sample(location_id=location_id, role=role, year=year, month=month)
+
+        hist_aspect = bean_summary['hist_aspect']
+        hist_roundness = bean_summary['hist_roundness']
+        
+        # Boxplot data grouped by farm. By default only five-number summaries
+        # plus a capped sample of outliers are sent; ?raw=true keeps the old
+        # payload with every bean's values.
+        boxplot_features_by_farm = None
+        boxplot_summary = None
+        boxplot_overall = None
+        if raw:
+            # Raw feature data for boxplot analysis (all records) grouped by farm
+            raw_features_query = f"""
+            SELECT images.location_id, l.name as farm_name,
+                   ef.area, ef.perimeter, ef.major_axis_length, ef.minor_axis_length, 
+                   ef.extent, ef.eccentricity, ef.solidity, ef.mean_intensity,
+                   ef.convex_area, ef.equivalent_diameter
+            FROM extracted_features ef 
+            JOIN predictions p ON ef.prediction_id = p.id
+            JOIN images ON p.image_id = images.id
+            JOIN locations l ON images.location_id = l.id
+            {where_clause}
+            """
             cursor.execute(raw_features_query, params)
-        else:
-            cursor.execute(raw_features_query)
-        
-        raw_features = cursor.fetchall()
-        
-        # Structure raw features for boxplot grouped by farm
-        # Format: { 'area': { 'Farm 1': [values], 'Farm 2': [values] }, ... }
-        boxplot_features_by_farm = {}
-        feature_names = [
-            'area', 'perimeter', 'major_axis_length', 'minor_axis_length',
-            'extent', 'eccentricity', 'solidity', 'mean_intensity',
-            'convex_area', 'equivalent_diameter'
-        ]
-        
-        for feature in feature_names:
-            boxplot_features_by_farm[feature] = {}
-        
-        for row in raw_features:
-            farm_id = row[0]
-            farm_name = row[1] if row[1] else f"Farm {farm_id}"
             
-            # Initialize farm arrays if not exists
-            for feature in feature_names:
-                if farm_name not in boxplot_features_by_farm[feature]:
-                    boxplot_features_by_farm[feature][farm_name] = []
+            raw_features = cursor.fetchall()
             
-            # Add values to respective feature arrays (indices 2-11)
-            boxplot_features_by_farm['area'][farm_name].append(float(row[2]) if row[2] is not None else 0)
-            boxplot_features_by_farm['perimeter'][farm_name].append(float(row[3]) if row[3] is not None else 0)
-            boxplot_features_by_farm['major_axis_length'][farm_name].append(float(row[4]) if row[4] is not None else 0)
-            boxplot_features_by_farm['minor_axis_length'][farm_name].append(float(row[5]) if row[5] is not None else 0)
-            boxplot_features_by_farm['extent'][farm_name].append(float(row[6]) if row[6] is not None else 0)
-            boxplot_features_by_farm['eccentricity'][farm_name].append(float(row[7]) if row[7] is not None else 0)
-            boxplot_features_by_farm['solidity'][farm_name].append(float(row[8]) if row[8] is not None else 0)
-            boxplot_features_by_farm['mean_intensity'][farm_name].append(float(row[9]) if row[9] is not None else 0)
-            boxplot_features_by_farm['convex_area'][farm_name].append(float(row[10]) if row[10] is not None else 0)
-            boxplot_features_by_farm['equivalent_diameter'][farm_name].append(float(row[11]) if row[11] is not None else 0)
+            # Structure raw features for boxplot grouped by farm
+            # Format: { 'area': { 'Farm 1': [values], 'Farm 2': [values] }, ... }
+            boxplot_features_by_farm = {}
+            feature_names = [
+                'area', 'perimeter', 'major_axis_length', 'minor_axis_length',
+                'extent', 'eccentricity', 'solidity', 'mean_intensity',
+                'convex_area', 'equivalent_diameter'
+            ]
             
+            for feature in feature_names:
+                boxplot_features_by_farm[feature] = {}
+            
+            for row in raw_features:
+                farm_id = row[0]
+                farm_name = row[1] if row[1] else f"Farm {farm_id}"
+                
+                # Initialize farm arrays if not exists
+                for feature in feature_names:
+                    if farm_name not in boxplot_features_by_farm[feature]:
+                        boxplot_features_by_farm[feature][farm_name] = []
+                
+                # Add values to respective feature arrays (indices 2-11)
+                boxplot_features_by_farm['area'][farm_name].append(float(row[2]) if row[2] is not None else 0)
+                boxplot_features_by_farm['perimeter'][farm_name].append(float(row[3]) if row[3] is not None else 0)
+                boxplot_features_by_farm['major_axis_length'][farm_name].append(float(row[4]) if row[4] is not None else 0)
+                boxplot_features_by_farm['minor_axis_length'][farm_name].append(float(row[5]) if row[5] is not None else 0)
+                boxplot_features_by_farm['extent'][farm_name].append(float(row[6]) if row[6] is not None else 0)
+                boxplot_features_by_farm['eccentricity'][farm_name].append(float(row[7]) if row[7] is not None else 0)
+                boxplot_features_by_farm['solidity'][farm_name].append(float(row[8]) if row[8] is not None else 0)
+                boxplot_features_by_farm['mean_intensity'][farm_name].append(float(row[9]) if row[9] is not None else 0)
+                boxplot_features_by_farm['convex_area'][farm_name].append(float(row[10]) if row[10] is not None else 0)
+                boxplot_features_by_farm['equivalent_diameter'][farm_name].append(float(row[11]) if row[11] is not None else 0)
+        else:
+            boxplot_summary, boxplot_overall = summarize_boxplot_features(cursor, location_id, role, year, month)
+
         # Calculate size thresholds based on area
         cursor.execute("""
             SELECT 
@@ -824,9 +552,6 @@ def render_admin_dashboard(request):
             FROM extracted_features ef
             JOIN predictions p ON ef.prediction_id = p.id
             JOIN images ON p.image_id = images.id
-            JOIN users ON images.location_id = users.location_id
-            JOIN user_roles ON users.id = user_roles.user_id
-            JOIN roles ON user_roles.role_id = roles.id
         """)
         thresholds = cursor.fetchone()
         p33_area = thresholds[0] if thresholds and thresholds[0] else 200.0
@@ -837,7 +562,15 @@ def render_admin_dashboard(request):
         # Grouped by farm for detailed analysis
         # Shape formula: aspect_ratio < 1.3 AND eccentricity < 0.6 AND extent > 0.75 = Round
         # Size classification based on area
-        shape_size_dist_query = """
+        shape_conditions = [
+            "ef.major_axis_length IS NOT NULL",
+            "ef.minor_axis_length IS NOT NULL",
+            "ef.minor_axis_length > 0",
+            "ef.eccentricity IS NOT NULL",
+            "ef.extent IS NOT NULL",
+            "ef.area IS NOT NULL",
+        ] + conditions
+        shape_size_dist_query = f"""
         SELECT 
             l.name as farm_name,
             CASE 
@@ -856,35 +589,11 @@ def render_admin_dashboard(request):
         JOIN predictions p ON ef.prediction_id = p.id
         JOIN images ON p.image_id = images.id
         JOIN locations l ON images.location_id = l.id
-        JOIN users ON images.location_id = users.location_id
-        JOIN user_roles ON users.id = user_roles.user_id
-        JOIN roles ON user_roles.role_id = roles.id
-        WHERE ef.major_axis_length IS NOT NULL 
-          AND ef.minor_axis_length IS NOT NULL 
-          AND ef.minor_axis_length > 0
-          AND ef.eccentricity IS NOT NULL
-          AND ef.extent IS NOT NULL
-          AND ef.area IS NOT NULL
+        WHERE {' AND '.join(shape_conditions)}
+        GROUP BY l.name, size_category, shape_category
+        ORDER BY l.name, size_category, shape_category
         """
-        
-        if location_id or role or year:
-            conditions = []
-            params = [p33_area, p33_area, p67_area]
-            if location_id:
-                conditions.append(" AND images.location_id = %s")
-                params.append(location_id)
-            if role:
-                conditions.append(" AND roles.name = %s")
-                params.append(role)
-            if year:
-                conditions.append(" AND EXTRACT(YEAR FROM images.upload_date) = %s")
-                params.append(year)
-            shape_size_dist_query += "".join(conditions)
-            shape_size_dist_query += " GROUP BY l.name, size_category, shape_category ORDER BY l.name, size_category, shape_category"
-            cursor.execute(shape_size_dist_query, params)
-        else:
-            shape_size_dist_query += " GROUP BY l.name, size_category, shape_category ORDER BY l.name, size_category, shape_category"
-            cursor.execute(shape_size_dist_query, [p33_area, p33_area, p67_area])
+        cursor.execute(shape_size_dist_query, [p33_area, p33_area, p67_area] + params)
         
         shape_size_results = cursor.fetchall()
         
@@ -946,23 +655,24 @@ def render_admin_dashboard(request):
 
         # Data to be returned
         data = {
-            "uploads": uploads[0][0] if uploads[0][0] is not None else 0,
+            "uploads": cube["uploads"],
             "users": users[0][0] if users[0][0] is not None else 0,
-            "validated": validated[0][0] if validated[0][0] is not None else 0,
-            "pending": unvalidated[0][0] if unvalidated[0][0] is not None else 0,
-            "bean_types": bean_type_data,
+            "validated": cube["validated"],
+            "pending": cube["pending"],
+            "bean_types": cube["bean_types"],
             "top_uploaders": top_uploader_data,
-            "farms": farm_data,
+            "farms": cube["farms"],
             "scatter_ratio_roundness" : scatter_ratio_roundness,
             "hist_aspect": hist_aspect,
             "hist_roundness": hist_roundness,
             "corr_feats": corr_feats,
-            "total_predictions": total_predictions[0] if total_predictions[0] is not None else 0,
+            "total_predictions": cube["total_predictions"],
             "avg_confidence": float(confidence_stats[0]) if confidence_stats[0] is not None else 0,
             "min_confidence": float(confidence_stats[1]) if confidence_stats[1] is not None else 0,
             "max_confidence": float(confidence_stats[2]) if confidence_stats[2] is not None else 0,
             "feature_stats": feature_stats_data,
-            "boxplot_features": boxplot_features_by_farm,
+            "boxplot_summary": boxplot_summary,
+            "boxplot_overall": boxplot_overall,
             "shape_size_distribution": shape_size_dist_by_farm,
             "shape_size_farm_names": farm_names,
             "size_thresholds": {
@@ -972,8 +682,17 @@ def render_admin_dashboard(request):
                 "large_min": round(p67_area, 2)
             },
             "db_size": data_db_size,
-            "img_bucket": data_img_bucket
+            "img_bucket": data_img_bucket,
+            "filters": {
+                "location_id": location_id,
+                "role": role,
+                "year": year,
+                "month": month
+            },
+            "cube_refreshed_at": cube["refreshed_at"]
         }
+        if raw:
+            data["boxplot_features"] = boxplot_features_by_farm
 
 
     return JsonResponse({'data': (data)})
@@ -982,7 +701,8 @@ def render_admin_dashboard(request):
 @api_view(['GET', 'POST'])
 def system_status(request):
     """
-    GET: Return system status including uptime, Supabase status, and payment plan
+    GET: Return the latest system status snapshot (uptime, Supabase status,
+         payment plan) kept fresh by services.health_poller
     POST: Update payment plan information
     """
     if request.method == 'POST':
@@ -1032,6 +752,8 @@ def system_status(request):
                             current_bill = %s,
                             updated_at = NOW()
                     """, [plan_type, end_date, current_bill])
+            # Have the poller pick up the new plan right away
+            health_poller.request_refresh()
             
             return JsonResponse({
                 'status': 'success',
@@ -1047,150 +769,130 @@ def system_status(request):
                 'status': 'error',
                 'message': f'Failed to update plan: {str(e)}'
             }, status=500)
-    # GET request - return system status
-    try:
-        with connection.cursor() as cursor:
-            # 1. System Uptime - check database uptime
-            cursor.execute("SELECT pg_postmaster_start_time() as uptime;")
-            uptime_result = cursor.fetchone()
-            
-            if uptime_result and uptime_result[0]:
-                uptime_start = uptime_result[0]
-                current_time = timezone.now()
-                # Convert to timezone-aware datetime if needed
-                if uptime_start.tzinfo is None:
-                    uptime_start = timezone.make_aware(uptime_start)
-                
-                uptime_delta = current_time - uptime_start
-                uptime_days = uptime_delta.days
-                uptime_str = f"{uptime_days} days"
-            else:
-                uptime_str = "Unknown"
-        
-        # 2. Supabase Status - check external API
-        try:
-            response = requests.get('https://status.supabase.com/api/v2/summary.json', timeout=10)
-            if response.status_code == 200:
-                status_data = response.json()
-                
-                # Check overall status
-                overall_status = status_data.get('status', {}).get('indicator', 'unknown')
-                
-                # Check specific components (Database and Storage)
-                components = status_data.get('components', [])
-                database_status = 'unknown'
-                storage_status = 'unknown'
-                
-                for component in components:
-                    if 'database' in component.get('name', '').lower():
-                        database_status = component.get('status', 'unknown')
-                    elif 'storage' in component.get('name', '').lower():
-                        storage_status = component.get('status', 'unknown')
-                
-                # Get last update
-                last_update = status_data.get('page', {}).get('updated_at', '')
-                if last_update:
-                    try:
-                        last_update_dt = datetime.fromisoformat(last_update.replace('Z', '+00:00'))
-                        last_update_str = last_update_dt.strftime('%Y-%m-%d %H:%M UTC')
-                    except:
-                        last_update_str = last_update
-                else:
-                    last_update_str = 'Unknown'
-                    
-            else:
-                overall_status = 'unknown'
-                database_status = 'unknown'
-                storage_status = 'unknown'
-                last_update_str = 'Failed to fetch'
-                
-        except Exception as e:
-            print(f"Error fetching Supabase status: {e}")
-            overall_status = 'unknown'
-            database_status = 'unknown'
-            storage_status = 'unknown'
-            last_update_str = 'API unavailable'
-        
-        # 3. Payment Plan Status - get from database
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                SELECT plan_type, end_date, current_bill, 
-                    CASE 
-                    WHEN end_date IS NOT NULL AND end_date > NOW() 
-                    THEN EXTRACT(DAY FROM (end_date - NOW()))::INTEGER
-                    ELSE NULL
-                    END as days_remaining
-                FROM public.plans 
-                ORDER BY updated_at DESC 
-                LIMIT 1
-                """)
-                plan_result = cursor.fetchone()
-                print(f"Plan result: {plan_result}")
-            
-            if plan_result:
-                payment_plan = {
-                    'plan_type': plan_result[0] if plan_result[0] else 'free',
-                    'end_date': plan_result[1].isoformat() if plan_result[1] else None,
-                    'current_bill': float(plan_result[2]) if plan_result[2] else 0,
-                    'days_remaining': int(plan_result[3]) if plan_result[3] else None
-                }
-            else:
-                # No plan found, create default free plan
-                cursor.execute("""
-                    INSERT INTO public.plans (plan_type, end_date, current_bill, created_at, updated_at)
-                    VALUES ('free', NULL, 0, NOW(), NOW())
-                """)
-                payment_plan = {
-                    'plan_type': 'free',
-                    'end_date': None,
-                    'current_bill': 0,
-                    'days_remaining': None
-                }
-        except Exception as e:
-            print(f"Error fetching payment plan: {e}")
-            # Fallback to free plan if database error
-            payment_plan = {
-            'plan_type': 'free',
-            'end_date': None,
-            'current_bill': 0,
-            'days_remaining': None
-            }
-        
-        # For demo, you could store this in a simple model or settings
-        # Here we'll just return mock data
-        
-        return JsonResponse({
-            'systemUptime': uptime_str,
-            'serverStatus': overall_status,
-            'databaseStatus': database_status,
-            'storageStatus': storage_status,
-            'lastBackup': last_update_str,
-            'activeSubscriptions': 1,
-            'paymentPlan': payment_plan
-        })
-        
-    except Exception as e:
-        print(f"Error in system_status view: {e}")
-        return JsonResponse({
-            'error': 'Failed to fetch system status',
-            'systemUptime': 'Unknown',
-            'serverStatus': 'unknown',
-            'databaseStatus': 'unknown', 
-            'storageStatus': 'unknown',
-            'lastBackup': 'Unknown',
-            'activeSubscriptions': 0,
-            'paymentPlan': {
-                'plan_type': 'free',
-                'end_date': None,
-                'current_bill': 0,
-                'days_remaining': None
-            }
-        }, status=500)
+    # GET request - return the latest snapshot from the background poller
+    return JsonResponse(health_poller.snapshot())
 
 def make_histogram(data, bin_size):
     # Round each value to nearest bin (like 1.1, 1.2, etc.)
     bins = [round(math.floor(x / bin_size) * bin_size, 2) for x in data]
     counts = Counter(bins)
     # Turn into list of {bin, count} for Recharts
-    return [{"value": b, "count": c} for b, c in sorted(counts.items())]
\ No newline at end of file
+    return [{"value": b, "count": c} for b, c in sorted(counts.items())]
+
+
+BOXPLOT_FEATURES = [
+    'area', 'perimeter', 'major_axis_length', 'minor_axis_length',
+    'extent', 'eccentricity', 'solidity', 'mean_intensity',
+    'convex_area', 'equivalent_diameter'
+]
+# Max outliers returned per farm and feature; the rest are only counted
+BOXPLOT_OUTLIER_CAP = 25
+
+def summarize_boxplot_features(cursor, location_id=None, role=None, year=None, month=None, outlier_cap=BOXPLOT_OUTLIER_CAP):
+    """
+    Per-farm, per-feature boxplot summaries computed in the database with
+    PERCENTILE_CONT arrays, so the payload grows with farms x features
+    instead of with the number of beans. Every bean is also counted once
+    more under location 0, which gives the all-farms summary in the same
+    pass.
+    Returns (summary, overall):
+    summary = { 'area': { 'Farm 1': {count, min, q1, median, q3, max, mean,
+    sd, whisker_low, whisker_high, outlier_count, outliers}, ... }, ... }
+    overall = { 'area': {count, min, ...}, ... }
+    """
+    conditions, params = dashboard_filters(location_id, role, year, month)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    feature_values = ", ".join(f"('{feature}', b.{feature})" for feature in BOXPLOT_FEATURES)
+    feature_columns = ", ".join(f"ef.{feature}" for feature in BOXPLOT_FEATURES)
+
+    cursor.execute(f"""
+        WITH beans AS (
+            SELECT images.location_id, l.name AS farm_name, {feature_columns}
+            FROM extracted_features ef
+            JOIN predictions p ON ef.prediction_id = p.id
+            JOIN images ON p.image_id = images.id
+            JOIN locations l ON images.location_id = l.id
+            {where_clause}
+        ),
+        long AS (
+            SELECT g.location_id, g.farm_name, f.feature, f.value::float8 AS value
+            FROM beans b
+            CROSS JOIN LATERAL (VALUES {feature_values}) AS f(feature, value)
+            CROSS JOIN LATERAL (VALUES (b.location_id, b.farm_name), (0, NULL)) AS g(location_id, farm_name)
+            WHERE f.value IS NOT NULL
+        ),
+        stats AS (
+            SELECT location_id, farm_name, feature,
+                   COUNT(*) AS n,
+                   MIN(value) AS min_value,
+                   MAX(value) AS max_value,
+                   AVG(value) AS mean_value,
+                   STDDEV_POP(value) AS sd_value,
+                   PERCENTILE_CONT(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY value) AS quartiles
+            FROM long
+            GROUP BY location_id, farm_name, feature
+        ),
+        fenced AS (
+            SELECT l.location_id, l.feature, l.value,
+                   s.quartiles[2] AS median,
+                   s.quartiles[1] - 1.5 * (s.quartiles[3] - s.quartiles[1]) AS low_fence,
+                   s.quartiles[3] + 1.5 * (s.quartiles[3] - s.quartiles[1]) AS high_fence
+            FROM long l
+            JOIN stats s ON s.location_id = l.location_id AND s.feature = l.feature
+        ),
+        whiskers AS (
+            SELECT location_id, feature,
+                   MIN(value) FILTER (WHERE value >= low_fence) AS whisker_low,
+                   MAX(value) FILTER (WHERE value <= high_fence) AS whisker_high,
+                   COUNT(*) FILTER (WHERE value < low_fence OR value > high_fence) AS outlier_count
+            FROM fenced
+            GROUP BY location_id, feature
+        ),
+        outliers AS (
+            SELECT location_id, feature, ARRAY_AGG(value ORDER BY value) AS outlier_values
+            FROM (
+                SELECT location_id, feature, value,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY location_id, feature
+                           ORDER BY ABS(value - median) DESC
+                       ) AS rn
+                FROM fenced
+                WHERE value < low_fence OR value > high_fence
+            ) ranked
+            WHERE rn <= %s
+            GROUP BY location_id, feature
+        )
+        SELECT s.location_id, s.farm_name, s.feature, s.n,
+               s.min_value, s.quartiles, s.max_value, s.mean_value, s.sd_value,
+               w.whisker_low, w.whisker_high, w.outlier_count, o.outlier_values
+        FROM stats s
+        JOIN whiskers w ON w.location_id = s.location_id AND w.feature = s.feature
+        LEFT JOIN outliers o ON o.location_id = s.location_id AND o.feature = s.feature
+        ORDER BY s.farm_name, s.feature
+    """, params + [outlier_cap])
+
+    summary = {feature: {} for feature in BOXPLOT_FEATURES}
+    overall = {}
+    for (farm_id, farm_name, feature, count, min_value, quartiles, max_value, mean_value, sd_value,
+         whisker_low, whisker_high, outlier_count, outlier_values) in cursor.fetchall():
+        q1, median, q3 = quartiles
+        stats = {
+            "count": int(count),
+            "min": float(min_value),
+            "q1": float(q1),
+            "median": float(median),
+            "q3": float(q3),
+            "max": float(max_value),
+            "mean": float(mean_value),
+            "sd": float(sd_value),
+            "whisker_low": float(whisker_low) if whisker_low is not None else float(min_value),
+            "whisker_high": float(whisker_high) if whisker_high is not None else float(max_value),
+            "outlier_count": int(outlier_count),
+            "outliers": [float(value) for value in (outlier_values or [])],
+        }
+        if farm_id == 0:
+            overall[feature] = stats
+        else:
+            summary[feature][farm_name if farm_name else f"Farm {farm_id}"] = stats
+    return summary, overall
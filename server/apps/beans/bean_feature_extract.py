@@ -1,53 +1,128 @@
-import cv2, os
+import cv2, os, time
 import numpy as np
+from functools import cached_property
 from skimage.measure import label, regionprops
-from ultralytics import YOLO
-from skimage import color, filters, morphology, measure, segmentation, util
+from skimage import filters, morphology, measure, segmentation
 from scipy import ndimage as ndi
 from skimage.feature import peak_local_max
 
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-MODEL = os.path.join(current_dir, "my_model", "cv_yolov11.pt")
+from django.conf import settings
+from services.metrics import observe_stage, stage_timer
+from .detectors import detect_tiled
+from .image_io import to_gray
+from .model_registry import get_detector
+
+
+def intensity_scale(gray):
+    """mean_intensity has always been stored on rgb2gray's 0-1 scale."""
+    return 1 / 255 if gray.dtype == np.uint8 else 1.0
+
+
+class PipelineResult:
+    """
+    Output of one pipeline run. Only the segmentation mask and the denoised
+    uint8 gray plane are computed up front; bean boxes, features, the masked
+    image and the debug overlay are built the first time they are read, so
+    callers only pay for what they use.
+
+    mm_per_px is the calibration the pipeline ran with; everything derived
+    later uses it rather than anything on the (shared) extractor.
+    """
+
+    def __init__(self, extractor, img, mask, gray, predictions, mm_per_px, beans=None, bean_bboxes=None):
+        self.extractor = extractor
+        self.img = img
+        self.mask = mask
+        self.gray = gray
+        self.predictions = predictions
+        self.mm_per_px = mm_per_px
+        if beans is not None:
+            self.__dict__['beans'] = beans
+        if bean_bboxes is not None:
+            self.__dict__['bean_bboxes'] = bean_bboxes
+
+    @cached_property
+    def props(self):
+        return regionprops(label(self.mask), intensity_image=self.gray)
+
+    @cached_property
+    def bean_bboxes(self):
+        bboxes = []
+        for prop in self.props:
+            if prop.area > 100:
+                minr, minc, maxr, maxc = prop.bbox
+                bboxes.append((minc, minr, maxc - minc, maxr - minr))
+        return bboxes
+
+    @cached_property
+    def beans(self):
+        """Same list extract_features_for_all_beans returns."""
+        with stage_timer('features'):
+            return self.extractor.features_from_props(self.props, self.gray, self.mm_per_px)
+
+    @cached_property
+    def masked_image(self):
+        """The photo with everything but the segmented beans blacked out."""
+        if self.mask is None:
+            return None
+        black_bg = np.zeros_like(self.img)
+        black_bg[self.mask == 255] = self.img[self.mask == 255]
+        return black_bg
+
+    @cached_property
+    def debug_overlay(self):
+        return self.extractor.draw_bbox(self.img, self.bean_bboxes, self.mm_per_px)
+
+
 class BeanFeatureExtractor:
     def __init__(self, marker_length=20):
         """
         marker_length: physical side length of the ArUco marker in mm.
+
+        One extractor is shared by every request in the process
+        (model_registry), so it holds no per-image state: the calibration
+        from extract_mm_per_px is passed explicitly to each step.
         """
-        self.mm_per_px = None
         self.marker_length = marker_length
-        self.model = YOLO(MODEL)
+
+    @property
+    def detector(self):
+        # Loaded (once per process) on the first detection, not at construction
+        return get_detector()
 
     # ---------- Calibration ----------
     def extract_mm_per_px(self, img):
-        try:
-            aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-            parameters = cv2.aruco.DetectorParameters()
-            detector = cv2.aruco.ArucoDetector(aruco_dict, parameters)
-            corners, ids, _ = detector.detectMarkers(img)
-            img_debug = img.copy()
-
-            if ids is not None and len(corners) > 0:
-                c = corners[0][0]
-                cv2.polylines(img_debug, [np.int32(c)], True, (0, 255, 0), 2)
-
-                side_lengths = [
-                    np.linalg.norm(c[0] - c[1]),
-                    np.linalg.norm(c[1] - c[2]),
-                    np.linalg.norm(c[2] - c[3]),
-                    np.linalg.norm(c[3] - c[0]),
-                ]
-                avg_side_px = np.mean(side_lengths)
-                self.mm_per_px = self.marker_length / avg_side_px
-
-                h, w = img.shape[:2]
-                h_mm = h * self.mm_per_px
-                w_mm = w * self.mm_per_px
-                return (img_debug, h_mm, w_mm)
-            else:
+        """(img_debug, h_mm, w_mm, mm_per_px) for the image's ArUco marker, or False."""
+        with stage_timer('calibration'):
+            try:
+                aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+                parameters = cv2.aruco.DetectorParameters()
+                detector = cv2.aruco.ArucoDetector(aruco_dict, parameters)
+                corners, ids, _ = detector.detectMarkers(img)
+                img_debug = img.copy()
+
+                if ids is not None and len(corners) > 0:
+                    c = corners[0][0]
+                    cv2.polylines(img_debug, [np.int32(c)], True, (0, 255, 0), 2)
+
+                    side_lengths = [
+                        np.linalg.norm(c[0] - c[1]),
+                        np.linalg.norm(c[1] - c[2]),
+                        np.linalg.norm(c[2] - c[3]),
+                        np.linalg.norm(c[3] - c[0]),
+                    ]
+                    avg_side_px = np.mean(side_lengths)
+                    mm_per_px = self.marker_length / avg_side_px
+
+                    h, w = img.shape[:2]
+                    h_mm = h * mm_per_px
+                    w_mm = w * mm_per_px
+                    return (img_debug, h_mm, w_mm, mm_per_px)
+                else:
+                    return False
+            except Exception:
                 return False
-        except Exception:
-            return False
 
     # ---------- Watershed helper ----------
     def apply_watershed(self, img, mask):
@@ -75,22 +150,25 @@ class BeanFeatureExtractor:
         return segmented_mask, labels_ws
 
     # ---------- Preprocessing ----------
-    def preprocess_image(self, img):
-        # Step 0: Grayscale + scale-aware denoising
-        gray = color.rgb2gray(img)
+    def preprocess_image(self, img, gray=None, mm_per_px=None):
+        # Step 0: Grayscale + scale-aware denoising. Works on a uint8 plane
+        # (image_io.to_gray) instead of a float64 copy of the image
+        if gray is None:
+            gray = to_gray(img)
 
         # Define blur radius in mm (tunable)
         blur_radius_mm = 0.5
 
-        if self.mm_per_px is not None:
+        if mm_per_px is not None:
             # convert to pixels, ensure at least 1
-            blur_radius_px = max(1, int(round(blur_radius_mm / self.mm_per_px)))
+            blur_radius_px = max(1, int(round(blur_radius_mm / mm_per_px)))
         else:
             # fallback if not calibrated
             blur_radius_px = 5
 
-        gray_denoised = filters.median(gray, morphology.disk(blur_radius_px))
-        gray_uint8 = util.img_as_ubyte(gray_denoised)
+        with stage_timer('denoise'):
+            gray_denoised = filters.median(gray, morphology.disk(blur_radius_px))
+        gray_uint8 = gray_denoised
 
 
         # Mask out ArUco markers if found
@@ -108,27 +186,16 @@ class BeanFeatureExtractor:
 
         # Step 1: YOLO coarse mask
         bean_mask = np.zeros_like(gray_uint8, dtype=np.uint8)
-        predictions = []
-        results = self.model(img, conf=0.6)
-        for result in results:
-            # Print confidence level of each result in results
-            print(f"Result: {result.boxes.conf.tolist()}")
-            if result.boxes is not None:
-              for box in result.boxes:
-                  x1, y1, x2, y2 = map(int, box.xyxy[0])
-                  confidence = float(box.conf[0])
-                  class_id = int(box.cls[0])
-
-                  predictions.append({
-                      "bbox": (x1, y1, x2, y2),
-                      "confidence": confidence,
-                      "class_id": class_id
-                  })
-                  bean_mask[y1:y2, x1:x2] = 255
+        with stage_timer('yolo'):
+            predictions = self.detector.detect(img, conf=0.6)
+        for prediction in predictions:
+            x1, y1, x2, y2 = prediction["bbox"]
+            bean_mask[y1:y2, x1:x2] = 255
         # Apply ArUco mask
         bean_mask = cv2.bitwise_and(bean_mask, aruco_mask)
 
         # Step 2: Refine each YOLO box individually
+        refine_started = time.perf_counter()
         refined_mask = np.zeros_like(bean_mask)
         labeled_boxes = measure.label(bean_mask)
         for region in measure.regionprops(labeled_boxes):
@@ -148,47 +215,187 @@ class BeanFeatureExtractor:
             roi_mask = morphology.closing(roi_mask, morphology.square(5))
 
             refined_mask[minr:maxr, minc:maxc] = roi_mask
+        observe_stage('refine', time.perf_counter() - refine_started)
 
         # Step 3: Watershed segmentation
-        segmented_mask, markers = self.apply_watershed(img, refined_mask)
+        with stage_timer('watershed'):
+            segmented_mask, markers = self.apply_watershed(img, refined_mask)
 
-        # Step 4: Compute bean bboxes from refined mask
-        bean_bboxes = []
-        labeled = measure.label(segmented_mask)
-        props = measure.regionprops(labeled)
-        for prop in props:
-            if prop.area > 100:
-                minr, minc, maxr, maxc = prop.bbox
-                bean_bboxes.append((minc, minr, maxc - minc, maxr - minr))
+        # Steps 4-5 (bean bboxes, features, visualizations) happen on demand
+        return PipelineResult(self, img, segmented_mask, gray_denoised, predictions, mm_per_px)
 
-        # Step 5: Visualization mask
-        black_bg = np.zeros_like(img)
-        black_bg[segmented_mask == 255] = img[segmented_mask == 255]
+    def run(self, img, gray=None, mm_per_px=None):
+        """The full pipeline for img at its calibration, tiled when the photo is very large."""
+        if self.should_tile(img):
+            return self.detect_beans_tiled(img, mm_per_px=mm_per_px)
+        return self.preprocess_image(img, gray=gray, mm_per_px=mm_per_px)
 
-        return black_bg, segmented_mask, gray_denoised, bean_bboxes, predictions
+    # ---------- Tiled pipeline for very large photos ----------
+    def should_tile(self, img):
+        h, w = img.shape[:2]
+        return h * w > settings.BEAN_TILED_MIN_PIXELS
+
+    def _aruco_corners(self, img):
+        try:
+            aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+            detector = cv2.aruco.ArucoDetector(aruco_dict, cv2.aruco.DetectorParameters())
+            corners, ids, _ = detector.detectMarkers(img)
+            return [np.int32(corner[0]) for corner in corners] if ids is not None else []
+        except Exception:
+            return []
+
+    @staticmethod
+    def _box_clusters(predictions):
+        """
+        Groups of touching/overlapping boxes as (x1, y1, x2, y2) rectangles:
+        the same regions measure.label finds on the full-image box mask.
+        """
+        boxes = [list(p["bbox"]) for p in predictions]
+        merged = True
+        while merged:
+            merged = False
+            result = []
+            for box in boxes:
+                for other in result:
+                    if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                        other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                        other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                        merged = True
+                        break
+                else:
+                    result.append(box)
+            boxes = result
+        return [tuple(box) for box in boxes]
+
+    @staticmethod
+    def _cluster_cells(cluster, predictions, tile_size, margin):
+        """
+        Splits a box cluster into work units no bigger than a tile plus its
+        margin, so a long chain of touching beans never becomes one
+        image-sized crop. Boxes are bucketed by the tile_size cell (from the
+        cluster origin) holding their centre; yields each cell with its crop
+        rectangle, the cell's boxes padded by margin and clipped to the
+        cluster. A segmented bean is kept by the cell holding its centroid.
+        A cluster within one tile is a single unit cropped to the whole
+        cluster, as before.
+        """
+        cx1, cy1, cx2, cy2 = cluster
+        cells = {}
+        for p in predictions:
+            x1, y1, x2, y2 = p["bbox"]
+            if x2 < cx1 or x1 > cx2 or y2 < cy1 or y1 > cy2:
+                continue
+            cell = (int((x1 + x2) / 2 - cx1) // tile_size, int((y1 + y2) / 2 - cy1) // tile_size)
+            rect = cells.get(cell)
+            cells[cell] = (x1, y1, x2, y2) if rect is None else (
+                min(rect[0], x1), min(rect[1], y1), max(rect[2], x2), max(rect[3], y2)
+            )
+        for cell, (x1, y1, x2, y2) in sorted(cells.items()):
+            crop = (
+                max(cx1, int(x1) - margin), max(cy1, int(y1) - margin),
+                min(cx2, int(x2) + margin), min(cy2, int(y2) + margin),
+            )
+            yield cell, crop
+
+    def detect_beans_tiled(self, img, tile_size=None, overlap=None, mm_per_px=None):
+        """
+        preprocess_image + extract_features_for_all_beans for large photos.
+        Detection runs on overlapping tiles (detectors.detect_tiled) and the
+        Otsu/watershed refinement runs on one cluster of boxes at a time,
+        split into tile-sized pieces (_cluster_cells), so no full-resolution
+        float gray image or mask is ever allocated and peak memory follows
+        the tile size, not the megapixels or the number of touching beans.
+        The PipelineResult carries the beans and boxes already measured; it
+        has no full-image mask.
+        """
+        tile_size = tile_size or settings.BEAN_TILE_SIZE
+        overlap = settings.BEAN_TILE_OVERLAP if overlap is None else overlap
+        blur_radius_px = max(1, int(round(0.5 / mm_per_px))) if mm_per_px is not None else 5
+
+        with stage_timer('yolo'):
+            predictions = detect_tiled(self.detector, img, tile_size=tile_size, overlap=overlap, conf=0.6)
+        markers = self._aruco_corners(img)
+        # Stage times summed over the clusters, recorded once per image
+        timings = {'denoise': 0.0, 'refine': 0.0, 'watershed': 0.0, 'features': 0.0}
+        h, w = img.shape[:2]
+
+        bean_bboxes = []
+        all_beans = []
+        margin = int(tile_size * overlap)
+        for cluster in self._box_clusters(predictions):
+            cluster = tuple(int(v) for v in cluster)
+            for cell, (x1, y1, x2, y2) in self._cluster_cells(cluster, predictions, tile_size, margin):
+                # Pad by the median radius so the filter sees the same neighbourhood
+                px1, py1 = max(0, x1 - blur_radius_px), max(0, y1 - blur_radius_px)
+                px2, py2 = min(w, x2 + blur_radius_px), min(h, y2 + blur_radius_px)
+                started = time.perf_counter()
+                gray = to_gray(img[py1:py2, px1:px2])
+                gray_denoised = filters.median(gray, morphology.disk(blur_radius_px))
+                roi_gray = gray_denoised = gray_denoised[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
+                timings['denoise'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                try:
+                    thresh_val = filters.threshold_otsu(roi_gray)
+                except Exception:
+                    thresh_val = np.mean(roi_gray)
+                roi_mask = (roi_gray < thresh_val).astype(np.uint8) * 255
+                roi_mask = morphology.opening(roi_mask, morphology.square(3))
+                roi_mask = morphology.closing(roi_mask, morphology.square(5))
+                for corner in markers:
+                    cv2.fillPoly(roi_mask, [corner - np.int32([x1, y1])], 0)
+                timings['refine'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                segmented_mask, _ = self.apply_watershed(None, roi_mask)
+                timings['watershed'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                for prop in regionprops(label(segmented_mask), intensity_image=gray_denoised):
+                    if prop.area <= 100:
+                        continue
+                    # Beans reaching into the margin belong to the neighbouring cell
+                    row, col = prop.centroid
+                    if (int(col + x1 - cluster[0]) // tile_size, int(row + y1 - cluster[1]) // tile_size) != cell:
+                        continue
+                    minr, minc, maxr, maxc = prop.bbox
+                    bbox = (minc + x1, minr + y1, maxc - minc, maxr - minr)
+                    bean_bboxes.append(bbox)
+                    features = self._calculate_bean_features(prop, intensity_scale(gray_denoised), mm_per_px)
+                    all_beans.append({
+                        "bean_id": len(all_beans) + 1,
+                        "length_mm": features["major_axis_length_mm"],
+                        "width_mm": features["minor_axis_length_mm"],
+                        "bbox": bbox,
+                        "features": features
+                    })
+                timings['features'] += time.perf_counter() - started
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+        return PipelineResult(self, img, None, None, predictions, mm_per_px, beans=all_beans, bean_bboxes=bean_bboxes)
 
     # ---------- Visualization ----------
-    def draw_bbox(self, img, bboxes):
+    def draw_bbox(self, img, bboxes, mm_per_px=None):
         debug_img = img.copy()
         for i, bbox in enumerate(bboxes):
             x, y, w, h = bbox
             cv2.rectangle(debug_img, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            if self.mm_per_px is not None:
-                cv2.putText(debug_img, f"{w*self.mm_per_px:.1f}x{h*self.mm_per_px:.1f}mm",
+            if mm_per_px is not None:
+                cv2.putText(debug_img, f"{w*mm_per_px:.1f}x{h*mm_per_px:.1f}mm",
                            (x, y-10), cv2.FONT_HERSHEY_COMPLEX, 2, (0, 0, 0), 3)
             cv2.putText(debug_img, f"Bean {i+1}", (x, y-60),
                        cv2.FONT_HERSHEY_COMPLEX, 2, (0, 0, 0), 3)
         return debug_img
 
     # ---------- Feature extraction ----------
-    def extract_features_for_all_beans(self, mask, gray, bean_bboxes):
-        all_beans = []
-        labeled = label(mask)
-        props = regionprops(labeled, intensity_image=gray)
+    def extract_features_for_all_beans(self, mask, gray, bean_bboxes, mm_per_px):
+        return self.features_from_props(regionprops(label(mask), intensity_image=gray), gray, mm_per_px)
 
+    def features_from_props(self, props, gray, mm_per_px):
+        all_beans = []
         for i, bean in enumerate(props):
             if bean.area > 100:
-                features = self._calculate_bean_features(bean)
+                features = self._calculate_bean_features(bean, intensity_scale(gray), mm_per_px)
                 minr, minc, maxr, maxc = bean.bbox
                 bbox = (minc, minr, maxc-minc, maxr-minr)
 
@@ -201,27 +408,27 @@ class BeanFeatureExtractor:
                 })
         return all_beans
 
-    def _calculate_bean_features(self, bean_props):
+    def _calculate_bean_features(self, bean_props, intensity_scale, mm_per_px):
         return {
-            "area_mm2": bean_props.area * (self.mm_per_px**2),
-            "perimeter_mm": bean_props.perimeter * self.mm_per_px,
-            "major_axis_length_mm": bean_props.major_axis_length * self.mm_per_px,
-            "minor_axis_length_mm": bean_props.minor_axis_length * self.mm_per_px,
+            "area_mm2": bean_props.area * (mm_per_px**2),
+            "perimeter_mm": bean_props.perimeter * mm_per_px,
+            "major_axis_length_mm": bean_props.major_axis_length * mm_per_px,
+            "minor_axis_length_mm": bean_props.minor_axis_length * mm_per_px,
             "eccentricity": bean_props.eccentricity,
             "extent": bean_props.extent,
-            "equivalent_diameter_mm": bean_props.equivalent_diameter * self.mm_per_px,
+            "equivalent_diameter_mm": bean_props.equivalent_diameter * mm_per_px,
             "solidity": bean_props.solidity,
-            "mean_intensity": bean_props.mean_intensity,
+            "mean_intensity": bean_props.mean_intensity * intensity_scale,
             "aspect_ratio": bean_props.major_axis_length / bean_props.minor_axis_length if bean_props.minor_axis_length > 0 else 0
         }
 
-    def extract_features(self, mask, gray):
+    def extract_features(self, mask, gray, mm_per_px):
         labeled = label(mask)
         props = regionprops(labeled, intensity_image=gray)
         if len(props) == 0:
             return None, None
         bean = max(props, key=lambda x: x.area)
-        features = self._calculate_bean_features(bean)
+        features = self._calculate_bean_features(bean, intensity_scale(gray), mm_per_px)
         minr, minc, maxr, maxc = bean.bbox
         bbox = (minc, minr, maxc-minc, maxr-minr)
         return features, bbox
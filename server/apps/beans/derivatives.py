@@ -0,0 +1,122 @@
+"""
+WebP derivatives of stored bean photos, so image grids do not download
+full-resolution originals.
+
+Each original at uploads/<user>/<name>.<ext> in the Beans bucket gets:
+
+    uploads/<user>/<name>.thumb.webp     longest side THUMBNAIL_SIZE, grid cells
+    uploads/<user>/<name>.preview.webp   longest side PREVIEW_SIZE, detail views
+
+Their paths are kept in images.thumbnail_url / images.preview_url
+(models/sql/010_image_derivatives.sql). process generates them at upload time
+from the pixels it already decoded. Older images get them lazily on first
+request (/api/beans/images/<id>/thumbnail/ and /preview/) or in bulk with
+`python manage.py backfill_image_derivatives`.
+"""
+
+import cv2
+from django.conf import settings
+from django.db import connection
+from services.admission import cv_admission
+from services.supabase_service import supabase
+from .image_io import decode_image
+from .overlays import fit_within
+
+BUCKET = "Beans"
+DERIVATIVE_SIZES = {
+    'thumbnail': settings.BEAN_THUMBNAIL_SIZE,
+    'preview': settings.BEAN_PREVIEW_SIZE,
+}
+DERIVATIVE_SUFFIXES = {'thumbnail': 'thumb', 'preview': 'preview'}
+WEBP_QUALITY = 80
+
+
+def derivative_path(image_url, kind):
+    """Storage path of a derivative, next to the original."""
+    base = image_url.rsplit('.', 1)[0] if '.' in image_url.rsplit('/', 1)[-1] else image_url
+    return f"{base}.{DERIVATIVE_SUFFIXES[kind]}.webp"
+
+
+def encode_derivatives(img):
+    """{kind: WebP bytes} for a BGR image, largest first so each resize starts from a smaller source."""
+    encoded = {}
+    for kind, size in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        img, _ = fit_within(img, size)
+        ok, buffer = cv2.imencode('.webp', img, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+        if not ok:
+            raise ValueError(f"Could not encode {kind} as WebP")
+        encoded[kind] = buffer.tobytes()
+    return encoded
+
+
+def upload_derivatives(image_url, img=None):
+    """
+    Generate both derivatives of an original and upload them next to it.
+    img is the decoded original when the caller already has it; otherwise it
+    is downloaded from storage. Touches no database, so it is safe to run in
+    worker threads. Returns {kind: storage path}.
+    """
+    if img is None:
+        img = decode_image(supabase.storage.from_(BUCKET).download(image_url), image_url)
+
+    paths = {}
+    for kind, data in encode_derivatives(img).items():
+        path = derivative_path(image_url, kind)
+        supabase.storage.from_(BUCKET).upload(path, data, {
+            "content-type": "image/webp",
+            "cache-control": "31536000",
+            "upsert": "true",
+        })
+        paths[kind] = path
+    return paths
+
+
+def record_derivatives(image_id, paths):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE public.images SET thumbnail_url = %s, preview_url = %s WHERE id = %s",
+            [paths['thumbnail'], paths['preview'], image_id]
+        )
+
+
+def store_derivatives(image_id, image_url, img=None):
+    """Generate, upload and record both derivatives of an image. Returns {kind: storage path}."""
+    paths = upload_derivatives(image_url, img)
+    record_derivatives(image_id, paths)
+    return paths
+
+
+def ensure_derivative(image_id, kind):
+    """
+    Storage path of one derivative, generating both on first request (inside
+    a CV admission slot, so it may raise AdmissionRejected). None if the
+    image does not exist.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT image_url, thumbnail_url, preview_url FROM public.images WHERE id = %s",
+            [image_id]
+        )
+        row = cursor.fetchone()
+    if not row:
+        return None
+    image_url, thumbnail_url, preview_url = row
+    existing = thumbnail_url if kind == 'thumbnail' else preview_url
+    if existing:
+        return existing
+    with cv_admission.slot():
+        return store_derivatives(image_id, image_url)[kind]
+
+
+def derivative_urls(image_id, thumbnail_path, preview_path, build_absolute_uri):
+    """
+    {"thumbnail": url, "preview": url} for a list row: the public URL when
+    the derivative exists, otherwise the lazy endpoint that creates it.
+    """
+    urls = {}
+    for kind, path in (('thumbnail', thumbnail_path), ('preview', preview_path)):
+        if path:
+            urls[kind] = supabase.storage.from_(BUCKET).get_public_url(path)
+        else:
+            urls[kind] = build_absolute_uri(f"/api/beans/images/{image_id}/{kind}/")
+    return urls
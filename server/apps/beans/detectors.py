@@ -0,0 +1,261 @@
+"""
+Bean detector backends used by BeanFeatureExtractor.
+
+Every backend takes a BGR image and returns the same prediction dicts the
+extractor has always produced:
+
+    {"bbox": (x1, y1, x2, y2), "confidence": float, "class_id": int}
+
+in original image pixels. Pick the backend with settings.BEAN_DETECTOR_BACKEND:
+
+    torch      ultralytics YOLO on the .pt weights (default)
+    onnx       ONNX Runtime on my_model/cv_yolov11.onnx
+    onnx-int8  ONNX Runtime on the statically quantized my_model/cv_yolov11.int8.onnx
+
+detect_tiled() runs any backend over overlapping tiles for very large photos.
+
+The ONNX files are produced by `python manage.py export_detector_onnx`.
+`python manage.py compare_detector_backends` reports box parity and latency
+between backends, and the tests in apps/beans/tests.py assert the parity.
+"""
+
+import os
+import threading
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODEL = os.path.join(current_dir, "my_model", "cv_yolov11.onnx")
+ONNX_INT8_MODEL = os.path.join(current_dir, "my_model", "cv_yolov11.int8.onnx")
+
+# ultralytics defaults, so both backends keep the same boxes
+NMS_IOU = 0.7
+LETTERBOX_COLOR = 114
+
+
+def letterbox(img, size):
+    """
+    Resize img to fit a size x size square keeping its aspect ratio and pad
+    the rest. Returns (padded image, scale, (pad_x, pad_y)).
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    padded = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return padded, scale, (pad_x, pad_y)
+
+
+def to_input_tensor(img, size):
+    """BGR image -> (1, 3, size, size) float32 RGB tensor in [0, 1], plus the letterbox transform."""
+    padded, scale, pad = letterbox(img, size)
+    tensor = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[np.newaxis]
+    return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, scale, pad
+
+
+def box_iou(a, b):
+    """IoU of two (x1, y1, x2, y2) boxes."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_boxes(reference, candidate, iou_threshold):
+    """
+    Greedily pair each reference box with its best unused candidate box.
+    Returns the IoUs of the pairs at or above iou_threshold.
+    """
+    used = set()
+    ious = []
+    for ref in reference:
+        best, best_iou = None, 0.0
+        for j, cand in enumerate(candidate):
+            if j in used:
+                continue
+            iou = box_iou(ref["bbox"], cand["bbox"])
+            if iou > best_iou:
+                best, best_iou = j, iou
+        if best is not None and best_iou >= iou_threshold:
+            used.add(best)
+            ious.append(best_iou)
+    return ious
+
+
+def tile_windows(h, w, tile_size, overlap):
+    """(x1, y1, x2, y2) windows of at most tile_size covering an h x w image, overlapping by `overlap`."""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        return positions + [length - tile_size]
+
+    return [
+        (x, y, min(x + tile_size, w), min(y + tile_size, h))
+        for y in starts(h) for x in starts(w)
+    ]
+
+
+def merge_tile_predictions(predictions, iou_threshold=0.5, containment_threshold=0.8):
+    """
+    Greedy NMS across tiles, most confident first. A box is also dropped when
+    it mostly lies inside an already kept one, which is what a bean cut off
+    at a tile border looks like next to the full detection from the
+    neighbouring tile.
+    """
+    kept = []
+    for prediction in sorted(predictions, key=lambda p: p["confidence"], reverse=True):
+        box = prediction["bbox"]
+        area = max(1, (box[2] - box[0]) * (box[3] - box[1]))
+        duplicate = False
+        for other in kept:
+            o = other["bbox"]
+            inter = max(0, min(box[2], o[2]) - max(box[0], o[0])) * max(0, min(box[3], o[3]) - max(box[1], o[1]))
+            other_area = max(1, (o[2] - o[0]) * (o[3] - o[1]))
+            if box_iou(box, o) >= iou_threshold or inter / min(area, other_area) >= containment_threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(prediction)
+    return kept
+
+
+def detect_tiled(detector, img, tile_size=1280, overlap=0.2, conf=0.6, batch_size=4):
+    """
+    Run the detector on overlapping full-resolution tiles (batch_size at a
+    time) and merge the boxes into image coordinates, so small beans are not
+    lost to the detector's internal downscaling of the whole photo.
+    """
+    h, w = img.shape[:2]
+    windows = tile_windows(h, w, tile_size, overlap)
+    predictions = []
+    for start in range(0, len(windows), batch_size):
+        batch = windows[start:start + batch_size]
+        tiles = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in batch]
+        for (x1, y1, _, _), tile_predictions in zip(batch, detector.detect_batch(tiles, conf=conf)):
+            for prediction in tile_predictions:
+                bx1, by1, bx2, by2 = prediction["bbox"]
+                prediction["bbox"] = (bx1 + x1, by1 + y1, bx2 + x1, by2 + y1)
+                predictions.append(prediction)
+    return merge_tile_predictions(predictions)
+
+
+class TorchDetector:
+    """
+    ultralytics YOLO. The model object keeps per-call predictor state, so
+    the requests sharing it (up to CV_MAX_CONCURRENT) take turns; the ONNX
+    Runtime session is safe to run concurrently and needs no lock.
+    """
+    name = 'torch'
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _predictions(result):
+        predictions = []
+        if result.boxes is None:
+            return predictions
+        for box in result.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            predictions.append({
+                "bbox": (x1, y1, x2, y2),
+                "confidence": float(box.conf[0]),
+                "class_id": int(box.cls[0])
+            })
+        return predictions
+
+    def detect(self, img, conf=0.6):
+        predictions = []
+        with self._lock:
+            results = self.model(img, conf=conf, verbose=False)
+        for result in results:
+            predictions += self._predictions(result)
+        return predictions
+
+    def detect_batch(self, imgs, conf=0.6):
+        """One prediction list per image, run as a single batch."""
+        with self._lock:
+            results = self.model(list(imgs), conf=conf, verbose=False)
+        return [self._predictions(result) for result in results]
+
+
+class OnnxDetector:
+    """
+    YOLO (v8/v11 head) exported to ONNX, run with ONNX Runtime on the CPU.
+    intra_op_threads caps the threads one inference uses; leave it at the
+    core count for a single worker and lower it when several workers share
+    the machine.
+    """
+    name = 'onnx'
+
+    def __init__(self, path=ONNX_MODEL, intra_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = int(model_input.shape[2])
+        self.path = path
+
+    def detect(self, img, conf=0.6):
+        tensor, scale, (pad_x, pad_y) = to_input_tensor(img, self.input_size)
+        # (1, 4 + classes, anchors) -> (anchors, 4 + classes)
+        output = self.session.run(None, {self.input_name: tensor})[0][0].T
+        class_scores = output[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores >= conf
+        if not keep.any():
+            return []
+
+        cx, cy, bw, bh = output[keep, :4].T
+        x1 = (cx - bw / 2 - pad_x) / scale
+        y1 = (cy - bh / 2 - pad_y) / scale
+        widths, heights = bw / scale, bh / scale
+        scores, class_ids = scores[keep], class_ids[keep]
+
+        boxes = np.stack([x1, y1, widths, heights], axis=1)
+        kept = cv2.dnn.NMSBoxesBatched(boxes.tolist(), scores.tolist(), class_ids.tolist(), conf, NMS_IOU)
+        h, w = img.shape[:2]
+        predictions = []
+        for i in np.array(kept).flatten():
+            bx1 = int(np.clip(x1[i], 0, w))
+            by1 = int(np.clip(y1[i], 0, h))
+            bx2 = int(np.clip(x1[i] + widths[i], 0, w))
+            by2 = int(np.clip(y1[i] + heights[i], 0, h))
+            predictions.append({
+                "bbox": (bx1, by1, bx2, by2),
+                "confidence": float(scores[i]),
+                "class_id": int(class_ids[i])
+            })
+        predictions.sort(key=lambda p: p["confidence"], reverse=True)
+        return predictions
+
+    def detect_batch(self, imgs, conf=0.6):
+        # The exported graph has a fixed batch of 1
+        return [self.detect(img, conf=conf) for img in imgs]
+
+
+def create_detector(backend, intra_op_threads=None):
+    if backend == 'torch':
+        from .model_registry import get_yolo_model
+        return TorchDetector(get_yolo_model())
+    if backend == 'onnx':
+        return OnnxDetector(ONNX_MODEL, intra_op_threads)
+    if backend == 'onnx-int8':
+        detector = OnnxDetector(ONNX_INT8_MODEL, intra_op_threads)
+        detector.name = 'onnx-int8'
+        return detector
+    raise ValueError(f"Unknown detector backend: {backend}")
@@ -0,0 +1,102 @@
+"""
+Upload ingestion for the bean pipeline.
+
+Each upload is read into memory once. That buffer is hashed (for duplicate
+detection), decoded in place by cv2.imdecode straight into a BGR uint8 array
+(EXIF orientation applied) and reused for the storage upload. There is no
+intermediate PIL image or RGB copy. The grayscale image the pipeline works
+on is a single uint8 plane derived from the decoded pixels.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# skimage.color.rgb2gray weights. The pipeline has always applied rgb2gray
+# to BGR pixels, so these weights run over B, G, R in that order to keep the
+# stored mean_intensity values comparable with older rows.
+LEGACY_GRAY_WEIGHTS = np.array([[0.2125, 0.7154, 0.0721]], dtype=np.float32)
+
+
+def to_gray(img):
+    """uint8 grayscale plane of a BGR image, matching rgb2gray(img) * 255."""
+    return cv2.transform(img, LEGACY_GRAY_WEIGHTS)
+
+
+def decode_image(data, name='image'):
+    """BGR uint8 pixels of an encoded image buffer, decoded without copying the buffer."""
+    # IMREAD_COLOR applies the EXIF orientation and always yields 3 channels
+    img = cv2.imdecode(np.frombuffer(memoryview(data), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not decode image {name}")
+    return img
+
+
+class Upload:
+    def __init__(self, file_obj):
+        file_obj.seek(0)
+        self.data = file_obj.read()
+        self.name = getattr(file_obj, 'name', None) or 'upload.jpg'
+        self.sha256 = hashlib.sha256(memoryview(self.data)).hexdigest()
+        self._image = None
+        self._gray = None
+
+    @property
+    def extension(self):
+        return self.name.split('.')[-1] if '.' in self.name else 'jpg'
+
+    @property
+    def image(self):
+        """The decoded BGR uint8 image (decoded on first access)."""
+        if self._image is None:
+            self._image = decode_image(self.data, self.name)
+        return self._image
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = to_gray(self.image)
+        return self._gray
+
+    def release_pixels(self):
+        """Drop the decoded arrays once the pipeline is done with them."""
+        self._image = None
+        self._gray = None
+
+
+def read_uploads(files):
+    """
+    Upload objects for files, skipping byte-identical duplicates.
+    Returns (uploads, skipped names).
+    """
+    uploads = []
+    skipped = []
+    seen_hashes = set()
+    for file_obj in files:
+        upload = Upload(file_obj)
+        if upload.sha256 in seen_hashes:
+            skipped.append(upload.name)
+            continue
+        seen_hashes.add(upload.sha256)
+        uploads.append(upload)
+    return uploads, skipped
+
+
+def prefetch_pixels(uploads):
+    """
+    Yield the uploads in order, decoding the next one's pixels in a
+    background thread while the caller works on the current one. cv2 drops
+    the GIL while decoding, so this overlaps with the CV pipeline, and at
+    most two decoded images are alive at a time.
+    """
+    if not uploads:
+        return
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(lambda upload: upload.gray, uploads[0])
+        for i, upload in enumerate(uploads):
+            # A decode error resurfaces when the caller touches upload.image
+            pending.exception()
+            if i + 1 < len(uploads):
+                pending = pool.submit(lambda upload: upload.gray, uploads[i + 1])
+            yield upload
@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.beans.derivatives import upload_derivatives, record_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate the WebP thumbnail and preview for stored images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Images processed in parallel (download, resize, encode, upload)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Images fetched from the database per batch',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after this many images',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives for every image, not only the missing ones',
+        )
+
+    def next_batch(self, after_id, batch_size, force):
+        missing = "" if force else "AND (thumbnail_url IS NULL OR preview_url IS NULL)"
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, image_url FROM public.images
+                WHERE id > %s {missing}
+                ORDER BY id
+                LIMIT %s
+            """, [after_id, batch_size])
+            return cursor.fetchall()
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        done = failed = 0
+        after_id = 0
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while limit is None or done + failed < limit:
+                batch_size = options['batch_size']
+                if limit is not None:
+                    batch_size = min(batch_size, limit - done - failed)
+                batch = self.next_batch(after_id, batch_size, options['force'])
+                if not batch:
+                    break
+                after_id = batch[-1][0]
+
+                futures = {pool.submit(upload_derivatives, image_url): image_id for image_id, image_url in batch}
+                for future in as_completed(futures):
+                    image_id = futures[future]
+                    try:
+                        # Database writes stay on this thread
+                        record_derivatives(image_id, future.result())
+                        done += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'Image {image_id}: {e}')
+
+                self.stdout.write(f'{done} done, {failed} failed (up to image {after_id})')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated derivatives for {done} images in {elapsed:.1f}s ({failed} failed)'
+        ))
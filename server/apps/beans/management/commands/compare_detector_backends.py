@@ -0,0 +1,63 @@
+import time
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from apps.beans.detectors import create_detector, match_boxes
+from apps.beans.management.commands.export_detector_onnx import calibration_images
+
+
+class Command(BaseCommand):
+    help = 'Compare detector backends against torch: box IoU parity and per-image latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', help='Folder of bean photos')
+        parser.add_argument(
+            '--backends', nargs='+', default=['onnx', 'onnx-int8'],
+            help='Backends to compare with torch (default: onnx onnx-int8)',
+        )
+        parser.add_argument('--limit', type=int, default=20, help='Most images to use (default: 20)')
+        parser.add_argument('--runs', type=int, default=3, help='Timed runs per image (default: 3)')
+        parser.add_argument('--conf', type=float, default=0.6, help='Confidence threshold (default: 0.6)')
+        parser.add_argument('--iou', type=float, default=0.5, help='IoU counted as a match (default: 0.5)')
+        parser.add_argument('--threads', type=int, default=None, help='ONNX Runtime intra-op threads')
+
+    def handle(self, *args, **options):
+        paths = calibration_images(options['images'], options['limit'])
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+        images = [img for img in (cv2.imread(path) for path in paths) if img is not None]
+
+        detectors = {'torch': create_detector('torch')}
+        for backend in options['backends']:
+            detectors[backend] = create_detector(backend, options['threads'])
+
+        results = {}
+        for name, detector in detectors.items():
+            detector.detect(images[0], conf=options['conf'])  # warm-up
+            timings, outputs = [], []
+            for img in images:
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    predictions = detector.detect(img, conf=options['conf'])
+                    timings.append((time.perf_counter() - start) * 1000)
+                outputs.append(predictions)
+            results[name] = (timings, outputs)
+
+        torch_timings, torch_outputs = results['torch']
+        torch_p50 = np.percentile(torch_timings, 50)
+        reference_boxes = sum(len(boxes) for boxes in torch_outputs)
+        self.stdout.write(
+            f"{len(images)} image(s), {options['runs']} run(s) each, {reference_boxes} torch box(es)\n"
+        )
+        self.stdout.write(f"{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} {'recall':>7} {'mean IoU':>9} {'boxes':>6}")
+        for name, (timings, outputs) in results.items():
+            ious, boxes = [], 0
+            for reference, candidate in zip(torch_outputs, outputs):
+                ious += match_boxes(reference, candidate, options['iou'])
+                boxes += len(candidate)
+            p50 = np.percentile(timings, 50)
+            recall = len(ious) / reference_boxes if reference_boxes else 1.0
+            self.stdout.write(
+                f"{name:<10} {p50:>8.1f} {np.percentile(timings, 95):>8.1f} {torch_p50 / p50:>7.2f}x "
+                f"{recall:>7.1%} {np.mean(ious) if ious else 0:>9.3f} {boxes:>6}"
+            )
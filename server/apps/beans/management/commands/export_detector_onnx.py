@@ -0,0 +1,90 @@
+import os
+import cv2
+import shutil
+from django.core.management.base import BaseCommand, CommandError
+from apps.beans.detectors import ONNX_INT8_MODEL, ONNX_MODEL, to_input_tensor
+from apps.beans.model_registry import MODEL
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def calibration_images(folder, limit):
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(folder, name) for name in names[:limit]]
+
+
+class Command(BaseCommand):
+    help = 'Export cv_yolov11.pt to ONNX and, given calibration images, a statically quantized INT8 model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imgsz', type=int, default=640, help='Square input size (default: 640)')
+        parser.add_argument('--opset', type=int, default=17, help='ONNX opset (default: 17)')
+        parser.add_argument(
+            '--calibration-dir',
+            help='Folder of representative bean photos; enables the INT8 model',
+        )
+        parser.add_argument(
+            '--calibration-images',
+            type=int,
+            default=100,
+            help='Most calibration images to use (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        from ultralytics import YOLO
+
+        exported = YOLO(MODEL).export(
+            format='onnx', imgsz=options['imgsz'], opset=options['opset'],
+            dynamic=False, simplify=False, half=False
+        )
+        if os.path.abspath(exported) != os.path.abspath(ONNX_MODEL):
+            shutil.move(exported, ONNX_MODEL)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {ONNX_MODEL}'))
+
+        if not options['calibration_dir']:
+            self.stdout.write(self.style.WARNING('No --calibration-dir given; skipping the INT8 model'))
+            return
+
+        paths = calibration_images(options['calibration_dir'], options['calibration_images'])
+        if not paths:
+            raise CommandError(f"No images found in {options['calibration_dir']}")
+        self.quantize(paths, options['imgsz'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {ONNX_INT8_MODEL} (calibrated on {len(paths)} image(s))'))
+
+    def quantize(self, paths, imgsz):
+        from onnxruntime.quantization import (
+            CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+        )
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        class BeanCalibrationReader(CalibrationDataReader):
+            # Same preprocessing as OnnxDetector, so the ranges match inference
+            def __init__(self, input_name):
+                self.input_name = input_name
+                self.paths = iter(paths)
+
+            def get_next(self):
+                for path in self.paths:
+                    img = cv2.imread(path)
+                    if img is not None:
+                        return {self.input_name: to_input_tensor(img, imgsz)[0]}
+                return None
+
+        import onnxruntime as ort
+        input_name = ort.InferenceSession(ONNX_MODEL, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+        preprocessed = ONNX_MODEL.replace('.onnx', '.pre.onnx')
+        quant_pre_process(ONNX_MODEL, preprocessed)
+        try:
+            quantize_static(
+                preprocessed,
+                ONNX_INT8_MODEL,
+                BeanCalibrationReader(input_name),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+                calibrate_method=CalibrationMethod.MinMax,
+            )
+        finally:
+            os.remove(preprocessed)
@@ -0,0 +1,84 @@
+"""
+Lazily loaded CV models for the bean endpoints.
+
+Nothing heavy (torch, ultralytics, scikit-image) is imported until the first
+request that needs it, so the non-CV endpoints and management commands start
+without paying for the model. Each model is loaded once per process and
+shared by every request.
+
+With `preload_app` in gunicorn.conf.py, preload() runs in the master before
+the workers fork, and the workers share the loaded weights copy-on-write.
+ONNX Runtime sessions are not preloaded: their thread pools do not survive
+a fork and the workers would hang on the first inference. Each worker builds
+its own with preload_after_fork() instead.
+"""
+
+import os
+import threading
+from django.conf import settings
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MODEL = os.path.join(current_dir, "my_model", "cv_yolov11.pt")
+
+_models = {}
+_lock = threading.Lock()
+
+
+def _get_or_load(key, loader):
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = loader()
+                _models[key] = model
+    return model
+
+
+def get_yolo_model(path=MODEL):
+    def load():
+        from ultralytics import YOLO
+        return YOLO(path)
+    return _get_or_load(('yolo', path), load)
+
+
+def get_detector(backend=None):
+    """
+    The detector backend from settings.BEAN_DETECTOR_BACKEND ('torch',
+    'onnx' or 'onnx-int8'; see detectors.py).
+    """
+    backend = backend or settings.BEAN_DETECTOR_BACKEND
+
+    def load():
+        from .detectors import create_detector
+        return create_detector(backend, settings.ONNX_INTRA_OP_THREADS)
+    return _get_or_load(('detector', backend), load)
+
+
+def get_extractor():
+    """The shared BeanFeatureExtractor (its detector loads on first use)."""
+    def load():
+        from .bean_feature_extract import BeanFeatureExtractor
+        return BeanFeatureExtractor()
+    return _get_or_load('extractor', load)
+
+
+def _forks_cleanly(backend):
+    return backend == 'torch'
+
+
+def preload():
+    """Load what can be shared across a fork, e.g. in the gunicorn master."""
+    get_extractor()
+    if _forks_cleanly(settings.BEAN_DETECTOR_BACKEND):
+        get_detector()
+
+
+def preload_after_fork():
+    """Load the detector preload() skipped, in a freshly forked worker."""
+    if not _forks_cleanly(settings.BEAN_DETECTOR_BACKEND):
+        get_detector()
+
+
+def loaded_models():
+    return list(_models)
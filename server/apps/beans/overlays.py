@@ -0,0 +1,176 @@
+"""
+Annotated bean overlays, rendered when requested instead of written to
+MEDIA_ROOT/processed on every call.
+
+Overlays for stored images are drawn from their BeanDetection rows on top of
+the original photo from storage. The encoded JPEG/WebP bytes are kept in a
+process-wide LRU cache bounded by BEAN_OVERLAY_CACHE_BYTES. The cache key
+includes a digest of the detection rows, so editing them changes the key
+instead of serving a stale overlay. Renders that have no stored rows
+(process-single) are kept in the same cache under a random token.
+"""
+
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+import cv2
+from django.conf import settings
+from django.db import connection
+from services.admission import cv_admission
+from services.supabase_service import supabase
+from .image_io import decode_image
+
+OVERLAY_FORMATS = {
+    'webp': ('.webp', 'image/webp', cv2.IMWRITE_WEBP_QUALITY),
+    'jpeg': ('.jpg', 'image/jpeg', cv2.IMWRITE_JPEG_QUALITY),
+}
+OVERLAY_QUALITY = 80
+OVERLAY_DEFAULT_MAX_SIZE = 1600
+
+
+class OverlayCache:
+    """Thread-safe LRU of encoded overlays, bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, data, content_type):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = (data, content_type)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+overlay_cache = OverlayCache(settings.BEAN_OVERLAY_CACHE_BYTES)
+
+
+def encode_overlay(img, fmt):
+    extension, content_type, quality_flag = OVERLAY_FORMATS[fmt]
+    ok, buffer = cv2.imencode(extension, img, [quality_flag, OVERLAY_QUALITY])
+    if not ok:
+        raise ValueError(f"Could not encode overlay as {fmt}")
+    return buffer.tobytes(), content_type
+
+
+def fit_within(img, max_size):
+    """(resized image, scale) with the longer side at most max_size."""
+    h, w = img.shape[:2]
+    scale = min(1.0, max_size / max(h, w))
+    if scale < 1.0:
+        img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return img, scale
+
+
+def draw_detections(img, detections, scale=1.0, marker_corners=()):
+    """
+    Boxes and "Bean N" / size labels in the style of
+    BeanFeatureExtractor.draw_bbox, on an image scaled by `scale`.
+    """
+    overlay = img.copy()
+    font_scale = max(0.4, 2 * scale)
+    thickness = max(1, int(round(3 * scale)))
+    for corners in marker_corners:
+        cv2.polylines(overlay, [(corners * scale).astype('int32')], True, (0, 255, 0), max(1, thickness))
+    for detection in detections:
+        x, y = int(detection['x'] * scale), int(detection['y'] * scale)
+        w, h = int(detection['width'] * scale), int(detection['height'] * scale)
+        cv2.rectangle(overlay, (x, y), (x + w, y + h), (0, 255, 0), max(1, int(round(2 * scale))))
+        if detection.get('length_mm') is not None:
+            cv2.putText(overlay, f"{detection['length_mm']:.1f}x{detection['width_mm']:.1f}mm",
+                        (x, y - int(10 * scale)), cv2.FONT_HERSHEY_COMPLEX, font_scale, (0, 0, 0), thickness)
+        cv2.putText(overlay, f"Bean {detection['bean_id']}", (x, y - int(60 * scale)),
+                    cv2.FONT_HERSHEY_COMPLEX, font_scale, (0, 0, 0), thickness)
+    return overlay
+
+
+def find_marker_corners(img):
+    try:
+        aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+        detector = cv2.aruco.ArucoDetector(aruco_dict, cv2.aruco.DetectorParameters())
+        corners, ids, _ = detector.detectMarkers(img)
+        return [corner[0] for corner in corners] if ids is not None else []
+    except Exception:
+        return []
+
+
+def stored_detections(image_id):
+    """(image_url, detections) for an image; image_url is None when it does not exist."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT image_url FROM public.images WHERE id = %s", [image_id])
+        row = cursor.fetchone()
+        if not row:
+            return None, []
+        cursor.execute("""
+            SELECT bd.bean_id, bd.bbox_x, bd.bbox_y, bd.bbox_width, bd.bbox_height,
+                   bd.length_mm, bd.width_mm
+            FROM public.bean_detections bd
+            JOIN public.extracted_features ef ON ef.id = bd.extracted_features_id
+            JOIN public.predictions p ON p.id = ef.prediction_id
+            WHERE p.image_id = %s
+            ORDER BY bd.bean_id
+        """, [image_id])
+        detections = [
+            {
+                'bean_id': bean_id, 'x': x, 'y': y, 'width': w, 'height': h,
+                'length_mm': float(length) if length is not None else None,
+                'width_mm': float(width) if width is not None else None,
+            }
+            for bean_id, x, y, w, h, length, width in cursor.fetchall()
+        ]
+    return row[0], detections
+
+
+def render_image_overlay(image_id, fmt='webp', max_size=OVERLAY_DEFAULT_MAX_SIZE):
+    """
+    (data, content_type, etag) of a stored image's overlay, or None when the
+    image does not exist. Cache misses render inside a CV admission slot and
+    may raise AdmissionRejected.
+    """
+    image_url, detections = stored_detections(image_id)
+    if image_url is None:
+        return None
+    digest = hashlib.sha1(repr(detections).encode()).hexdigest()[:16]
+    key = f"image:{image_id}:{fmt}:{max_size}:{digest}"
+    cached = overlay_cache.get(key)
+    if cached is None:
+        with cv_admission.slot():
+            original = decode_image(supabase.storage.from_("Beans").download(image_url), image_url)
+            marker_corners = find_marker_corners(original)
+            img, scale = fit_within(original, max_size)
+            del original
+            data, content_type = encode_overlay(draw_detections(img, detections, scale, marker_corners), fmt)
+        overlay_cache.set(key, data, content_type)
+        cached = (data, content_type)
+    return cached[0], cached[1], f'"{key}"'
+
+
+def cache_rendered_overlay(img, fmt='webp', max_size=OVERLAY_DEFAULT_MAX_SIZE):
+    """Cache an overlay rendered in memory (no stored rows); returns its token."""
+    img, _ = fit_within(img, max_size)
+    data, content_type = encode_overlay(img, fmt)
+    token = f"{uuid.uuid4().hex}.{fmt}"
+    overlay_cache.set(f"token:{token}", data, content_type)
+    return token
+
+
+def cached_overlay(token):
+    """(data, content_type) for a token from cache_rendered_overlay, or None once evicted."""
+    return overlay_cache.get(f"token:{token}")
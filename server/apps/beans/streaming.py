@@ -0,0 +1,66 @@
+"""
+NDJSON streaming for process (POST /api/beans/process/?stream=ndjson, or the
+form field stream=true). Each line is one JSON object:
+
+    {"event": "start", "data": {"total": 3, "skipped_duplicates": []}}
+    {"event": "image", "index": 0, "total": 3, "data": <image result>}
+    ...
+    {"event": "done", "data": {"total_images_processed": 3, "total_beans_detected": 41}}
+
+Image results have the same shape as the entries of the JSON response's
+"images" list and are sent as soon as each image is finished.
+
+Under ASGI Django buffers a synchronous streaming iterator completely before
+sending it, so the pipeline generator is advanced from an async iterator,
+one item per sync_to_async call. Those calls are thread-sensitive, so they
+run on the request's own thread, where the view ran and the ORM connection
+lives.
+"""
+
+import json
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+_EXHAUSTED = object()
+
+
+def stream_requested(request):
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return str(request.data.get('stream', '')).lower() in ('1', 'true', 'ndjson')
+
+
+def image_events(results, total, skipped=()):
+    """Wrap the per-image results of process_uploads in start / image / done events."""
+    yield {"event": "start", "data": {"total": total, "skipped_duplicates": list(skipped)}}
+    processed = 0
+    beans = 0
+    for index, result in enumerate(results):
+        processed += 1
+        beans += len(result.get("beans", []))
+        yield {"event": "image", "index": index, "total": total, "data": result}
+    yield {"event": "done", "data": {"total_images_processed": processed, "total_beans_detected": beans}}
+
+
+async def _iterate_in_request_thread(events):
+    next_event = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            event = await next_event(events, _EXHAUSTED)
+            if event is _EXHAUSTED:
+                return
+            yield (json.dumps(event, cls=JSONEncoder) + "\n").encode()
+    finally:
+        # Client went away or the stream finished: stop the pipeline there
+        await sync_to_async(events.close, thread_sensitive=True)()
+
+
+def ndjson_response(events):
+    response = StreamingHttpResponse(_iterate_in_request_thread(events), content_type=NDJSON_CONTENT_TYPE)
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the lines
+    response['X-Accel-Buffering'] = 'no'
+    return response
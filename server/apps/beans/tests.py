@@ -1,3 +1,67 @@
-from django.test import TestCase
+import os
+import unittest
+import cv2
+from django.conf import settings
+from django.test import SimpleTestCase
+from apps.beans.detectors import ONNX_INT8_MODEL, ONNX_MODEL, create_detector, match_boxes
+from apps.beans.management.commands.export_detector_onnx import calibration_images
+from apps.beans.model_registry import MODEL
 
-# Create your tests here.
+PARITY_IMAGE_LIMIT = 20
+CONF = 0.6
+# A torch box counts as found when an ONNX box overlaps it this much
+MATCH_IOU = 0.5
+
+
+def parity_images():
+    folder = settings.DETECTOR_PARITY_IMAGES
+    if not folder or not os.path.isdir(folder):
+        return []
+    paths = calibration_images(folder, PARITY_IMAGE_LIMIT)
+    return [img for img in (cv2.imread(path) for path in paths) if img is not None]
+
+
+class DetectorParityTests(SimpleTestCase):
+    """
+    The ONNX backends must find the same beans as the torch weights they
+    were exported from. Needs the exported models and DETECTOR_PARITY_IMAGES
+    (a folder of bean photos); skipped otherwise.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.images = parity_images()
+        if not cls.images:
+            raise unittest.SkipTest("DETECTOR_PARITY_IMAGES has no bean photos")
+        if not os.path.exists(MODEL):
+            raise unittest.SkipTest(f"Missing torch weights {MODEL}")
+        cls.torch_outputs = [create_detector('torch').detect(img, conf=CONF) for img in cls.images]
+
+    def assert_parity(self, backend, model_path, min_recall, min_mean_iou, count_tolerance):
+        if not os.path.exists(model_path):
+            self.skipTest(f"Missing exported model {model_path} (run export_detector_onnx)")
+        detector = create_detector(backend)
+
+        ious = []
+        for img, reference in zip(self.images, self.torch_outputs):
+            candidate = detector.detect(img, conf=CONF)
+            allowed = max(1, round(len(reference) * count_tolerance))
+            self.assertLessEqual(
+                abs(len(candidate) - len(reference)), allowed,
+                f"{backend} found {len(candidate)} beans where torch found {len(reference)}",
+            )
+            ious += match_boxes(reference, candidate, MATCH_IOU)
+
+        reference_boxes = sum(len(boxes) for boxes in self.torch_outputs)
+        if not reference_boxes:
+            self.skipTest("torch found no beans in DETECTOR_PARITY_IMAGES")
+        self.assertGreaterEqual(len(ious) / reference_boxes, min_recall, f"{backend} missed torch boxes")
+        self.assertGreaterEqual(sum(ious) / len(ious), min_mean_iou, f"{backend} boxes drift from torch")
+
+    def test_onnx_matches_torch(self):
+        self.assert_parity('onnx', ONNX_MODEL, min_recall=0.98, min_mean_iou=0.95, count_tolerance=0.02)
+
+    def test_onnx_int8_matches_torch(self):
+        # Quantization moves scores around the threshold, so allow more slack
+        self.assert_parity('onnx-int8', ONNX_INT8_MODEL, min_recall=0.9, min_mean_iou=0.85, count_tolerance=0.1)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import upload_beans, get_user_beans, process_bean, process_single_bean, get_bean_detections, test_database_connection, get_all_beans, validate_beans, get_annotations, delete_bean, upload_records, upload_images
+from .views import upload_beans, get_user_beans, process_bean, process_single_bean, get_bean_detections, test_database_connection, get_all_beans, validate_beans, get_annotations, delete_bean, upload_records, upload_images, image_overlay, image_derivative, transient_overlay, admission_stats
 
 urlpatterns = [
    path('upload/', upload_beans), 
@@ -7,11 +7,15 @@ urlpatterns = [
    path('get-annotations/', get_annotations),
    path('validate/',validate_beans), # Add activity Logs - done
    path('images/<int:image_id>',delete_bean), # Add activity Logs - done
+   path('images/<int:image_id>/overlay/', image_overlay),
+   path('images/<int:image_id>/<str:kind>/', image_derivative), # thumbnail / preview
+   path('overlays/<str:token>', transient_overlay),
    path('get-list/<str:user_id>/', get_user_beans),
    path('process/', process_bean), # Add activity Logs - done
    path('process-single/', process_single_bean),  # Add activity Logs - done
    path('detections/<str:user_id>/', get_bean_detections), 
    path('test-db/', test_database_connection),
+   path('admission-stats/', admission_stats),
    path('upload-records/', upload_records), # Upload CSV data as JSON
    path('upload-images/', upload_images), # Upload ZIP file with images
 ]
\ No newline at end of file
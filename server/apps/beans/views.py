@@ -1,23 +1,30 @@
 from django.shortcuts import render
 from rest_framework.decorators import api_view
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
 from django.utils import timezone
 from django.db import connection
 from django.db import transaction
 from django.core.paginator import Paginator
 import uuid
 import json
+import time
 import random
 import traceback
 from services.activity_logger import log_user_activity
 from services.supabase_service import supabase
+from services.metrics import observe_stage
+from services.admission import AdmissionRejected, admission_controlled, busy_response, cv_admission
 from models.models import ActivityLog, Annotation, User, UserImage, BeanDetection, Prediction, ExtractedFeature,UserRole, Location
 from models.models import Image as ImageBucket
 
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from .bean_feature_extract import BeanFeatureExtractor
+from .image_io import Upload, prefetch_pixels, read_uploads
+from .model_registry import get_extractor
+from .derivatives import DERIVATIVE_SIZES, derivative_urls, ensure_derivative, store_derivatives
+from .streaming import image_events, ndjson_response, stream_requested
+from .overlays import OVERLAY_FORMATS, OVERLAY_DEFAULT_MAX_SIZE, render_image_overlay, cache_rendered_overlay, cached_overlay
 from .serializers import MultipleImageUploadSerializer, BeanProcessingResultSerializer
 import cv2
 import numpy as np
@@ -104,7 +111,9 @@ def get_user_beans(request, user_id):
                     ef.solidity,
                     ef.mean_intensity,
                     ef.equivalent_diameter,
-                    ef.id as extracted_feature_id
+                    ef.id as extracted_feature_id,
+                    i.thumbnail_url,
+                    i.preview_url
                 FROM images i
                 INNER JOIN user_images ui ON i.id = ui.image_id
                 INNER JOIN users u ON ui.user_id = u.id
@@ -165,6 +174,8 @@ def get_user_beans(request, user_id):
                 images_data[image_id] = {
                     'image_id': row[0],
                     'image_url': row[1],
+                    'thumbnail_url': row[24],
+                    'preview_url': row[25],
                     'upload_date': row[2],
                     'user_id': row[3],
                     'first_name': row[4],
@@ -290,6 +301,7 @@ def get_user_beans(request, user_id):
                 
                 data.append({
                     "src": publicUrl,
+                    **derivative_urls(image_id, img_data['thumbnail_url'], img_data['preview_url'], request.build_absolute_uri),
                     "upload_date": img_data['upload_date'],
                     "id": img_data['image_id'],
                     "userId": img_data['user_id'],
@@ -316,86 +328,16 @@ def get_user_beans(request, user_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 
-
-extractor = BeanFeatureExtractor()
-
-@api_view(['POST'])
-@parser_classes([MultiPartParser, FormParser])
-def process_bean(request):
+def process_uploads(request, extractor, uploads, comment, save_to_db, user_id):
     """
-    Process single or multiple images for bean detection and feature extraction
+    Run the bean pipeline over the uploads and yield each image's result as
+    soon as that image is done. The next upload is decoded in the background
+    while the current one is processed.
     """
-    # Handle both single image and multiple images
-    images = []
-    
-    # Check for single image first
-    if 'image' in request.FILES:
-        images.append(request.FILES['image'])
-    
-    # Check for multiple images (this will override single image if both are present)
-    if 'images' in request.FILES:
-        images = request.FILES.getlist('images')
-    
-    # If no standard fields, check for any field starting with 'image'
-    if not images:
-        for key in request.FILES:
-            if key.startswith('image'):
-                file_list = request.FILES.getlist(key)
-                images.extend(file_list)
-                break  # Only take the first matching field to avoid duplicates
-    
-    if not images:
-        return Response({"error": "No images provided"}, status=400)
-    
-    # Debug: Log the number of images received
-    print(f"DEBUG: Processing {len(images)} images")
-    for i, img in enumerate(images):
-        print(f"DEBUG: Image {i+1}: {img.name if hasattr(img, 'name') else 'unknown'}")
-    
-    # Remove duplicates based on file content (in case same file is uploaded multiple times)
-    unique_images = []
-    seen_hashes = set()
-    
-    for img in images:
-        img.seek(0)  # Reset file pointer
-        content = img.read()
-        img.seek(0)  # Reset again for processing
-        
-        # Create a simple hash of the content
-        content_hash = hash(content)
-        if content_hash not in seen_hashes:
-            seen_hashes.add(content_hash)
-            unique_images.append(img)
-        else:
-            print(f"DEBUG: Skipping duplicate image: {img.name if hasattr(img, 'name') else 'unknown'}")
-    
-    images = unique_images
-    print(f"DEBUG: After deduplication: {len(images)} unique images")
-    
-    # Get optional parameters
-    comment = request.data.get('comment', '')
-    save_to_db = request.data.get('save_to_db', 'true').lower() == 'true'  # Default to true for saving
-    user_id = request.data.get('user_id', None)
-    
-    # Debug: Log the received parameters
-    print(f"DEBUG: comment='{comment}', save_to_db={save_to_db}, user_id='{user_id}'")
-    print(f"DEBUG: request.data keys: {list(request.data.keys())}")
-    
-    # Validate required parameters for database saving
-    if save_to_db and not user_id:
-        return Response({"error": "user_id is required when save_to_db is true"}, status=400)
-    
-    # Create folder for processed images
-    folder = os.path.join(settings.MEDIA_ROOT, "processed")
-    os.makedirs(folder, exist_ok=True)
-    
-    results = []
-    
-    for img_index, file_obj in enumerate(images):
+    for img_index, upload in enumerate(prefetch_pixels(uploads)):
         try:
-            # Convert uploaded image to OpenCV format
-            img = Image.open(file_obj)
-            img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+            # Decoded once from the upload buffer into BGR uint8
+            img = upload.image
             
             # Generate unique image ID
             image_id = str(uuid.uuid4())
@@ -403,41 +345,33 @@ def process_bean(request):
             # Step 1: Extract millimeters per pixel
             calibration_result = extractor.extract_mm_per_px(img)
             if calibration_result is False:
-                results.append({
+                upload.release_pixels()
+                yield {
                     "image_id": image_id,
                     "error": "Calibration marker not found",
                     "beans": []
-                })
+                }
                 continue
             
-            img_debug, h_mm, w_mm = calibration_result
+            # This image's calibration, passed explicitly through the pipeline
+            img_debug, h_mm, w_mm, mm_per_px = calibration_result
             
-            # Step 2: Preprocess and detect beans
-            black_bg, mask, gray, bean_bboxes, predictions = extractor.preprocess_image(img)
+            # Step 2: Preprocess and detect beans (tiled for very large photos)
+            pipeline = extractor.run(img, gray=upload.gray, mm_per_px=mm_per_px)
             
             # Step 3: Extract features for all beans
-            all_beans = extractor.extract_features_for_all_beans(mask, gray, bean_bboxes)
+            all_beans = pipeline.beans
             
             # Add comment to each bean if provided
             for bean in all_beans:
                 if comment:
                     bean['comment'] = comment
             
-            # Step 4: Skip debug image creation - commented out for performance
-            # debug_img = extractor.draw_bbox(img, bean_bboxes)
-            
-            # # Save processed images
-            # debug_filename = extractor.save_temporary_image(debug_img, folder, f"debug_{image_id}")
-            # calibration_filename = extractor.save_temporary_image(img_debug, folder, f"calib_{image_id}")
-            # processed_filename = extractor.save_temporary_image(black_bg, folder, f"processed_{image_id}")
-            
-            # # Build URLs - ensure proper URL construction
-            # base_url = request.build_absolute_uri('/').rstrip('/')
-            # debug_url = f"{base_url}{settings.MEDIA_URL}processed/{debug_filename}"
-            # calibration_url = f"{base_url}{settings.MEDIA_URL}processed/{calibration_filename}"
-            # processed_url = f"{base_url}{settings.MEDIA_URL}processed/{processed_filename}"
+            # Step 4: No debug images are rendered here. Saved images get an
+            # overlay URL that is drawn from their detections when requested.
 
             # Initialize debug URLs - will be set after database save if applicable
+            image_record = None
             debug_url = None
             calibration_url = None
             processed_url = None
@@ -446,6 +380,7 @@ def process_bean(request):
             print(f"DEBUG: About to check database saving - save_to_db={save_to_db}, user_id={user_id}")
             if save_to_db and user_id:
                 print(f"DEBUG: Starting database save for image {image_id}")
+                save_started = time.perf_counter()
                 try:
                     # Get user location from the User table
                     try:
@@ -456,12 +391,11 @@ def process_bean(request):
                         raise Exception(f"User with id {user_id} not found")
                     
                     # Save original image to Supabase storage
-                    original_filename = f"uploads/{user_id}/{image_id}.{file_obj.name.split('.')[-1] if hasattr(file_obj, 'name') else 'jpg'}"
-                    file_obj.seek(0)  # Reset file pointer
+                    original_filename = f"uploads/{user_id}/{image_id}.{upload.extension}"
                     
                     print(f"DEBUG: Uploading to Supabase: {original_filename}")
                     try:
-                        supabase_upload = supabase.storage.from_("Beans").upload(original_filename, file_obj.read())
+                        supabase_upload = supabase.storage.from_("Beans").upload(original_filename, upload.data)
                         print(f"DEBUG: Supabase upload result: {supabase_upload}")
                         # Check if upload was successful by checking if we got a valid response
                         if not hasattr(supabase_upload, 'path') or not supabase_upload.path:
@@ -477,6 +411,13 @@ def process_bean(request):
                         location=Location.objects.get(id=user_location) if user_location else None
                     )
                     print(f"DEBUG: Created Image record with id: {image_record.id}")
+
+                    # WebP thumbnail and preview from the pixels already in memory;
+                    # a failure here leaves them to the lazy endpoint
+                    try:
+                        store_derivatives(image_record.id, original_filename, img)
+                    except Exception as derivative_error:
+                        print(f"DEBUG: Failed to create derivatives: {str(derivative_error)}")
                     
                     # Create UserImage relationship
                     print(f"DEBUG: Creating UserImage relationship")
@@ -553,6 +494,7 @@ def process_bean(request):
                 except Exception as e:
                     print(f"Failed to save to database: {str(e)}")
                     # Add error info to the result but don't fail the entire request
+                observe_stage('db_save', time.perf_counter() - save_started)
             else:
                 print(f"DEBUG: Skipping database save - save_to_db={save_to_db}, user_id={user_id}")
                     
@@ -564,7 +506,7 @@ def process_bean(request):
                     "height": h_mm
                 },
                 "calibration": {
-                    "mm_per_pixel": extractor.mm_per_px,
+                    "mm_per_pixel": pipeline.mm_per_px,
                     "marker_size_mm": extractor.marker_length
                 },
                 "beans": all_beans,
@@ -580,20 +522,23 @@ def process_bean(request):
             # Add original image URL if saved to database and set all debug URLs to the same image
             if save_to_db and user_id:
                 try:
-                    original_filename = f"uploads/{user_id}/{image_id}.{file_obj.name.split('.')[-1] if hasattr(file_obj, 'name') else 'jpg'}"
+                    original_filename = f"uploads/{user_id}/{image_id}.{upload.extension}"
                     public_url = supabase.storage.from_("Beans").get_public_url(original_filename)
                     image_result["original_image_url"] = public_url
                     
-                    # Use the same Supabase image URL for all debug images
+                    # Annotated overlay rendered on request; the original is the fallback
+                    if image_record is not None:
+                        debug_url = request.build_absolute_uri(f"/api/beans/images/{image_record.id}/overlay/")
                     image_result["debug_images"] = {
                         "processed": public_url,
-                        "debug": public_url,
+                        "debug": debug_url or public_url,
                         "calibration": public_url
                     }
                 except:
                     pass
             
-            results.append(image_result)
+            upload.release_pixels()
+            yield image_result
 
             # # ACTIVITY LOG
             # if save_to_db and user_id:
@@ -606,11 +551,12 @@ def process_bean(request):
             #     ) 
             
         except Exception as e:
-            results.append({
+            upload.release_pixels()
+            yield {
                 "image_id": str(uuid.uuid4()),
                 "error": f"Processing failed. Error: {str(e)}",
                 "beans": []
-            })
+            }
             # ACTIVITY LOG for failure
 
             log_user_activity(
@@ -620,7 +566,70 @@ def process_bean(request):
                     resource=None,
                     status="failed"
                 )
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@admission_controlled()
+def process_bean(request):
+    """
+    Process single or multiple images for bean detection and feature extraction
+    """
+    extractor = get_extractor()
+    # Handle both single image and multiple images
+    images = []
+    
+    # Check for single image first
+    if 'image' in request.FILES:
+        images.append(request.FILES['image'])
+    
+    # Check for multiple images (this will override single image if both are present)
+    if 'images' in request.FILES:
+        images = request.FILES.getlist('images')
+    
+    # If no standard fields, check for any field starting with 'image'
+    if not images:
+        for key in request.FILES:
+            if key.startswith('image'):
+                file_list = request.FILES.getlist(key)
+                images.extend(file_list)
+                break  # Only take the first matching field to avoid duplicates
+    
+    if not images:
+        return Response({"error": "No images provided"}, status=400)
+    
+    # Debug: Log the number of images received
+    print(f"DEBUG: Processing {len(images)} images")
+    for i, img in enumerate(images):
+        print(f"DEBUG: Image {i+1}: {img.name if hasattr(img, 'name') else 'unknown'}")
+    
+    # Read each upload once; byte-identical duplicates (same sha256) are skipped
+    uploads, skipped = read_uploads(images)
+    for name in skipped:
+        print(f"DEBUG: Skipping duplicate image: {name}")
+    print(f"DEBUG: After deduplication: {len(uploads)} unique images")
+    
+    # Get optional parameters
+    comment = request.data.get('comment', '')
+    save_to_db = request.data.get('save_to_db', 'true').lower() == 'true'  # Default to true for saving
+    user_id = request.data.get('user_id', None)
+    
+    # Debug: Log the received parameters
+    print(f"DEBUG: comment='{comment}', save_to_db={save_to_db}, user_id='{user_id}'")
+    print(f"DEBUG: request.data keys: {list(request.data.keys())}")
     
+    # Validate required parameters for database saving
+    if save_to_db and not user_id:
+        return Response({"error": "user_id is required when save_to_db is true"}, status=400)
+    
+    results = process_uploads(request, extractor, uploads, comment, save_to_db, user_id)
+
+    # Opt-in streaming: one NDJSON line per image as soon as it is done
+    if stream_requested(request):
+        return ndjson_response(image_events(results, len(uploads), skipped))
+
+    results = list(results)
+
     # Step 9: Return segregated results
     return Response({
         "images": results,
@@ -631,51 +640,41 @@ def process_bean(request):
 # Keep the old single-image endpoint for backward compatibility
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
+@admission_controlled()
 def process_single_bean(request):
     try:
         file_obj = request.data['image']
     except KeyError:
         return Response({"error": "No image provided"}, status=400)
     user_id = request.data.get('user_id', None)
+    extractor = get_extractor()
 
-    # Convert uploaded image → OpenCV format
-    img = Image.open(file_obj)
-    img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    # Decode the upload buffer straight into BGR uint8
+    upload = Upload(file_obj)
+    img = upload.image
 
-    if extractor.extract_mm_per_px(img) is False:
+    calibration_result = extractor.extract_mm_per_px(img)
+    if calibration_result is False:
         return Response({"error": "Calibration marker not found"}, status=400)
     
-    img_debug, h, w = extractor.extract_mm_per_px(img)
+    img_debug, h, w, mm_per_px = calibration_result
 
     print(f"Image dimensions: {w}mm x{h}mm")
 
     # Run bean feature extraction
-    black_bg, mask, gray, bean_bboxes = extractor.preprocess_image(img)
-    features, bbox = extractor.extract_features(mask, gray)
+    pipeline = extractor.preprocess_image(img, gray=upload.gray, mm_per_px=mm_per_px)
+    features, bbox = extractor.extract_features(pipeline.mask, pipeline.gray, mm_per_px)
 
     if features is None:
         return Response({"error": "No bean detected"}, status=400)
 
-    # Draw bounding box
-    debug_img = extractor.draw_bbox(img, bean_bboxes)
+    # Nothing is stored for this endpoint, so the overlays are kept in the
+    # in-memory overlay cache instead of being written to MEDIA_ROOT
+    overlay_token = cache_rendered_overlay(pipeline.debug_overlay)
+    img_str = request.build_absolute_uri(f"/api/beans/overlays/{overlay_token}")
 
-    # Encode to base64 for frontend
-    _, buffer = cv2.imencode('.png', debug_img)
-    filename = f"{uuid.uuid4()}.png"
-    folder = os.path.join(settings.MEDIA_ROOT, "processed")
-    os.makedirs(folder, exist_ok=True)  # ensure folder exists
-
-    filepath = os.path.join(folder, filename)
-    cv2.imwrite(filepath, debug_img)
-
-    base_url = request.build_absolute_uri('/').rstrip('/')
-    img_str = f"{base_url}{settings.MEDIA_URL}processed/{filename}"
-
-    # Do the filepath saving to img_debug as well
-    filepath2 = os.path.join(folder, f"debug_{filename}")
-    cv2.imwrite(filepath2, img_debug)
-
-    img_debug_str = f"{base_url}{settings.MEDIA_URL}processed/debug_{filename}"
+    calibration_token = cache_rendered_overlay(img_debug)
+    img_debug_str = request.build_absolute_uri(f"/api/beans/overlays/{calibration_token}")
 
     log_user_activity(
         user_id=user_id,
@@ -692,6 +691,81 @@ def process_single_bean(request):
     })
 
 
+@api_view(['GET'])
+def image_overlay(request, image_id):
+    """
+    Annotated overlay of a stored image (boxes and sizes from its bean
+    detections), rendered on request and cached in memory.
+    Query params: output=webp|jpeg (default webp), max_size (longest side, px).
+    `format` is left alone because DRF reserves it for renderer selection.
+    """
+    fmt = request.GET.get('output', 'webp').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in OVERLAY_FORMATS:
+        return JsonResponse({"error": "output must be webp or jpeg"}, status=400)
+    try:
+        max_size = min(int(request.GET.get('max_size', OVERLAY_DEFAULT_MAX_SIZE)), 4096)
+    except ValueError:
+        return JsonResponse({"error": "max_size must be an integer"}, status=400)
+    if max_size < 64:
+        return JsonResponse({"error": "max_size must be at least 64"}, status=400)
+
+    try:
+        rendered = render_image_overlay(image_id, fmt, max_size)
+    except AdmissionRejected as e:
+        return busy_response(cv_admission, request, e)
+    except Exception as e:
+        print(f"Error rendering overlay for image {image_id}: {str(e)}")
+        return JsonResponse({"error": "Failed to render overlay"}, status=500)
+    if rendered is None:
+        return JsonResponse({"error": "Image not found"}, status=404)
+
+    data, content_type, etag = rendered
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(data, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+@api_view(['GET'])
+def image_derivative(request, image_id, kind):
+    """Redirect to an image's WebP thumbnail or preview, generating it on first request."""
+    if kind not in DERIVATIVE_SIZES:
+        return JsonResponse({"error": "Unknown derivative"}, status=404)
+    try:
+        path = ensure_derivative(image_id, kind)
+    except AdmissionRejected as e:
+        return busy_response(cv_admission, request, e)
+    except Exception as e:
+        print(f"Error creating {kind} for image {image_id}: {str(e)}")
+        return JsonResponse({"error": f"Failed to create {kind}"}, status=500)
+    if path is None:
+        return JsonResponse({"error": "Image not found"}, status=404)
+    return HttpResponseRedirect(supabase.storage.from_("Beans").get_public_url(path))
+
+
+@api_view(['GET'])
+def admission_stats(request):
+    """Slots, queue depth, rejections and queue wait histogram of the CV admission controller."""
+    return JsonResponse(cv_admission.snapshot())
+
+
+@api_view(['GET'])
+def transient_overlay(request, token):
+    """Overlay rendered by process-single, served from the overlay cache until evicted."""
+    cached = cached_overlay(token)
+    if cached is None:
+        return JsonResponse({"error": "Overlay expired"}, status=404)
+    data, content_type = cached
+    response = HttpResponse(data, content_type=content_type)
+    response['Cache-Control'] = 'private, max-age=3600, immutable'
+    return response
+
+
 @api_view(['GET'])
 def test_database_connection(request):
     """
@@ -825,7 +899,9 @@ def get_annotations(request):
                     ef.solidity,
                     ef.mean_intensity,
                     ef.equivalent_diameter,
-                    ef.id as extracted_feature_id
+                    ef.id as extracted_feature_id,
+                    i.thumbnail_url,
+                    i.preview_url
                 FROM images i
                 INNER JOIN user_images ui ON i.id = ui.image_id
                 INNER JOIN users u ON ui.user_id = u.id
@@ -890,6 +966,8 @@ def get_annotations(request):
                 images_data[image_id] = {
                     'image_id': row[0],
                     'image_url': row[1],
+                    'thumbnail_url': row[24],
+                    'preview_url': row[25],
                     'upload_date': row[2],
                     'user_id': row[3],
                     'first_name': row[4],
@@ -1032,6 +1110,7 @@ def get_annotations(request):
                 response_item = {
                     "id": str(img_data['image_id']),
                     "src": publicUrl,
+                    **derivative_urls(image_id, img_data['thumbnail_url'], img_data['preview_url'], request.build_absolute_uri),
                     "userName": user_name,
                     "userRole": img_data['role_name'] or "unknown",
                     "location": img_data['location_name'] or "",
@@ -1153,7 +1232,9 @@ def get_all_beans(request):
                     ef.solidity,
                     ef.mean_intensity,
                     ef.equivalent_diameter,
-                    ef.id as extracted_feature_id
+                    ef.id as extracted_feature_id,
+                    i.thumbnail_url,
+                    i.preview_url
                 FROM images i
                 INNER JOIN user_images ui ON i.id = ui.image_id
                 INNER JOIN users u ON ui.user_id = u.id
@@ -1215,6 +1296,8 @@ def get_all_beans(request):
                 images_data[image_id] = {
                     'image_id': row[0],
                     'image_url': row[1],
+                    'thumbnail_url': row[24],
+                    'preview_url': row[25],
                     'upload_date': row[2],
                     'user_id': row[3],
                     'first_name': row[4],
@@ -1396,6 +1479,7 @@ def get_all_beans(request):
                 image_data = {
                     "id": str(img_data['image_id']),
                     "src": public_url_res,
+                    **derivative_urls(image_id, img_data['thumbnail_url'], img_data['preview_url'], request.build_absolute_uri),
                     "userId": str(img_data['user_id']),
                     "userName": f"{img_data['first_name']} {img_data['last_name']}",
                     "userRole": img_data['role_name'] or "unknown",
@@ -1607,7 +1691,8 @@ def delete_bean(request,image_id):
            # First find the img url e.g. upload/userid/imgname
         image_path = image.image_url
         print(f"DEBUG: Image path to delete from Supabase: {image_path}")
-        delete_image = supabase.storage.from_("Beans").remove([image_path])
+        derivative_paths = [path for path in (image.thumbnail_url, image.preview_url) if path]
+        delete_image = supabase.storage.from_("Beans").remove([image_path] + derivative_paths)
         
         print(f"DEBUG: Successfully deleted image from Supabase storage")
         
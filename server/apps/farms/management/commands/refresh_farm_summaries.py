@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from services.farm_summaries import mark_all_farm_summaries_stale, refresh_stale_farm_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stale rows of farm_summaries (the counters behind the farm list)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every farm, not just the ones flagged as stale',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            mark_all_farm_summaries_stale()
+        refreshed = refresh_stale_farm_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {refreshed} farm summary(ies).')
+        )
@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import get_farms, create_farm, update_farm_location, get_farm_details, delete_farm, get_farm_view
+from .views import get_farms, create_farm, update_farm_location, get_farm_details, delete_farm, get_farm_view, get_farm_map
 
 urlpatterns = [
     path('get-farms/', get_farms),
     path('create/', create_farm), # Add activity Logs - done
     path('delete/', delete_farm), # Add activity Logs - done
+    path('map/', get_farm_map),
     path('<str:farm_id>/', get_farm_details), 
     path('<str:farm_id>/view/', get_farm_view),
     path('<str:farm_id>/location/', update_farm_location), # Add activity Logs - done
@@ -1,9 +1,14 @@
+import uuid
 from django.shortcuts import render
 from django.http import JsonResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from models.models import Notification, User
+from models.models import User
 from services.activity_logger import log_user_activity
+from services.notification_feed import (
+    FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE, clear_feed, create_broadcast, create_notification, get_feed,
+    mark_all_read, mark_read, unread_count
+)
 
 # Temporary email sending function - placeholder for future implementation
 def send_email_notification(user_email, title, message, notification_type):
@@ -19,24 +24,17 @@ def send_email_notification(user_email, title, message, notification_type):
     # TODO: Implement actual email sending logic
     pass
 
-def get_all_user_emails():
-    """
-    Temporary function to get all user emails from Supabase Auth.
-    In the future, this will query Supabase Auth API to get all user emails.
-    """
-    # TODO: Implement Supabase Auth API call to get all user emails
-    # For now, we'll use the emails from our User model as a placeholder
-    users = User.objects.all()
-    return [user.email for user in users if user.email]
+def parse_user_id(value):
+    """The user id as a canonical UUID string, or None when it is not a UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
 
 # Create your views here.
 
 @api_view(['GET'])
 def notification_list(request, user_id=None):
-    notifications = Notification.objects.all()
-    if user_id:
-        notifications = notifications.filter(user__id=user_id).order_by('-created_at')
-    data = []
     """
      /*
      id: '1',
@@ -46,36 +44,59 @@ def notification_list(request, user_id=None):
             read: false,
             type: 'info',
         
+    Personal notifications and broadcasts (ids "b-<id>") merged newest first,
+    ?limit=N per page (default 50, max 100). The body stays a plain array; the
+    next page's ?cursor= comes back in the X-Next-Cursor header, which is
+    absent on the last page.
     """
-    for notification in notifications:
-        data.append({
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'type': notification.type,
-            'is_read' : notification.is_read,
-            'created_at': notification.created_at,
-        })
-    return JsonResponse(data, safe=False)
+    if not user_id:
+        return JsonResponse({'status': 'error', 'message': 'User ID is required.'}, status=400)
+    user_id = parse_user_id(user_id)
+    if not user_id:
+        return JsonResponse({'status': 'error', 'message': 'Invalid user ID.'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', FEED_PAGE_SIZE)), 1), FEED_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid limit.'}, status=400)
+    try:
+        entries, next_cursor = get_feed(user_id, request.GET.get('cursor'), limit)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
+    response = JsonResponse(entries, safe=False)
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@api_view(['GET'])
+def unread_notification_count(request, user_id):
+    """Cheap enough to poll: counts only the user's unread rows."""
+    user_id = parse_user_id(user_id)
+    if not user_id:
+        return JsonResponse({'status': 'error', 'message': 'Invalid user ID.'}, status=400)
+    return JsonResponse({'user_id': user_id, 'unread': unread_count(user_id)})
 
 
 
 @api_view(['POST'])
 def mark_as_read(request):
-    try:
-        notification_id = request.data.get('notification_id')
-        notification = Notification.objects.get(id=notification_id)
-        notification.is_read = True
-        notification.save()
+    notification_id = request.data.get('notification_id')
+    # Broadcasts are read per user, so their ids need the reader
+    user_id = request.data.get('user_id')
+    if user_id:
+        user_id = parse_user_id(user_id)
+        if not user_id:
+            return Response({'status': 'error', 'message': 'Invalid user ID.'}, status=400)
+    if mark_read(notification_id, user_id):
         return Response({'status': 'success', 'message': 'Notification marked as read.'})
-    except Notification.DoesNotExist:
-        return Response({'status': 'error', 'message': 'Notification not found.'}, status=404)
+    return Response({'status': 'error', 'message': 'Notification not found.'}, status=404)
 
 @api_view(['POST'])
 def mark_all_as_read(request):
-    user_id = request.data.get('user_id')
-    notifications = Notification.objects.filter(user__id=user_id, is_read=False)
-    notifications.update(is_read=True)
+    user_id = parse_user_id(request.data.get('user_id'))
+    if not user_id:
+        return Response({'status': 'error', 'message': 'A valid user ID is required.'}, status=400)
+    mark_all_read(user_id)
     return Response({'status': 'success', 'message': 'All notifications marked as read.'})
 
 @api_view(['POST'])
@@ -87,36 +108,19 @@ def send_broadcast_notification(request):
     if not title or not message or not notification_type:
         return Response({'status': 'error', 'message': 'Title, message, and type are required.'}, status=400)
 
-    users = User.objects.all()
-    
-    # Create notifications for all users
-    for user in users:
-        Notification.objects.create(user=user, title=title, message=message, type=notification_type)
-    
-    # Send emails to all users (temporary placeholder)
-    try:
-        user_emails = get_all_user_emails()
-        for email in user_emails:
-            send_email_notification(email, title, message, notification_type)
-        # Log success
-        log_user_activity(
-                user_id=None,
-                action="CREATE",
-                details=f"Broadcast notification sent: {title}",
-                resource="Notification",
-                status="success"
-        )
-    except Exception as e:
-        print(f"Email sending failed: {e}")
-        # Don't fail the entire operation if email sending fails
-        log_user_activity(
-                user_id=None,
-                action="CREATE",
-                details=f"Broadcast notification sent with email failures.",
-                resource="Notification",
-                status="failed"
-        )
-    
+    # Stored once; every user sees it through their feed. Emailing every
+    # user would put the O(users) work back in the request, and the users
+    # table has no email addresses (they live in Supabase Auth), so broadcast
+    # emails are left to a future background job
+    create_broadcast(title, message, notification_type, audience='all')
+    log_user_activity(
+            user_id=None,
+            action="CREATE",
+            details=f"Broadcast notification sent: {title}",
+            resource="Notification",
+            status="success"
+    )
+
     return Response({'status': 'success', 'message': 'Broadcast notification sent to all users.'})
 
 @api_view(['POST'])
@@ -131,7 +135,7 @@ def send_personal_notification(request):
     
     try:
         user = User.objects.get(id=user_id)
-        Notification.objects.create(user=user, title=title, message=message, type=notification_type)
+        create_notification(user, title, message, notification_type)
         
         # Send email to the specific user (temporary placeholder)
         try:
@@ -175,8 +179,8 @@ def clear_notifications(request):
         return Response({'status': 'error', 'message': 'User ID is required.'}, status=400)
     
     try:
-        # Delete all notifications for the user
-        deleted_count = Notification.objects.filter(user__id=user_id).delete()[0]
+        # Delete the user's notifications and hide the broadcasts they can see
+        deleted_count = clear_feed(user_id)
         return Response({
             'status': 'success', 
             'message': f'{deleted_count} notifications cleared for user.',
@@ -1,7 +1,9 @@
+import base64
+import math
+from datetime import datetime
 from django.shortcuts import render
 from django.utils import timezone
 from django.http import JsonResponse
-from django.core.paginator import Paginator
 from rest_framework.decorators import api_view
 from django.db import transaction
 from models.models import Image, User, UserRole, Role, Location
@@ -114,101 +116,161 @@ def signup_user(request):
 
 # USER MANAGEMENT
 
-def change_to_role(list):
-    list["role"] = list.pop("userrole__role__name", None)
-    return list
+def encode_user_cursor(registration_date, user_id):
+    raw = f"{registration_date.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_user_cursor(cursor_value):
+    registration_date, user_id = base64.urlsafe_b64decode(cursor_value.encode()).decode().split('|', 1)
+    return datetime.fromisoformat(registration_date), user_id
+
+
+USER_LIST_COLUMNS = [
+    "id", "first_name", "last_name", "avatar_image", "registration_date",
+    "is_deleted", "location_id", "location__name", "username", "last_login",
+    "is_active", "email", "roles"
+]
+
+
+def user_list_row(row):
+    user = dict(zip(USER_LIST_COLUMNS, row))
+    # role stays for the clients that show one; the first by name, as the
+    # analytics uploader role
+    user["role"] = user["roles"][0] if user["roles"] else None
+    return user
 
 @api_view(['GET'])
 def get_users(req):
+    """
+    Users ordered by registration date (newest first), one row per user with
+    all their roles and their email from auth.users joined in the same query.
+    Two modes:
+      ?cursor=<token>&limit=M  keyset pages (the default); pass
+                               pagination.nextCursor back (no or empty cursor
+                               for the first page). The cost does not depend
+                               on how many users exist.
+      ?page=N&limit=M          numbered pages with totals; costs a COUNT and
+                               an OFFSET scan, so only for small listings.
+    Filters: search_username (substring, trigram-indexed), role (users holding
+    that role among theirs), location.
+    """
     try:
         # Get pagination and search parameters
-        page = int(req.GET.get('page', 1))
-        limit = int(req.GET.get('limit', 10))
+        limit = max(1, min(int(req.GET.get('limit', 10)), 100))
         search_username = req.GET.get('search_username', '').strip()
         role_filter = req.GET.get('role', '').strip()
         location_filter = req.GET.get('location', '').strip()
-        
-
-        
-        
-        print(f"DEBUG: get_users - page={page}, limit={limit}, search_username={search_username}, role_filter={role_filter}, location_filter={location_filter}")
-        
-        # Build the base queryset, merge to auth.users and get the email
-        users_query = User.objects.all()
-        
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, email FROM auth.users
-            """)
-            auth_users = cursor.fetchall()
-            auth_user_dict = {str(row[0]): row[1] for row in auth_users}
-            print(f"DEBUG: Auth users fetched: {auth_user_dict}")
-        
-        
-        
+        keyset = 'page' not in req.GET
 
         # Do not include user with username 'barakollect'
-        users_query = users_query.exclude(username='barakollect')
-        # Apply search filter for username
+        conditions = ["u.username <> 'barakollect'"]
+        params = []
         if search_username:
-            users_query = users_query.filter(username__icontains=search_username)
-        
-        # Apply role filter
+            escaped = search_username.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("u.username ILIKE %s")
+            params.append(f"%{escaped}%")
         if role_filter and role_filter != 'all':
-            users_query = users_query.filter(userrole__role__name=role_filter)
-        
-        # Apply location filter
+            # EXISTS instead of a join, so a user with several roles stays one row
+            conditions.append("""EXISTS (
+                SELECT 1 FROM public.user_roles ur
+                JOIN public.roles r ON r.id = ur.role_id
+                WHERE ur.user_id = u.id AND r.name = %s
+            )""")
+            params.append(role_filter)
         if location_filter and location_filter != 'all':
-            users_query = users_query.filter(location_id=location_filter)
-        
-        # Get the values with all required fields
-        users_data = users_query.values(
-            "id",
-            "first_name",
-            "last_name",
-            "avatar_image",
-            "registration_date",
-            "is_deleted",
-            "location_id",
-            "location__name",
-            "username",
-            "last_login",
-            "is_active",
-            "userrole__role__name"
-        ).order_by('-registration_date')  # Order by registration date descending
-        
-        # for each user in users_data add an email field from auth_user_dict that is mapped by id
-        for user in users_data:
-            user_id_str = str(user['id'])
-            user['email'] = auth_user_dict.get(user_id_str, '')
-        # Apply pagination using Django's Paginator
-        paginator = Paginator(users_data, limit)
-        
-        try:
-            paginated_users = paginator.page(page)
-        except Exception as e:
-            print(f"DEBUG: Pagination error: {str(e)}")
-            # If page is out of range, return the last page
-            paginated_users = paginator.page(paginator.num_pages)
-        
-        # Transform the data
-        users_list = list(map(change_to_role, list(paginated_users)))
-        
-        print(f"DEBUG: get_users - returning {len(users_list)} users, page {paginated_users.number} of {paginator.num_pages}")
-        
+            conditions.append("u.location_id = %s")
+            params.append(location_filter)
+
+        filtered_users = f"""
+            FROM public.users u
+            WHERE {' AND '.join(conditions)}
+        """
+        select_columns = """
+            SELECT u.id, u.first_name, u.last_name, u.avatar_image, u.registration_date,
+                   u.is_deleted, u.location_id, l.name, u.username, u.last_login,
+                   u.is_active,
+                   COALESCE((SELECT au.email FROM auth.users au WHERE au.id = u.id), ''),
+                   COALESCE(roles_agg.names, '{}')
+        """
+        # Per-row lookups, so they only run for the users on the page
+        page_joins = """
+            LEFT JOIN public.locations l ON l.id = u.location_id
+            LEFT JOIN LATERAL (
+                SELECT array_agg(r.name ORDER BY r.name) AS names
+                FROM public.user_roles ur
+                JOIN public.roles r ON r.id = ur.role_id
+                WHERE ur.user_id = u.id
+            ) roles_agg ON TRUE
+        """
+
+        with connection.cursor() as cursor:
+            if keyset:
+                page_conditions = ""
+                page_params = list(params)
+                if req.GET.get('cursor'):
+                    try:
+                        after_date, after_id = decode_user_cursor(req.GET['cursor'])
+                    except (ValueError, UnicodeDecodeError):
+                        return JsonResponse({"error": "Invalid cursor"}, status=400)
+                    page_conditions = "AND (u.registration_date, u.id) < (%s, %s::uuid)"
+                    page_params += [after_date, after_id]
+                # One extra row tells whether there is a next page
+                cursor.execute(f"""
+                    {select_columns}
+                    FROM (
+                        SELECT u.* {filtered_users} {page_conditions}
+                        ORDER BY u.registration_date DESC, u.id DESC
+                        LIMIT %s
+                    ) u
+                    {page_joins}
+                    ORDER BY u.registration_date DESC, u.id DESC
+                """, page_params + [limit + 1])
+                rows = cursor.fetchall()
+                has_next = len(rows) > limit
+                users_list = [user_list_row(row) for row in rows[:limit]]
+                next_cursor = None
+                if has_next:
+                    last = users_list[-1]
+                    next_cursor = encode_user_cursor(last['registration_date'], last['id'])
+                return JsonResponse({
+                    "data": users_list,
+                    "pagination": {
+                        "itemsPerPage": limit,
+                        "hasNext": has_next,
+                        "nextCursor": next_cursor
+                    }
+                })
+
+            cursor.execute(f"SELECT COUNT(*) {filtered_users}", params)
+            total_items = cursor.fetchone()[0]
+            total_pages = max(1, math.ceil(total_items / limit))
+            # Out-of-range pages return the last page, as before
+            page = min(max(1, int(req.GET.get('page', 1))), total_pages)
+            cursor.execute(f"""
+                {select_columns}
+                FROM (
+                    SELECT u.* {filtered_users}
+                    ORDER BY u.registration_date DESC, u.id DESC
+                    LIMIT %s OFFSET %s
+                ) u
+                {page_joins}
+                ORDER BY u.registration_date DESC, u.id DESC
+            """, params + [limit, (page - 1) * limit])
+            users_list = [user_list_row(row) for row in cursor.fetchall()]
+
         return JsonResponse({
             "data": users_list,
             "pagination": {
-                "currentPage": paginated_users.number,
-                "totalPages": paginator.num_pages,
-                "totalItems": paginator.count,
+                "currentPage": page,
+                "totalPages": total_pages,
+                "totalItems": total_items,
                 "itemsPerPage": limit,
-                "hasNext": paginated_users.has_next(),
-                "hasPrevious": paginated_users.has_previous()
+                "hasNext": page < total_pages,
+                "hasPrevious": page > 1
             }
         })
     except Exception as e:
-        print(f"DEBUG: Error in get_users: {str(e)}")
         return JsonResponse({"error": str(e)}, status=500)
 
 
@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The notification stream (services.notification_stream) is served here
+directly; every other request goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Needs the app registry loaded by get_asgi_application()
+from services.notification_stream import match_stream_path, notification_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        user_id = match_stream_path(scope['path'])
+        if user_id:
+            return await notification_stream(scope, receive, send, user_id)
+    return await django_application(scope, receive, send)
@@ -26,6 +26,30 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 SUPABASE_URL= os.getenv("SUPABASE_URL")
 SUPABASE_ROLE_KEY= os.getenv("SUPABASE_ROLE_KEY")
 SUPABASE_KEY= os.getenv("SUPABASE_KEY")
+SUPABASE_STATUS_URL = os.getenv("SUPABASE_STATUS_URL", "https://status.supabase.com/api/v2/summary.json")
+# Seconds between background refreshes of the admin system status
+HEALTH_POLL_INTERVAL = int(os.getenv("HEALTH_POLL_INTERVAL", "60"))
+# Bean detector: 'torch', 'onnx' or 'onnx-int8' (see apps/beans/detectors.py)
+BEAN_DETECTOR_BACKEND = os.getenv("BEAN_DETECTOR_BACKEND", "torch")
+# Folder of bean photos for the torch/ONNX parity test (apps/beans/tests.py)
+DETECTOR_PARITY_IMAGES = os.getenv("DETECTOR_PARITY_IMAGES", "")
+# Threads per ONNX Runtime inference; unset lets ONNX Runtime use every core
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0")) or None
+# Photos above this many pixels go through the tiled bean pipeline
+BEAN_TILED_MIN_PIXELS = int(os.getenv("BEAN_TILED_MIN_PIXELS", str(16_000_000)))
+BEAN_TILE_SIZE = int(os.getenv("BEAN_TILE_SIZE", "1280"))
+BEAN_TILE_OVERLAP = float(os.getenv("BEAN_TILE_OVERLAP", "0.2"))
+# Memory for rendered bean overlays (apps/beans/overlays.py)
+BEAN_OVERLAY_CACHE_BYTES = int(os.getenv("BEAN_OVERLAY_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Longest side of the WebP derivatives stored next to each photo (apps/beans/derivatives.py)
+BEAN_THUMBNAIL_SIZE = int(os.getenv("BEAN_THUMBNAIL_SIZE", "320"))
+BEAN_PREVIEW_SIZE = int(os.getenv("BEAN_PREVIEW_SIZE", "1280"))
+# Admission control for the CV endpoints, per worker process (services/admission.py)
+CV_MAX_CONCURRENT = int(os.getenv("CV_MAX_CONCURRENT", "2"))
+CV_MAX_QUEUE = int(os.getenv("CV_MAX_QUEUE", "8"))
+CV_QUEUE_TIMEOUT = float(os.getenv("CV_QUEUE_TIMEOUT", "30"))
+# Bearer token required on /metrics when set (services/metrics.py)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 
 
@@ -68,6 +92,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "services.metrics.MetricsMiddleware",
 ]
 
 # CORS (allow React dev server)
@@ -76,6 +101,8 @@ MIDDLEWARE = [
 #     "http://127.0.0.1:5174",
 # ]
 CORS_ALLOW_ALL_ORIGINS = True
+# Paginated list endpoints return the next page's cursor in a header
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'Retry-After', 'X-Queue-Wait']
 
 # Media uploads
 MEDIA_URL = '/media/'
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from services.metrics import metrics_endpoint
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,6 +28,7 @@ urlpatterns = [
     path('api/beans/', include('apps.beans.urls')),  # <- add this
     path('api/farms/', include('apps.farms.urls')),  # <- add this
     path('api/analytics/', include('apps.analytics.urls')),  # <- add this
+    path('metrics', metrics_endpoint),  # Prometheus scrape target
 ]
 
 # Serve media files in development
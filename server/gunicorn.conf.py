@@ -0,0 +1,29 @@
+# gunicorn settings for the container (see Dockerfile)
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+# The notification broker is in-process, so streams only reach clients of
+# the worker that wrote the event; keep one worker unless that changes
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# PRELOAD_MODELS=1 loads the YOLO weights in the master before forking so
+# the workers share them copy-on-write instead of each loading a copy.
+# ONNX sessions can't cross a fork, so with an onnx backend each worker
+# builds its session right after forking instead. Without PRELOAD_MODELS
+# each worker loads the model on its first bean request.
+preload_models = os.environ.get('PRELOAD_MODELS', '0') == '1'
+preload_app = preload_models
+
+
+def when_ready(server):
+    if preload_models:
+        from apps.beans.model_registry import preload
+        preload()
+        server.log.info("Preloaded bean detection models")
+
+
+def post_fork(server, worker):
+    if preload_models:
+        from apps.beans.model_registry import preload_after_fork
+        preload_after_fork()
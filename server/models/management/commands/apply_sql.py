@@ -0,0 +1,47 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sql")
+
+
+class Command(BaseCommand):
+    help = 'Apply the SQL files in models/sql (tables, views, triggers and indexes not managed by Django)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Only apply these files (e.g. 001_scatter_samples.sql). Default: all, in order',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the available SQL files and exit',
+        )
+
+    def handle(self, *args, **options):
+        available = sorted(f for f in os.listdir(SQL_DIR) if f.endswith('.sql'))
+
+        if options['list']:
+            for filename in available:
+                self.stdout.write(filename)
+            return
+
+        selected = options['files'] or available
+        missing = [f for f in selected if f not in available]
+        if missing:
+            raise CommandError(f"Unknown SQL file(s): {', '.join(missing)}")
+
+        # Every file is written to be idempotent, so re-running is safe
+        for filename in selected:
+            with open(os.path.join(SQL_DIR, filename)) as sql_file:
+                sql = sql_file.read()
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql)
+            self.stdout.write(f'Applied: {filename}')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Applied {len(selected)} SQL file(s).')
+        )
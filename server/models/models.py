@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models 
+from django.utils import timezone
 
 
 
@@ -85,7 +86,12 @@ class ActivityLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     description = models.TextField()
     action = models.CharField(max_length=150, choices=ACTION_CHOICES)
-    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=50, blank=True, default='')
+    resource = models.CharField(max_length=255, blank=True, default='')
+    details = models.TextField(blank=True, default='')
+    # When the action happened, set by log_user_activity; rows are written
+    # later by the background writer
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "activity_logs"
@@ -104,6 +110,43 @@ class Notification(models.Model):
         db_table = "notifications"
 
 
+class Broadcast(models.Model):
+    """
+    One row per broadcast, shown to every user in the audience instead of
+    being copied into each user's notifications.
+    """
+    AUDIENCE_CHOICES = [
+        ('all', 'All users'),
+        ('admin', 'Admins'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    type = models.CharField(max_length=50)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, default='all')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "broadcasts"
+        managed = False
+
+
+class BroadcastReceipt(models.Model):
+    """Per-user read/cleared state of a broadcast, created on first use."""
+    id = models.BigAutoField(primary_key=True)
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    is_read = models.BooleanField(default=False)
+    is_cleared = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "broadcast_receipts"
+        managed = False
+        unique_together = ("broadcast", "user")
+
+
 
 
 
@@ -111,6 +154,8 @@ class Notification(models.Model):
 class Image(models.Model):
     id = models.BigAutoField(primary_key=True)
     image_url = models.TextField()
+    thumbnail_url = models.TextField(null=True, blank=True)
+    preview_url = models.TextField(null=True, blank=True)
     location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True)
     upload_date = models.DateTimeField(auto_now_add=True)
 
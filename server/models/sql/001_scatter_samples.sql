@@ -0,0 +1,48 @@
+-- Stratified reservoir sample behind the aspect-ratio/roundness scatter.
+-- Maintained incrementally by services/scatter_sampler.py. The strata are the
+-- analytics cube keys (farm, uploader role, upload year and month), so the
+-- dashboard filters select whole reservoirs.
+
+-- One row per stratum; seen is the reservoir's "n"
+CREATE TABLE IF NOT EXISTS public.scatter_strata (
+    id bigserial PRIMARY KEY,
+    location_id bigint NOT NULL REFERENCES public.locations(id) ON DELETE CASCADE,
+    role text,
+    year integer,
+    month integer,
+    seen bigint NOT NULL DEFAULT 0,
+    UNIQUE NULLS NOT DISTINCT (location_id, role, year, month)
+);
+
+-- Up to SCATTER_SAMPLE_PER_STRATUM rows per stratum; slots are kept in random order
+CREATE TABLE IF NOT EXISTS public.scatter_stratum_samples (
+    stratum_id bigint NOT NULL REFERENCES public.scatter_strata(id) ON DELETE CASCADE,
+    slot integer NOT NULL,
+    extracted_feature_id bigint NOT NULL REFERENCES public.extracted_features(id) ON DELETE CASCADE,
+    aspect_ratio double precision NOT NULL,
+    roundness double precision NOT NULL,
+    PRIMARY KEY (stratum_id, slot)
+);
+
+-- Watermark: highest extracted_features.id already offered to the reservoirs
+CREATE TABLE IF NOT EXISTS public.scatter_sample_meta (
+    id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    last_feature_id bigint NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO public.scatter_sample_meta (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- Reservoirs from the earlier per-farm layout can't be split into strata;
+-- drop them and rebuild from the first bean
+DO $$
+BEGIN
+    IF to_regclass('public.scatter_samples') IS NOT NULL THEN
+        DROP TABLE public.scatter_samples;
+        DROP TABLE IF EXISTS public.scatter_sample_state;
+        UPDATE public.scatter_sample_meta SET last_feature_id = 0, updated_at = NOW() WHERE id = 1;
+        IF to_regclass('public.scatter_sample_offered') IS NOT NULL THEN
+            TRUNCATE public.scatter_sample_offered;
+        END IF;
+    END IF;
+END $$;
@@ -0,0 +1,92 @@
+-- Pre-aggregated counts behind the admin dashboard filters.
+-- One row per (location, uploader role, year, month); every image falls in
+-- exactly one cell, so summing cells gives exact totals for any filter.
+-- Refreshed by services/analytics_cube.py (REFRESH ... CONCURRENTLY).
+-- The uploader role rule (first role by name) is mirrored by
+-- UPLOADER_ROLE_SQL in services/analytics_cube.py for the raw-table filters.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.analytics_cube AS
+WITH image_facts AS (
+    SELECT images.id AS image_id,
+           images.location_id,
+           uploader.role,
+           EXTRACT(YEAR FROM images.upload_date)::int AS year,
+           EXTRACT(MONTH FROM images.upload_date)::int AS month
+    FROM images
+    LEFT JOIN LATERAL (
+        SELECT roles.name AS role
+        FROM user_images
+        JOIN user_roles ON user_images.user_id = user_roles.user_id
+        JOIN roles ON user_roles.role_id = roles.id
+        WHERE user_images.image_id = images.id
+        ORDER BY roles.name
+        LIMIT 1
+    ) uploader ON TRUE
+),
+image_annotations AS (
+    SELECT image_id,
+           COUNT(*) FILTER (WHERE (label->>'is_validated')::boolean = true) AS validated,
+           COUNT(*) FILTER (WHERE (label->>'is_validated')::boolean = false) AS pending
+    FROM annotations
+    GROUP BY image_id
+),
+image_predictions AS (
+    SELECT image_id, COUNT(*) AS predictions
+    FROM predictions
+    GROUP BY image_id
+),
+cell_bean_types AS (
+    SELECT location_id, role, year, month, jsonb_object_agg(bean_type, n) AS bean_types
+    FROM (
+        SELECT f.location_id, f.role, f.year, f.month,
+               COALESCE(p.predicted_label->>'bean_type', 'Unknown') AS bean_type,
+               COUNT(*) AS n
+        FROM predictions p
+        JOIN image_facts f ON f.image_id = p.image_id
+        GROUP BY 1, 2, 3, 4, 5
+    ) t
+    GROUP BY location_id, role, year, month
+),
+cells AS (
+    SELECT f.location_id, f.role, f.year, f.month,
+           COUNT(*) AS uploads,
+           COUNT(*) FILTER (WHERE a.validated > 0) AS validated_images,
+           COUNT(*) FILTER (WHERE a.pending > 0) AS pending_images,
+           COALESCE(SUM(a.validated), 0) AS validated_annotations,
+           COALESCE(SUM(a.pending), 0) AS pending_annotations,
+           COALESCE(SUM(ip.predictions), 0) AS predictions
+    FROM image_facts f
+    LEFT JOIN image_annotations a ON a.image_id = f.image_id
+    LEFT JOIN image_predictions ip ON ip.image_id = f.image_id
+    GROUP BY f.location_id, f.role, f.year, f.month
+)
+SELECT c.location_id, c.role, c.year, c.month,
+       c.uploads::bigint AS uploads,
+       c.validated_images::bigint AS validated_images,
+       c.pending_images::bigint AS pending_images,
+       c.validated_annotations::bigint AS validated_annotations,
+       c.pending_annotations::bigint AS pending_annotations,
+       c.predictions::bigint AS predictions,
+       COALESCE(bt.bean_types, '{}'::jsonb) AS bean_types
+FROM cells c
+LEFT JOIN cell_bean_types bt
+       ON bt.location_id IS NOT DISTINCT FROM c.location_id
+      AND bt.role IS NOT DISTINCT FROM c.role
+      AND bt.year IS NOT DISTINCT FROM c.year
+      AND bt.month IS NOT DISTINCT FROM c.month;
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY (images without a farm
+-- or uploader still form a single cell, hence NULLS NOT DISTINCT)
+CREATE UNIQUE INDEX IF NOT EXISTS analytics_cube_key
+    ON public.analytics_cube (location_id, role, year, month) NULLS NOT DISTINCT;
+
+CREATE INDEX IF NOT EXISTS analytics_cube_year_month_idx
+    ON public.analytics_cube (year, month);
+
+-- When the cube was last rebuilt
+CREATE TABLE IF NOT EXISTS public.analytics_cube_meta (
+    id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    refreshed_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO public.analytics_cube_meta (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
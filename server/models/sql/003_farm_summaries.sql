@@ -0,0 +1,254 @@
+-- Per-farm counters behind get_farms, one row per location.
+-- Triggers only mark the affected farms stale (and bump their version);
+-- get_farms recomputes the stale rows with refresh_farm_summary(), which only
+-- reads that farm's users, images and beans.
+
+CREATE TABLE IF NOT EXISTS public.farm_summaries (
+    location_id bigint PRIMARY KEY REFERENCES public.locations(id) ON DELETE CASCADE,
+    owner text,
+    user_count bigint NOT NULL DEFAULT 0,
+    image_count bigint NOT NULL DEFAULT 0,
+    validated_uploads bigint NOT NULL DEFAULT 0,
+    pending_validations bigint NOT NULL DEFAULT 0,
+    avg_major_axis_length numeric,
+    avg_minor_axis_length numeric,
+    stale boolean NOT NULL DEFAULT true,
+    -- Bumped on every change, so readers can use it as a cache key
+    version bigint NOT NULL DEFAULT 1,
+    refreshed_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS farm_summaries_stale_idx
+    ON public.farm_summaries (location_id) WHERE stale;
+
+-- Counts follow the users registered at the farm and the images they
+-- uploaded (same meaning as the old get_farms query)
+CREATE OR REPLACE FUNCTION public.refresh_farm_summary(loc bigint) RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    seen_version bigint;
+BEGIN
+    SELECT version INTO seen_version FROM public.farm_summaries WHERE location_id = loc;
+
+    INSERT INTO public.farm_summaries AS fs (
+        location_id, owner, user_count, image_count, validated_uploads,
+        pending_validations, avg_major_axis_length, avg_minor_axis_length,
+        stale, refreshed_at
+    )
+    SELECT loc,
+           (
+               SELECT CONCAT(us.first_name, '', us.last_name)
+               FROM public.users AS us
+               JOIN public.user_roles ur ON us.id = ur.user_id
+               JOIN public.roles r ON r.id = ur.role_id
+               WHERE r.name = 'farmer' AND us.location_id = loc
+               ORDER BY us.last_login ASC
+               LIMIT 1
+           ),
+           (SELECT COUNT(*) FROM public.users WHERE location_id = loc),
+           img.image_count,
+           img.validated,
+           img.pending,
+           feat.avg_major,
+           feat.avg_minor,
+           false,
+           NOW()
+    FROM (
+        SELECT COUNT(DISTINCT ui.id) AS image_count,
+               COUNT(DISTINCT i.id) FILTER (WHERE (a.label->>'is_validated')::boolean = true) AS validated,
+               COUNT(DISTINCT i.id) FILTER (WHERE (a.label->>'is_validated')::boolean = false) AS pending
+        FROM public.users us
+        JOIN public.user_images ui ON ui.user_id = us.id
+        LEFT JOIN public.images i ON i.id = ui.image_id
+        LEFT JOIN public.annotations a ON a.image_id = i.id
+        WHERE us.location_id = loc
+    ) img,
+    (
+        SELECT AVG(ef.major_axis_length) AS avg_major,
+               AVG(ef.minor_axis_length) AS avg_minor
+        FROM public.users us
+        JOIN public.user_images ui ON ui.user_id = us.id
+        JOIN public.predictions pred ON pred.image_id = ui.image_id
+        JOIN public.extracted_features ef ON ef.prediction_id = pred.id
+        WHERE us.location_id = loc
+    ) feat
+    ON CONFLICT (location_id) DO UPDATE SET
+        owner = EXCLUDED.owner,
+        user_count = EXCLUDED.user_count,
+        image_count = EXCLUDED.image_count,
+        validated_uploads = EXCLUDED.validated_uploads,
+        pending_validations = EXCLUDED.pending_validations,
+        avg_major_axis_length = EXCLUDED.avg_major_axis_length,
+        avg_minor_axis_length = EXCLUDED.avg_minor_axis_length,
+        -- A change that landed while this ran keeps the row stale
+        stale = fs.version IS DISTINCT FROM seen_version,
+        refreshed_at = EXCLUDED.refreshed_at;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.mark_farm_summary_stale(loc bigint) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO public.farm_summaries (location_id)
+    SELECT loc WHERE loc IS NOT NULL
+    ON CONFLICT (location_id) DO UPDATE SET
+        stale = true,
+        version = public.farm_summaries.version + 1;
+$$;
+
+-- Farms of the users who uploaded an image, plus the farm the image itself
+-- is located at (the admin farm details group by images.location_id)
+CREATE OR REPLACE FUNCTION public.mark_image_farms_stale(img bigint) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.mark_farm_summary_stale(loc)
+    FROM (
+        SELECT us.location_id AS loc
+        FROM public.user_images ui
+        JOIN public.users us ON us.id = ui.user_id
+        WHERE ui.image_id = img AND us.location_id IS NOT NULL
+        UNION
+        SELECT location_id FROM public.images WHERE id = img AND location_id IS NOT NULL
+    ) farms;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_locations_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.mark_farm_summary_stale(NEW.id);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_users_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.mark_farm_summary_stale(OLD.location_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.location_id IS DISTINCT FROM OLD.location_id) THEN
+        PERFORM public.mark_farm_summary_stale(NEW.location_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- user_roles and user_images rows both point at a user
+CREATE OR REPLACE FUNCTION public.farm_summaries_user_rows_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.mark_farm_summary_stale(location_id) FROM public.users WHERE id = OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.mark_farm_summary_stale(location_id) FROM public.users WHERE id = NEW.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_annotations_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.mark_image_farms_stale(OLD.image_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.image_id IS DISTINCT FROM OLD.image_id) THEN
+        PERFORM public.mark_image_farms_stale(NEW.image_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_images_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- The row is gone or moved, so its old farm is marked directly
+        PERFORM public.mark_farm_summary_stale(OLD.location_id);
+        PERFORM public.mark_image_farms_stale(OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.mark_image_farms_stale(NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_predictions_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.mark_image_farms_stale(OLD.image_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.image_id IS DISTINCT FROM OLD.image_id) THEN
+        PERFORM public.mark_image_farms_stale(NEW.image_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.farm_summaries_extracted_features_trg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    row_prediction_id bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_prediction_id := OLD.prediction_id;
+    ELSE
+        row_prediction_id := NEW.prediction_id;
+    END IF;
+    PERFORM public.mark_image_farms_stale(image_id) FROM public.predictions WHERE id = row_prediction_id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS farm_summaries_locations ON public.locations;
+CREATE TRIGGER farm_summaries_locations
+    AFTER INSERT ON public.locations
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_locations_trg();
+
+-- On UPDATE, users only matter when the columns the summary reads change
+-- (last_login picks the owner)
+DROP TRIGGER IF EXISTS farm_summaries_users ON public.users;
+CREATE TRIGGER farm_summaries_users
+    AFTER INSERT OR DELETE OR UPDATE OF location_id, first_name, last_name, last_login ON public.users
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_users_trg();
+
+DROP TRIGGER IF EXISTS farm_summaries_user_roles ON public.user_roles;
+CREATE TRIGGER farm_summaries_user_roles
+    AFTER INSERT OR UPDATE OR DELETE ON public.user_roles
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_user_rows_trg();
+
+DROP TRIGGER IF EXISTS farm_summaries_user_images ON public.user_images;
+CREATE TRIGGER farm_summaries_user_images
+    AFTER INSERT OR UPDATE OR DELETE ON public.user_images
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_user_rows_trg();
+
+DROP TRIGGER IF EXISTS farm_summaries_annotations ON public.annotations;
+CREATE TRIGGER farm_summaries_annotations
+    AFTER INSERT OR UPDATE OR DELETE ON public.annotations
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_annotations_trg();
+
+-- Images carry the location and upload date the farm payloads read; an
+-- update of any other column is cheap to treat the same way
+DROP TRIGGER IF EXISTS farm_summaries_images ON public.images;
+CREATE TRIGGER farm_summaries_images
+    AFTER INSERT OR UPDATE OR DELETE ON public.images
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_images_trg();
+
+-- Bean counts and bean types (predicted_label) come from predictions
+DROP TRIGGER IF EXISTS farm_summaries_predictions ON public.predictions;
+CREATE TRIGGER farm_summaries_predictions
+    AFTER INSERT OR UPDATE OF image_id, predicted_label OR DELETE ON public.predictions
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_predictions_trg();
+
+DROP TRIGGER IF EXISTS farm_summaries_extracted_features ON public.extracted_features;
+CREATE TRIGGER farm_summaries_extracted_features
+    AFTER INSERT OR UPDATE OF prediction_id, major_axis_length, minor_axis_length OR DELETE ON public.extracted_features
+    FOR EACH ROW EXECUTE FUNCTION public.farm_summaries_extracted_features_trg();
+
+-- Every existing farm starts stale; the first get_farms call fills them in
+INSERT INTO public.farm_summaries (location_id)
+SELECT id FROM public.locations
+ON CONFLICT (location_id) DO NOTHING;
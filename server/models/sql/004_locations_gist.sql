@@ -0,0 +1,6 @@
+-- Spatial index for viewport queries on farm locations (get_farm_map).
+-- The map works in lon/lat degrees, so the index is on the geometry cast
+-- that the query filters with.
+CREATE INDEX IF NOT EXISTS locations_location_geom_gist
+    ON public.locations USING GIST ((location::geometry))
+    WHERE location IS NOT NULL;
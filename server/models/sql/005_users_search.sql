@@ -0,0 +1,9 @@
+-- Indexes behind get_users: trigram search on username (ILIKE '%term%')
+-- and the (registration_date, id) keyset the listing is ordered by.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS users_username_trgm
+    ON public.users USING GIN (username gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS users_registration_keyset
+    ON public.users (registration_date DESC, id DESC);
@@ -0,0 +1,32 @@
+-- Fan-out-on-read broadcasts (models.Broadcast / models.BroadcastReceipt).
+-- A broadcast is stored once; receipts only exist for users who have read
+-- or cleared it.
+
+CREATE TABLE IF NOT EXISTS public.broadcasts (
+    id bigserial PRIMARY KEY,
+    title varchar(255) NOT NULL,
+    message text NOT NULL,
+    type varchar(50) NOT NULL,
+    audience varchar(20) NOT NULL DEFAULT 'all' CHECK (audience IN ('all', 'admin')),
+    created_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS broadcasts_audience_created_idx
+    ON public.broadcasts (audience, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS public.broadcast_receipts (
+    id bigserial PRIMARY KEY,
+    broadcast_id bigint NOT NULL REFERENCES public.broadcasts(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    is_read boolean NOT NULL DEFAULT false,
+    is_cleared boolean NOT NULL DEFAULT false,
+    updated_at timestamptz NOT NULL DEFAULT NOW(),
+    UNIQUE (broadcast_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS broadcast_receipts_user_idx
+    ON public.broadcast_receipts (user_id, broadcast_id);
+
+-- Personal half of the merged feed
+CREATE INDEX IF NOT EXISTS notifications_user_created_idx
+    ON public.notifications (user_id, created_at DESC);
@@ -0,0 +1,5 @@
+-- Unread counts and mark-all-as-read only touch a user's unread rows, and
+-- the feed pages through (user_id, created_at) inside that index too.
+
+CREATE INDEX IF NOT EXISTS notifications_user_read_created_idx
+    ON public.notifications (user_id, is_read, created_at DESC);
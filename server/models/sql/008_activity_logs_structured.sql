@@ -0,0 +1,28 @@
+-- Structured audit fields for activity_logs (models.ActivityLog).
+-- description keeps the old "status->..;details->..;resource->.." string for
+-- existing readers; new rows fill both.
+
+ALTER TABLE public.activity_logs ADD COLUMN IF NOT EXISTS status varchar(50) NOT NULL DEFAULT '';
+ALTER TABLE public.activity_logs ADD COLUMN IF NOT EXISTS resource varchar(255) NOT NULL DEFAULT '';
+ALTER TABLE public.activity_logs ADD COLUMN IF NOT EXISTS details text NOT NULL DEFAULT '';
+
+-- Backfill rows written before the columns existed. Only descriptions in the
+-- exact three-field format are split (the same rule the old list view used);
+-- anything else keeps empty fields.
+UPDATE public.activity_logs
+SET status = split_part(split_part(description, ';', 1), '->', 2),
+    details = split_part(split_part(description, ';', 2), '->', 2),
+    resource = split_part(split_part(description, ';', 3), '->', 2)
+WHERE status = '' AND resource = '' AND details = ''
+  AND length(description) - length(replace(description, '->', '')) = 2 * 3
+  AND length(description) - length(replace(description, ';', '')) = 2;
+
+-- Keyset order for the admin log page, plus the filtered variants of it
+CREATE INDEX IF NOT EXISTS activity_logs_created_idx
+    ON public.activity_logs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_action_created_idx
+    ON public.activity_logs (action, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_user_created_idx
+    ON public.activity_logs (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_status_created_idx
+    ON public.activity_logs (status, created_at DESC, id DESC);
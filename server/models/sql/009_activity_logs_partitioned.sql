@@ -0,0 +1,105 @@
+-- activity_logs range-partitioned by month on created_at, one table per month
+-- named activity_logs_YYYY_MM plus activity_logs_default for anything outside
+-- them. Retention (python manage.py purge_activity_logs) drops or detaches
+-- whole months instead of deleting rows.
+--
+-- The existing table is converted in place the first time this runs; later
+-- runs only keep the upcoming partitions in place.
+
+-- Create the monthly partitions from from_month through months_ahead months
+-- after the current one. Rows already sitting in the default partition for a
+-- new month are moved into it.
+CREATE OR REPLACE FUNCTION public.ensure_activity_log_partitions(months_ahead int DEFAULT 3, from_month date DEFAULT NULL)
+RETURNS int
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', COALESCE(from_month, CURRENT_DATE))::date;
+    last_month date := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::date;
+    partition_name text;
+    created int := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := format('activity_logs_%s', to_char(month_start, 'YYYY_MM'));
+        IF to_regclass('public.' || partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE public.%I (LIKE public.activity_logs INCLUDING DEFAULTS)', partition_name);
+            IF to_regclass('public.activity_logs_default') IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM public.activity_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *)
+                     INSERT INTO public.%I SELECT * FROM moved',
+                    month_start, (month_start + interval '1 month')::date, partition_name
+                );
+            END IF;
+            EXECUTE format(
+                'ALTER TABLE public.activity_logs ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+DO $$
+DECLARE
+    first_month date;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('public.activity_logs')) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE public.activity_logs RENAME TO activity_logs_legacy;
+    -- Free the index names the new table is about to take
+    ALTER INDEX IF EXISTS public.activity_logs_pkey RENAME TO activity_logs_legacy_pkey;
+    DROP INDEX IF EXISTS public.activity_logs_created_idx, public.activity_logs_action_created_idx,
+        public.activity_logs_user_created_idx, public.activity_logs_status_created_idx;
+
+    -- Same columns as models.ActivityLog; the partition key has to be part
+    -- of the primary key
+    CREATE TABLE public.activity_logs (
+        id bigint NOT NULL,
+        user_id uuid REFERENCES public.users(id) ON DELETE SET NULL,
+        description text NOT NULL,
+        action varchar(150) NOT NULL,
+        status varchar(50) NOT NULL DEFAULT '',
+        resource varchar(255) NOT NULL DEFAULT '',
+        details text NOT NULL DEFAULT '',
+        created_at timestamptz NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE SEQUENCE public.activity_logs_partitioned_id_seq OWNED BY public.activity_logs.id;
+    ALTER TABLE public.activity_logs
+        ALTER COLUMN id SET DEFAULT nextval('public.activity_logs_partitioned_id_seq');
+
+    CREATE TABLE public.activity_logs_default PARTITION OF public.activity_logs DEFAULT;
+
+    SELECT date_trunc('month', MIN(created_at))::date INTO first_month FROM public.activity_logs_legacy;
+    PERFORM public.ensure_activity_log_partitions(3, first_month);
+
+    INSERT INTO public.activity_logs (id, user_id, description, action, status, resource, details, created_at)
+    SELECT id, user_id, description, action, status, resource, details, COALESCE(created_at, NOW())
+    FROM public.activity_logs_legacy;
+
+    PERFORM setval(
+        'public.activity_logs_partitioned_id_seq',
+        COALESCE((SELECT MAX(id) FROM public.activity_logs), 0) + 1,
+        false
+    );
+
+    DROP TABLE public.activity_logs_legacy;
+END;
+$$;
+
+-- Indexes on the parent are created on every partition, current and future
+CREATE INDEX IF NOT EXISTS activity_logs_created_idx
+    ON public.activity_logs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_action_created_idx
+    ON public.activity_logs (action, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_user_created_idx
+    ON public.activity_logs (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS activity_logs_status_created_idx
+    ON public.activity_logs (status, created_at DESC, id DESC);
+
+SELECT public.ensure_activity_log_partitions(3);
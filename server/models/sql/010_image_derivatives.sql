@@ -0,0 +1,11 @@
+-- Storage paths of the WebP thumbnail and preview generated for each image
+-- (apps/beans/derivatives.py). NULL until they are generated; list endpoints
+-- then point at the lazy /api/beans/images/<id>/thumbnail/ endpoint instead.
+
+ALTER TABLE public.images
+    ADD COLUMN IF NOT EXISTS thumbnail_url text,
+    ADD COLUMN IF NOT EXISTS preview_url text;
+
+-- The backfill command walks the images that still have no derivatives
+CREATE INDEX IF NOT EXISTS images_missing_derivatives_idx
+    ON public.images (id) WHERE thumbnail_url IS NULL OR preview_url IS NULL;
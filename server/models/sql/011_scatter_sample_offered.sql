@@ -0,0 +1,17 @@
+-- extracted_features ids already offered to the scatter reservoirs within
+-- the trailing window services/scatter_sampler.py re-scans below its
+-- watermark (beans whose transaction commits after a higher id was read).
+-- Rows older than the window are pruned on every refresh.
+CREATE TABLE IF NOT EXISTS public.scatter_sample_offered (
+    extracted_feature_id bigint PRIMARY KEY
+);
+
+-- First run: the ids just below the existing watermark were offered already
+INSERT INTO public.scatter_sample_offered (extracted_feature_id)
+SELECT ef.id
+FROM public.extracted_features ef, public.scatter_sample_meta m
+WHERE m.id = 1
+  AND ef.id > m.last_feature_id - 10000
+  AND ef.id <= m.last_feature_id
+  AND NOT EXISTS (SELECT 1 FROM public.scatter_sample_offered)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,134 @@
+"""
+Retention for the month-partitioned activity_logs table
+(models/sql/009_activity_logs_partitioned.sql).
+
+Expired months are removed by dropping (or detaching) their partition, which
+takes a brief lock instead of deleting rows one by one.
+
+The upcoming monthly partitions are created by the purge command and by the
+activity log writer itself (ensure_partitions_for), so new rows land in
+their month instead of piling up in activity_logs_default.
+"""
+
+import re
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction
+
+ACTIVITY_LOG_RETENTION_MONTHS = getattr(settings, 'ACTIVITY_LOG_RETENTION_MONTHS', 12)
+ACTIVITY_LOG_MONTHS_AHEAD = 3
+# Below this many estimated rows, truncate_activity_logs counts exactly
+ACTIVITY_LOG_EXACT_COUNT_BELOW = 10000
+
+PARTITION_NAME = re.compile(r'^activity_logs_(\d{4})_(\d{2})$')
+
+
+def ensure_partitions(months_ahead=ACTIVITY_LOG_MONTHS_AHEAD):
+    """Create the partitions for the coming months; returns how many were added."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT public.ensure_activity_log_partitions(%s)", [months_ahead])
+        return cursor.fetchone()[0]
+
+
+_ensured_month = None
+
+
+def ensure_partitions_for(month):
+    """
+    ensure_partitions() once per process and calendar month: cheap enough to
+    call before every write. month is any date in the month being written.
+    """
+    global _ensured_month
+    month = (month.year, month.month)
+    if _ensured_month is not None and month <= _ensured_month:
+        return 0
+    created = ensure_partitions()
+    _ensured_month = month
+    return created
+
+
+def monthly_partitions():
+    """[(partition name, first day of its month)] oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.activity_logs'::regclass
+        """)
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def retention_cutoff(retention_months, today=None):
+    """First day of the oldest month kept; retention_months includes the current month."""
+    today = today or date.today()
+    month_index = today.year * 12 + (today.month - 1) - (max(retention_months, 1) - 1)
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def expired_partitions(retention_months=ACTIVITY_LOG_RETENTION_MONTHS, today=None):
+    cutoff = retention_cutoff(retention_months, today)
+    return [(name, month) for name, month in monthly_partitions() if month < cutoff]
+
+
+def purge_expired_partitions(retention_months=ACTIVITY_LOG_RETENTION_MONTHS, detach=False):
+    """
+    Drop every partition for a month older than retention_months months
+    (detach instead to keep the table around for archiving). Returns the
+    names of the partitions removed.
+    """
+    removed = []
+    for name, _ in expired_partitions(retention_months):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE public.activity_logs DETACH PARTITION public."{name}"')
+            if not detach:
+                cursor.execute(f'DROP TABLE public."{name}"')
+        removed.append(name)
+    return removed
+
+
+def estimated_row_count():
+    """
+    Rows in activity_logs from the partitions' planner statistics, without
+    scanning them. Partitions never analyzed (usually new, small months) are
+    counted, and so is the whole table when the estimate is small.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, c.reltuples
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.activity_logs'::regclass
+        """)
+        total = 0
+        for name, reltuples in cursor.fetchall():
+            if reltuples >= 0:
+                total += int(reltuples)
+            else:
+                cursor.execute(f'SELECT COUNT(*) FROM public."{name}"')
+                total += cursor.fetchone()[0]
+        if total < ACTIVITY_LOG_EXACT_COUNT_BELOW:
+            cursor.execute("SELECT COUNT(*) FROM public.activity_logs")
+            total = cursor.fetchone()[0]
+    return total
+
+
+def truncate_activity_logs():
+    """
+    Empty every partition at once. Returns the number of rows removed
+    (estimated_row_count, taken before the lock so the ACCESS EXCLUSIVE
+    lock is only held for the TRUNCATE itself).
+    """
+    total = estimated_row_count()
+    if total == 0:
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("LOCK TABLE public.activity_logs IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("TRUNCATE public.activity_logs")
+    return total
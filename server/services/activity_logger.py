@@ -1,9 +1,138 @@
+"""
+Audit logging for the write endpoints.
+
+log_user_activity() only puts the entry on a bounded in-process queue; a
+background thread writes queued entries with one bulk_create per batch, so
+requests no longer wait on the audit insert. When the queue is full the entry
+is written synchronously instead of being dropped, and whatever is still
+queued is flushed when the process exits. A batch that fails to insert is
+retried row by row, and each row keeps the time the action happened, not
+the time it was written. Inside a transaction the entry is only queued once
+it commits, so a rolled-back action leaves no audit row behind.
+"""
+
+import atexit
+import queue
+import threading
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
-from models.models import ActivityLog, Notification, User, Role
+from models.models import ActivityLog
+from services.activity_log_retention import ensure_partitions_for
+from services.event_broker import event_broker
+from services.notification_feed import create_broadcast
+
+ACTIVITY_LOG_QUEUE_SIZE = getattr(settings, 'ACTIVITY_LOG_QUEUE_SIZE', 10000)
+ACTIVITY_LOG_BATCH_SIZE = getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200)
+# Longest a queued entry waits before it is written
+ACTIVITY_LOG_FLUSH_INTERVAL = getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 1.0)
+
+DEFAULT_LOG_USER_ID = '21f37816-2618-4838-b3ce-d83ef7ae1418'  # Default admin user ID for logging purposes
+
+
+def write_activity_logs(logs):
+    """Insert a batch of unsaved ActivityLog rows and push them to admin streams."""
+    try:
+        # Make sure this month (and the next few) have partitions before
+        # the rows go in; a no-op after the first call of the month
+        ensure_partitions_for(max(log.created_at for log in logs))
+    except Exception as e:
+        print(f"Error creating activity log partitions: {e}")
+    logs = ActivityLog.objects.bulk_create(logs)
+    for log in logs:
+        event_broker.publish('activity', 'activity', {
+            'id': log.id,
+            'user_id': str(log.user_id),
+            'action': log.action,
+            'description': log.description,
+            'status': log.status,
+            'resource': log.resource,
+            'details': log.details,
+            'created_at': log.created_at,
+        })
+    return logs
+
+
+class ActivityLogWriter:
+    """
+    Queue plus writer thread behind log_user_activity(). The thread starts on
+    the first entry, so importing this module does not spawn it.
+    """
+
+    def __init__(self, maxsize=ACTIVITY_LOG_QUEUE_SIZE, batch_size=ACTIVITY_LOG_BATCH_SIZE,
+                 flush_interval=ACTIVITY_LOG_FLUSH_INTERVAL):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, log):
+        self.start()
+        try:
+            self.queue.put_nowait(log)
+        except queue.Full:
+            # Backpressure: write this one on the caller's thread
+            write_activity_logs([log])
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        try:
+            write_activity_logs(batch)
+        except Exception as e:
+            print(f"Error writing {len(batch)} activity logs, retrying one at a time: {e}")
+            # bulk_create is atomic, so nothing from the batch was saved; one
+            # bad row (e.g. a deleted user) should only lose itself
+            for log in batch:
+                try:
+                    write_activity_logs([log])
+                except Exception as e:
+                    print(f"Error writing activity log ({log.action} by {log.user_id}): {e}")
+
+    def flush(self):
+        """Write everything queued so far on the calling thread."""
+        while True:
+            batch = self._take_batch(timeout=0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(timeout=self.flush_interval)
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                # Not covered by Django's request cycle; don't hold a
+                # connection between batches
+                connection.close()
+
+
+activity_log_writer = ActivityLogWriter()
+atexit.register(activity_log_writer.flush)
+
 
 def log_user_activity(user_id, action, resource, status, details):
     """
-    Logs user activity to the ActivityLog model.
+    Logs user activity to the ActivityLog model (asynchronously, see module docstring).
     # log['description'] example is "status->success;details->Exported Stuffs here;resource->hello.jpg"
     Description format: "status->{status};details->{details};resource->{resource}"
     1. user_id: ID of the user performing the action
@@ -16,46 +145,32 @@ def log_user_activity(user_id, action, resource, status, details):
     try:
         description = f"status->{status};details->{details};resource->{resource}"
         if user_id == "admin" or user_id is None:
-            user_id = '21f37816-2618-4838-b3ce-d83ef7ae1418'  # Default admin user ID for logging purposes
-        ActivityLog.objects.create(
+            user_id = DEFAULT_LOG_USER_ID
+        log = ActivityLog(
             user_id=user_id,
             action=action,
             description=description,
+            status=status or '',
+            resource=resource or '',
+            details=details or '',
             created_at=timezone.now()
         )
-        print(f"Logged activity for user {user_id}: {action} - {description}")
+        # Runs right away outside an atomic block
+        transaction.on_commit(lambda: activity_log_writer.submit(log))
 
     except Exception as e:
         print(f"Error logging activity for user {user_id}: {e}")
 
 def send_notification_to_admins(title, message, notification_type='warning'):
     """
-    Send notification to all admin users
+    Send notification to all admin users (one broadcast row, read through
+    each admin's feed)
     """
     try:
-        # Get all admin users by role
-        admin_role = Role.objects.get(name='admin')
-        admin_users = User.objects.filter(
-            userrole__role=admin_role,
-            is_active=True
-        )
-        
-        # Create notifications for all admin users
-        for admin_user in admin_users:
-            Notification.objects.create(
-                user=admin_user,
-                title=title,
-                message=message,
-                type=notification_type
-            )
-        
-        print(f"Notification sent to {admin_users.count()} admin(s): {title}")
+        create_broadcast(title, message, notification_type, audience='admin')
+        print(f"Notification sent to admins: {title}")
         return True
         
-    except Role.DoesNotExist:
-        print("Admin role not found")
-        return False
     except Exception as e:
         print(f"Error sending notification to admins: {e}")
         return False
-
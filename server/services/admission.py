@@ -0,0 +1,216 @@
+"""
+Admission control for the computer-vision endpoints.
+
+Every CV request (process, process-single, overlay and derivative renders)
+holds one of CV_MAX_CONCURRENT slots in this worker process while it runs.
+Up to CV_MAX_QUEUE more wait for a slot, for at most CV_QUEUE_TIMEOUT
+seconds; anything beyond that is answered right away with 429 and a
+Retry-After estimated from recent run times. A burst of uploads therefore
+queues instead of decoding every photo at once, and the remaining worker
+threads stay free for the non-CV endpoints.
+
+A streamed response (NDJSON from process) keeps its slot until the stream
+ends, since that is when the images are processed.
+
+Queue waits go into the cv_admission_queue_wait_seconds histogram and the
+slot counts are exported on /metrics (services/metrics.py); snapshot()
+returns the same numbers as JSON for the admission-stats endpoint.
+"""
+
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.http import JsonResponse
+from services.metrics import registry
+
+CV_MAX_CONCURRENT = getattr(settings, 'CV_MAX_CONCURRENT', 2)
+CV_MAX_QUEUE = getattr(settings, 'CV_MAX_QUEUE', 8)
+CV_QUEUE_TIMEOUT = getattr(settings, 'CV_QUEUE_TIMEOUT', 30)
+
+# Upper bounds (seconds) of the queue wait histogram
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Weight of the newest run in the moving average behind Retry-After
+RUN_TIME_SMOOTHING = 0.2
+
+queue_wait = registry.histogram(
+    'cv_admission_queue_wait_seconds', 'Time admitted requests waited for a slot', ('controller',), WAIT_BUCKETS,
+)
+_controllers = []
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_max = 0.0
+        self.average_run_time = None
+        _controllers.append(self)
+
+    def retry_after(self):
+        """Seconds until a new request is likely to get a slot (at least 1)."""
+        run_time = self.average_run_time or 5.0
+        waves = (self.queued + 1) / self.max_concurrent
+        return max(1, math.ceil(run_time * waves))
+
+    def acquire(self):
+        """Wait for a slot; returns the seconds spent queued or raises AdmissionRejected."""
+        started = time.perf_counter()
+        with self._condition:
+            if self.running >= self.max_concurrent:
+                if self.queued >= self.max_queue:
+                    self.rejected += 1
+                    raise AdmissionRejected('queue full', self.retry_after())
+                self.queued += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.running < self.max_concurrent, timeout=self.queue_timeout
+                    )
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self.timed_out += 1
+                    raise AdmissionRejected('timed out waiting for a slot', self.retry_after())
+            self.running += 1
+            self.admitted += 1
+            waited = time.perf_counter() - started
+            self._record_wait(waited)
+        return waited
+
+    def release(self, run_time):
+        with self._condition:
+            self.running -= 1
+            if self.average_run_time is None:
+                self.average_run_time = run_time
+            else:
+                self.average_run_time += RUN_TIME_SMOOTHING * (run_time - self.average_run_time)
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block; yields the seconds spent queued."""
+        waited = self.acquire()
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def _record_wait(self, waited):
+        # Called with the condition held
+        queue_wait.observe(waited, self.name)
+        self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self):
+        cumulative, wait_sum, wait_count = queue_wait.series(self.name)
+        buckets = {('+Inf' if bound == float('inf') else str(bound)): count for bound, count in cumulative.items()}
+        with self._condition:
+            return {
+                'name': self.name,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'queue_wait_seconds': {
+                    'buckets': buckets,
+                    'sum': round(wait_sum, 6),
+                    'count': wait_count,
+                    'max': round(self.wait_max, 6),
+                },
+                'average_run_seconds': round(self.average_run_time, 3) if self.average_run_time else None,
+            }
+
+
+def collect_admission_metrics():
+    samples = {
+        'running': [], 'queued': [], 'admitted': [], 'rejected': [], 'timed_out': [],
+    }
+    for controller in _controllers:
+        with controller._condition:
+            for key in samples:
+                samples[key].append(({'controller': controller.name}, getattr(controller, key)))
+    return [
+        ('cv_admission_running', 'gauge', 'Requests holding a slot', samples['running']),
+        ('cv_admission_queued', 'gauge', 'Requests waiting for a slot', samples['queued']),
+        ('cv_admission_admitted_total', 'counter', 'Requests that got a slot', samples['admitted']),
+        ('cv_admission_rejected_total', 'counter', 'Requests turned away with the queue full', samples['rejected']),
+        ('cv_admission_timed_out_total', 'counter', 'Requests that gave up waiting for a slot', samples['timed_out']),
+    ]
+
+
+registry.add_collector(collect_admission_metrics)
+
+cv_admission = AdmissionController('cv', CV_MAX_CONCURRENT, CV_MAX_QUEUE, CV_QUEUE_TIMEOUT)
+
+
+def busy_response(controller, request, rejection):
+    print(f"Admission ({controller.name}) rejected {request.path}: {rejection.reason}")
+    response = JsonResponse({
+        "error": "Server is busy processing images, please retry shortly",
+        "retry_after": rejection.retry_after,
+    }, status=429)
+    response['Retry-After'] = str(rejection.retry_after)
+    return response
+
+
+def admission_controlled(controller=cv_admission):
+    """
+    View decorator: run the view inside one of the controller's slots, or
+    answer 429 with Retry-After when it is saturated. Put it directly above
+    the view function, under @api_view / @parser_classes.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                waited = controller.acquire()
+            except AdmissionRejected as e:
+                return busy_response(controller, request, e)
+
+            started = time.perf_counter()
+
+            def release():
+                controller.release(time.perf_counter() - started)
+
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                release()
+                raise
+            if getattr(response, 'streaming', False) and response.is_async:
+                # The work happens while the body streams; keep the slot until it ends
+                response.streaming_content = _release_after(response.streaming_content, release)
+            else:
+                release()
+            response['X-Queue-Wait'] = f"{waited:.3f}"
+            return response
+        return wrapped
+    return decorator
+
+
+async def _release_after(content, release):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        release()
@@ -0,0 +1,161 @@
+"""
+Reads and refreshes the analytics_cube materialized view
+(see models/sql/002_analytics_cube.sql), and builds the matching filters for
+the dashboard queries that still have to run against the raw tables.
+
+The cube is keyed by (location, uploader role, year, month), so the admin
+dashboard's counters for any combination of filters are a SUM over a handful
+of cube rows instead of a join over predictions/images/users/user_roles.
+
+The cube is rebuilt off the request path: by cube_refresher (a background
+thread every ANALYTICS_CUBE_MAX_AGE seconds, started by the dashboard view)
+or by `python manage.py refresh_analytics_cube`.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from services.periodic_refresh import PeriodicRefresh
+
+# Rebuild the cube once it is older than this many seconds
+ANALYTICS_CUBE_MAX_AGE = getattr(settings, 'ANALYTICS_CUBE_MAX_AGE', 300)
+
+# Arbitrary key so only one worker rebuilds the cube at a time
+_ADVISORY_LOCK_KEY = 2800280028
+
+# An image has one uploader role in the cube: the first of the uploader's
+# roles by name, so every image lands in exactly one cell. The per-bean
+# queries filter with the same rule (dashboard_filters), otherwise a user
+# with several roles would count under one role in the counters and under
+# all of them in the statistics. Keep in sync with 002_analytics_cube.sql.
+UPLOADER_ROLE_SQL = """(
+    SELECT roles.name
+    FROM user_images
+    JOIN user_roles ON user_images.user_id = user_roles.user_id
+    JOIN roles ON user_roles.role_id = roles.id
+    WHERE user_images.image_id = images.id
+    ORDER BY roles.name
+    LIMIT 1
+)"""
+
+
+def dashboard_filters(location_id=None, role=None, year=None, month=None):
+    """
+    SQL conditions over `images` with the same meaning as the cube keys:
+    role is the uploader role the cube assigns the image (UPLOADER_ROLE_SQL).
+    Returns (conditions, params); callers join conditions with AND.
+    """
+    conditions = []
+    params = []
+    if location_id:
+        conditions.append("images.location_id = %s")
+        params.append(location_id)
+    if role:
+        conditions.append(f"{UPLOADER_ROLE_SQL} = %s")
+        params.append(role)
+    if year:
+        conditions.append("EXTRACT(YEAR FROM images.upload_date) = %s")
+        params.append(year)
+    if month:
+        conditions.append("EXTRACT(MONTH FROM images.upload_date) = %s")
+        params.append(month)
+    return conditions, params
+
+
+def refresh_analytics_cube(max_age=None):
+    """
+    Rebuild the cube. With max_age (seconds) the rebuild is skipped while the
+    cube is fresher than that. Returns True when a rebuild ran. Readers are
+    not blocked (CONCURRENTLY), and a worker that finds another one already
+    rebuilding just serves the current rows.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if max_age is not None:
+            cursor.execute(
+                "SELECT refreshed_at > NOW() - make_interval(secs => %s) FROM analytics_cube_meta WHERE id = 1",
+                [max_age]
+            )
+            row = cursor.fetchone()
+            if row and row[0]:
+                return False
+
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [_ADVISORY_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            return False
+
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY analytics_cube")
+        cursor.execute("UPDATE analytics_cube_meta SET refreshed_at = NOW() WHERE id = 1")
+        return True
+
+
+cube_refresher = PeriodicRefresh(
+    'analytics-cube-refresh',
+    lambda: refresh_analytics_cube(max_age=ANALYTICS_CUBE_MAX_AGE),
+    ANALYTICS_CUBE_MAX_AGE,
+)
+
+
+def query_analytics_cube(location_id=None, role=None, year=None, month=None):
+    """
+    Dashboard counters for the given filters, summed from the cube:
+    uploads, validated/pending images, total predictions, bean type counts
+    and validated/pending annotations per farm.
+    """
+    conditions = []
+    params = []
+    if location_id:
+        conditions.append("location_id = %s")
+        params.append(location_id)
+    if role:
+        conditions.append("role = %s")
+        params.append(role)
+    if year:
+        conditions.append("year = %s")
+        params.append(year)
+    if month:
+        conditions.append("month = %s")
+        params.append(month)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(uploads), 0),
+                   COALESCE(SUM(validated_images), 0),
+                   COALESCE(SUM(pending_images), 0),
+                   COALESCE(SUM(predictions), 0)
+            FROM analytics_cube
+            {where_clause}
+        """, params)
+        uploads, validated, pending, predictions = cursor.fetchone()
+
+        cursor.execute(f"""
+            SELECT bt.key, SUM(bt.value::bigint)
+            FROM analytics_cube, jsonb_each_text(analytics_cube.bean_types) AS bt
+            {where_clause}
+            GROUP BY bt.key
+        """, params)
+        bean_types = {bean_type: int(count) for bean_type, count in cursor.fetchall()}
+
+        cursor.execute(f"""
+            SELECT location_id, SUM(pending_annotations), SUM(validated_annotations)
+            FROM analytics_cube
+            {where_clause}
+            GROUP BY location_id
+            HAVING SUM(pending_annotations) + SUM(validated_annotations) > 0
+        """, params)
+        farms = {
+            f"{loc_id}": {"pending": int(pend), "validated": int(val)}
+            for loc_id, pend, val in cursor.fetchall()
+        }
+
+        cursor.execute("SELECT refreshed_at FROM analytics_cube_meta WHERE id = 1")
+        row = cursor.fetchone()
+
+    return {
+        "uploads": int(uploads),
+        "validated": int(validated),
+        "pending": int(pending),
+        "total_predictions": int(predictions),
+        "bean_types": bean_types,
+        "farms": farms,
+        "refreshed_at": row[0].isoformat() if row and row[0] else None,
+    }
@@ -0,0 +1,251 @@
+"""
+Columnar data access for the bean feature analytics.
+
+Feature columns are streamed out of Postgres with COPY ... TO STDOUT (CSV)
+straight into a Polars (Arrow-backed) frame, instead of building one Python
+tuple per bean through the cursor. Correlations, per-farm statistics and
+histograms are then expressed on LazyFrames, so Polars can prune columns and
+run the aggregations multi-threaded.
+
+The helpers return the same JSON structures the dashboard already sends.
+
+The dashboard does not COPY on every request: feature_summary_cache keeps
+the finished statistics (a few KB) for the ANALYTICS_SUMMARY_CACHE_SIZE most
+recently used filter combinations, recomputed by a background thread every
+ANALYTICS_SUMMARY_MAX_AGE seconds. Only the beans matching a filter are
+copied, and the frame is dropped once its statistics are computed, so memory
+per worker stays bounded as the dataset grows.
+"""
+
+import io
+import math
+import threading
+from collections import OrderedDict
+import polars as pl
+from django.conf import settings
+from django.db import connection
+from services.analytics_cube import dashboard_filters
+from services.periodic_refresh import PeriodicRefresh
+
+# Recompute the cached statistics after this many seconds
+ANALYTICS_SUMMARY_MAX_AGE = getattr(settings, 'ANALYTICS_SUMMARY_MAX_AGE', 300)
+# Filter combinations whose statistics each worker keeps
+ANALYTICS_SUMMARY_CACHE_SIZE = getattr(settings, 'ANALYTICS_SUMMARY_CACHE_SIZE', 32)
+
+# Order used by the correlation heatmap
+CORRELATION_COLUMNS = [
+    'major_axis_length', 'minor_axis_length', 'perimeter', 'area', 'solidity',
+    'extent', 'eccentricity', 'mean_intensity', 'convex_area', 'equivalent_diameter'
+]
+
+# Order used by the per-farm mean/median/mode charts
+FEATURE_STATS_COLUMNS = [
+    'area', 'perimeter', 'major_axis_length', 'minor_axis_length',
+    'extent', 'eccentricity', 'convex_area', 'solidity',
+    'mean_intensity', 'equivalent_diameter'
+]
+
+FEATURE_SCHEMA = {
+    'location_id': pl.Int64,
+    'farm_name': pl.String,
+    **{feature: pl.Float64 for feature in FEATURE_STATS_COLUMNS},
+}
+
+# Same formulas (and zero fallbacks) as the SQL/Python versions
+ASPECT_RATIO = (
+    pl.when(pl.col('minor_axis_length') != 0)
+    .then(pl.col('major_axis_length') / pl.col('minor_axis_length'))
+    .otherwise(0)
+    .fill_null(0)
+)
+ROUNDNESS = (
+    pl.when(pl.col('perimeter') != 0)
+    .then((4 * 3.1416 * pl.col('area')) / (pl.col('perimeter') * pl.col('perimeter')))
+    .otherwise(0)
+    .fill_null(0)
+)
+
+
+def fetch_feature_frame(conditions=None, params=None):
+    """
+    LazyFrame with location_id, farm_name and every extracted feature, one row
+    per bean. conditions/params are SQL filters over `images` (see
+    services.analytics_cube.dashboard_filters).
+    """
+    conditions = conditions or []
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    feature_columns = ", ".join(f"ef.{feature}" for feature in FEATURE_STATS_COLUMNS)
+    query = f"""
+        SELECT images.location_id, l.name AS farm_name, {feature_columns}
+        FROM extracted_features ef
+        JOIN predictions p ON ef.prediction_id = p.id
+        JOIN images ON p.image_id = images.id
+        LEFT JOIN locations l ON images.location_id = l.id
+        {where_clause}
+    """
+    return _copy_frame(query, params, FEATURE_SCHEMA).lazy()
+
+
+def _copy_frame(query, params, schema):
+    buffer = io.BytesIO()
+    with connection.cursor() as cursor:
+        # COPY does not take bind parameters, so they are inlined by the driver
+        sql = cursor.mogrify(query, list(params or [])).decode()
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    return pl.read_csv(buffer, schema=schema)
+
+
+def feature_summary(location_id=None, role=None, year=None, month=None):
+    """
+    Per-farm feature statistics, the correlation matrix and the aspect
+    ratio / roundness histograms of the beans matching the dashboard filters
+    (same meaning as dashboard_filters).
+    """
+    conditions, params = dashboard_filters(location_id, role, year, month)
+    frame = fetch_feature_frame(conditions, params)
+    return {
+        'feature_stats': feature_stats_by_farm(frame),
+        'correlations': correlation_matrix(frame),
+        # Counted over every matching bean, so the counts stay exact while
+        # the payload stays small
+        'hist_aspect': histogram(frame, ASPECT_RATIO, bin_size=0.1),
+        'hist_roundness': histogram(frame, ROUNDNESS, bin_size=0.05),
+    }
+
+
+class FeatureSummaryCache:
+    """
+    Thread-safe LRU of feature_summary() results keyed by the dashboard
+    filters, bounded by entry count. A key seen for the first time is
+    computed on the calling thread; after that a PeriodicRefresh recomputes
+    every cached key each ANALYTICS_SUMMARY_MAX_AGE seconds, so requests for
+    a known filter never wait on the COPY.
+    """
+
+    def __init__(self, max_entries=ANALYTICS_SUMMARY_CACHE_SIZE, interval=ANALYTICS_SUMMARY_MAX_AGE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # delay_first: whatever is cached has just been computed
+        self.refresher = PeriodicRefresh('analytics-summary-refresh', self.refresh, interval, delay_first=True)
+
+    def _set(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, location_id=None, role=None, year=None, month=None):
+        key = (location_id, role, year, month)
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+        if summary is None:
+            summary = feature_summary(*key)
+            self._set(key, summary)
+        self.refresher.start()
+        return summary
+
+    def refresh(self):
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            try:
+                summary = feature_summary(*key)
+            except Exception as e:
+                print(f"Error refreshing analytics summary {key}: {e}")
+                continue
+            with self._lock:
+                # Evicted while it was being recomputed
+                if key in self._entries:
+                    self._entries[key] = summary
+
+
+feature_summary_cache = FeatureSummaryCache()
+
+
+def _json_float(value):
+    return float(value) if value is not None and not math.isnan(value) else 0.0
+
+
+def correlation_matrix(frame, columns=CORRELATION_COLUMNS):
+    """
+    Pearson correlation between every pair of columns, using the rows where
+    both are present (like pandas' DataFrame.corr).
+    Format: [{"id": row, "data": [{"x": col, "y": r}, ...]}, ...], or []
+    when there are no beans.
+    """
+    if frame.select(pl.len()).collect().item() == 0:
+        return []
+
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+    exprs = []
+    for a, b in pairs:
+        both = pl.col(a).is_not_null() & pl.col(b).is_not_null()
+        exprs.append(pl.corr(pl.col(a).filter(both), pl.col(b).filter(both)).alias(f"{a}|{b}"))
+    row = frame.select(exprs).collect().row(0, named=True) if exprs else {}
+
+    corr = {}
+    for a, b in pairs:
+        # Undefined correlations (empty or constant columns) are sent as 0
+        corr[(a, b)] = corr[(b, a)] = _json_float(row[f"{a}|{b}"])
+
+    return [
+        {"id": row_var, "data": [{"x": col_var, "y": corr[(row_var, col_var)]} for col_var in columns]}
+        for row_var in columns
+    ]
+
+
+def feature_stats_by_farm(frame, features=FEATURE_STATS_COLUMNS):
+    """
+    Mean, median and mode (of values rounded to two decimals) of each
+    feature per farm; beans without a farm are skipped.
+    Format: {feature: {"mean": [{"farm", "value"}], "median": [...], "mode": [...]}}
+    """
+    aggs = []
+    for feature in features:
+        aggs += [
+            pl.col(feature).mean().alias(f"{feature}_mean"),
+            pl.col(feature).median().alias(f"{feature}_median"),
+            # Ties resolve to the smallest value, like Postgres' MODE()
+            pl.col(feature).drop_nulls().round(2).mode().min().alias(f"{feature}_mode"),
+        ]
+    stats = (
+        frame
+        .filter(pl.col('location_id').is_not_null())
+        .group_by('location_id', 'farm_name')
+        .agg(aggs)
+        .sort('location_id')
+        .collect()
+    )
+
+    data = {feature: {'mean': [], 'median': [], 'mode': []} for feature in features}
+    for row in stats.iter_rows(named=True):
+        farm_name = row['farm_name'] if row['farm_name'] else f"Farm {row['location_id']}"
+        for feature in features:
+            for stat in ('mean', 'median', 'mode'):
+                data[feature][stat].append({
+                    'farm': farm_name,
+                    'value': _json_float(row[f"{feature}_{stat}"]),
+                })
+    return data
+
+
+def histogram(frame, value_expr, bin_size):
+    """
+    Same bins as make_histogram: floor(value / bin_size) * bin_size rounded to
+    two decimals. Format: [{"value": bin, "count": n}, ...] sorted by bin.
+    """
+    counts = (
+        frame
+        .select(((value_expr / bin_size).floor() * bin_size).round(2).alias('bin'))
+        .drop_nulls()
+        .group_by('bin')
+        .agg(pl.len().alias('count'))
+        .sort('bin')
+        .collect()
+    )
+    return [{"value": float(b), "count": int(c)} for b, c in counts.iter_rows()]
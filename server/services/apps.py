@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class ServicesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'services'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from services.metrics import install_query_timer
+        # Connected at startup rather than by MetricsMiddleware, so queries
+        # on connections opened outside requests (pollers, management
+        # commands, the preloading master) are timed as well
+        connection_created.connect(install_query_timer, dispatch_uid='metrics_query_timer')
@@ -0,0 +1,86 @@
+"""
+In-process pub/sub behind the notification stream (services.notification_stream).
+
+Writers publish from any thread (sync views run in a worker thread under
+ASGI); each subscriber owns an asyncio queue on the event loop that serves
+its stream, and events are handed over with call_soon_threadsafe. Nothing
+leaves the process, so every stream must be served by the same process as
+the writers (one ASGI worker), which is also what single-node tests need.
+
+Channels:
+    user:<id>           personal notifications for one user
+    broadcast:all       broadcasts to everyone
+    broadcast:admin     broadcasts to admins
+    activity            new activity log entries (admins only)
+"""
+
+import asyncio
+import threading
+from django.db import transaction
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, broker, channels, loop):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        # Runs on self.loop. A client that stops reading loses its oldest
+        # events rather than growing the queue without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """The next event, or None after timeout seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, channels, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, channel, event_type, data):
+        """Deliver {channel, event, data} to every subscriber of channel; safe from any thread."""
+        event = {'channel': channel, 'event': event_type, 'data': data}
+        with self._lock:
+            targets = [s for s in self._subscriptions if channel in s.channels]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def publish_on_commit(self, channel, event_type, data):
+        """Publish once the current transaction commits (immediately outside one)."""
+        transaction.on_commit(lambda: self.publish(channel, event_type, data))
+
+
+event_broker = EventBroker()
@@ -0,0 +1,74 @@
+"""
+Local stand-in for status.supabase.com's /api/v2/summary.json.
+
+    with FakeStatusServer(indicator='minor', delay=2) as server:
+        poller = HealthPoller(status_url=server.url, interval=1)
+
+The payload, HTTP status and response delay can be changed while the server
+is running to simulate outages and slow upstreams.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def summary_payload(indicator='none', database='operational', storage='operational'):
+    return {
+        'page': {'updated_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')},
+        'status': {'indicator': indicator},
+        'components': [
+            {'name': 'Database', 'status': database},
+            {'name': 'Storage', 'status': storage},
+        ],
+    }
+
+
+class FakeStatusServer:
+    def __init__(self, host='127.0.0.1', port=0, indicator='none', status_code=200, delay=0):
+        self.payload = summary_payload(indicator)
+        self.status_code = status_code
+        self.delay = delay
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+                body = json.dumps(fake.payload).encode()
+                self.send_response(fake.status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v2/summary.json"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,304 @@
+"""
+Farm detail payloads for the admin farm modal (get_farm_details) and the
+researcher/farmer farm view (get_farm_view).
+
+Each payload is fetched with one multi-CTE query and cached per farm under the
+farm's farm_summaries.version. The triggers from models/sql/003_farm_summaries.sql
+bump that version on new uploads, image and prediction edits, validations and
+bean features for the farm, so a cached payload is never served after the
+farm changes.
+
+The global averages every farm is compared against are computed on their own
+(overall_averages), cached for FARM_DETAIL_CACHE_TTL seconds and shared by
+all farms, so a farm cache miss never averages every bean in the database.
+"""
+
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+FARM_DETAIL_CACHE_TTL = getattr(settings, 'FARM_DETAIL_CACHE_TTL', 300)
+
+BEANS_PUBLIC_URL = 'https://sodfcdrqpvcsblclppne.supabase.co/storage/v1/object/public/Beans/'
+
+# Bean feature averages shared by both payloads, in column order:
+# (payload key, SQL expression over extracted_features ef)
+DETAILS_FEATURES = [
+    ('major_axis_length', 'ef.major_axis_length'),
+    ('minor_axis_length', 'ef.minor_axis_length'),
+    ('area', 'ef.area'),
+    ('perimeter', 'ef.perimeter'),
+    ('extent', 'ef.extent'),
+    ('eccentricity', 'ef.eccentricity'),
+    ('convex_area', 'ef.convex_area'),
+    ('solidity', 'ef.solidity'),
+    ('mean_intensity', 'ef.mean_intensity'),
+    ('equivalent_diameter', 'ef.equivalent_diameter'),
+    ('aspect_ratio', 'CASE WHEN ef.minor_axis_length > 0 THEN ef.major_axis_length / ef.minor_axis_length ELSE 0 END'),
+    ('circularity', 'CASE WHEN ef.perimeter > 0 THEN (4.0 * 3.14159 * ef.area) / (ef.perimeter * ef.perimeter) ELSE 0 END'),
+]
+
+VIEW_FEATURES = [
+    ('major_axis_length', 'ef.major_axis_length'),
+    ('minor_axis_length', 'ef.minor_axis_length'),
+    ('area', 'ef.area'),
+    ('perimeter', 'ef.perimeter'),
+    ('aspect_ratio', 'ef.major_axis_length / NULLIF(ef.minor_axis_length, 0)'),
+    ('circularity', '(4.0 * 3.14159 * ef.area) / NULLIF(ef.perimeter * ef.perimeter, 0)'),
+    ('extent', 'ef.extent'),
+    ('eccentricity', 'ef.eccentricity'),
+    ('solidity', 'ef.solidity'),
+    ('equivalent_diameter', 'ef.equivalent_diameter'),
+]
+
+
+def _averages_json(features):
+    return "json_build_object(" + ", ".join(
+        f"'{name}', AVG({expr})" for name, expr in features
+    ) + ")"
+
+
+def farm_version(farm_id):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version FROM public.farm_summaries WHERE location_id = %s", [farm_id])
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def overall_averages(kind):
+    """
+    (computed_at, averages) over every bean for kind 'details' or 'view',
+    cached for FARM_DETAIL_CACHE_TTL seconds.
+    """
+    cache_key = f"farm-overall:{kind}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    features = DETAILS_FEATURES if kind == 'details' else VIEW_FEATURES
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_averages_json(features)}
+            FROM public.extracted_features AS ef
+            JOIN public.predictions AS p ON p.id = ef.prediction_id
+        """)
+        cached = (int(time.time()), cursor.fetchone()[0])
+    cache.set(cache_key, cached, FARM_DETAIL_CACHE_TTL)
+    return cached
+
+
+def get_farm_payload(kind, farm_id):
+    """
+    (etag, payload) for kind 'details' or 'view'; payload is None when the
+    farm does not exist. The farm's part is served from the cache while the
+    farm is unchanged and compared against the shared overall_averages.
+    """
+    version = farm_version(farm_id)
+    cache_key = f"farm-{kind}:{farm_id}:{version}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = build_farm_details(farm_id) if kind == 'details' else build_farm_view(farm_id)
+        cache.set(cache_key, cached, FARM_DETAIL_CACHE_TTL)
+    payload, farm_averages = cached
+    if payload is None:
+        return None, None
+
+    # The global averages change without the farm's version changing
+    computed_at, overall = overall_averages(kind)
+    etag = f'W/"farm-{kind}-{farm_id}-{version}-{computed_at}"'
+    if farm_averages is None:
+        return etag, payload
+
+    features = DETAILS_FEATURES if kind == 'details' else VIEW_FEATURES
+    payload = dict(payload)
+    payload['aggregatedData'] = {**_compare(farm_averages, overall, features), **payload['aggregatedData']}
+    return etag, payload
+
+
+def _compare(farm_averages, overall_averages, features):
+    """{feature: {value, overall, status}} where status compares within ±10%."""
+    compared = {}
+    for name, _ in features:
+        farm_val = float(farm_averages.get(name) or 0)
+        overall_val = float(overall_averages.get(name) or 0)
+        status = 'neutral'
+        if overall_val > 0:
+            if farm_val > overall_val * 1.1:
+                status = 'above'
+            elif farm_val < overall_val * 0.9:
+                status = 'below'
+        compared[name] = {'value': farm_val, 'overall': overall_val, 'status': status}
+    return compared
+
+
+def build_farm_details(farm_id):
+    """
+    Admin farm modal: users, recent images and averages by image location.
+    Returns (payload, farm averages); the averages are None without beans and
+    get_farm_payload adds their comparison to aggregatedData.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH farm_users AS (
+                SELECT u.id, CONCAT(u.first_name, ' ', u.last_name) AS name, r.name AS role,
+                       COUNT(ui.id) AS uploads
+                FROM public.users AS u
+                JOIN public.user_roles AS ur ON u.id = ur.user_id
+                JOIN public.roles AS r ON r.id = ur.role_id
+                LEFT JOIN public.user_images AS ui ON ui.user_id = u.id
+                WHERE u.location_id = %(farm_id)s
+                GROUP BY u.id, u.first_name, u.last_name, r.name
+            ),
+            recent_images AS (
+                SELECT i.id, i.image_url AS url, i.upload_date,
+                       (SELECT COUNT(*) FROM public.predictions p WHERE p.image_id = i.id) AS bean_count
+                FROM public.images AS i
+                WHERE i.location_id = %(farm_id)s
+                  AND EXISTS (SELECT 1 FROM public.user_images ui WHERE ui.image_id = i.id)
+                ORDER BY i.upload_date DESC
+                LIMIT 5
+            ),
+            farm_beans AS (
+                SELECT COUNT(*) AS n,
+                       {_averages_json(DETAILS_FEATURES)} AS averages,
+                       ARRAY_AGG(DISTINCT p.predicted_label->>'bean_type') AS bean_types
+                FROM public.extracted_features AS ef
+                JOIN public.predictions AS p ON p.id = ef.prediction_id
+                JOIN public.images AS i ON i.id = p.image_id
+                WHERE i.location_id = %(farm_id)s
+            ),
+            monthly AS (
+                SELECT TO_CHAR(i.upload_date, 'Month') AS month, COUNT(i.id) AS count
+                FROM public.images AS i
+                WHERE i.location_id = %(farm_id)s
+                GROUP BY TO_CHAR(i.upload_date, 'Month')
+            )
+            SELECT
+                (SELECT COALESCE(json_agg(farm_users), '[]') FROM farm_users),
+                (SELECT COALESCE(json_agg(recent_images ORDER BY upload_date DESC), '[]') FROM recent_images),
+                farm_beans.n, farm_beans.averages, farm_beans.bean_types,
+                (SELECT COALESCE(json_agg(monthly ORDER BY month), '[]') FROM monthly)
+            FROM farm_beans
+        """, {'farm_id': farm_id})
+        users_data, images_data, bean_count, farm_averages, bean_types, monthly_data = cursor.fetchone()
+
+    aggregated_data = {}
+    if bean_count:
+        aggregated_data['commonBeanTypes'] = bean_types if bean_types else []
+        aggregated_data['qualityDistribution'] = {}
+    aggregated_data['monthlyUploads'] = monthly_data
+
+    payload = {
+        'users': [
+            {
+                'id': str(user['id']),
+                'name': user['name'],
+                'role': user['role'],
+                'uploads': user['uploads']
+            } for user in users_data
+        ],
+        'recentImages': [
+            {
+                'id': str(image['id']),
+                'url': BEANS_PUBLIC_URL + image['url'],
+                'uploadDate': image['upload_date'] or '',
+                'beanCount': image['bean_count']
+            } for image in images_data
+        ],
+        'aggregatedData': aggregated_data
+    }
+    return payload, (farm_averages if bean_count else None)
+
+
+def build_farm_view(farm_id):
+    """
+    Researcher/farmer farm view: everything keyed by the uploaders' farm.
+    Returns (payload, farm averages), or (None, None) for an unknown farm;
+    get_farm_payload fills aggregatedData from the averages.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH farm AS (
+                SELECT id, name,
+                       ST_X(location::geometry) AS lon,
+                       ST_Y(location::geometry) AS lat
+                FROM public.locations
+                WHERE id = %(farm_id)s
+            ),
+            farm_users AS (
+                SELECT u.id, CONCAT(u.first_name, ' ', u.last_name) AS name, r.name AS role,
+                       COUNT(ui.id) AS uploads
+                FROM public.users AS u
+                JOIN public.user_roles AS ur ON u.id = ur.user_id
+                JOIN public.roles AS r ON r.id = ur.role_id
+                LEFT JOIN public.user_images AS ui ON ui.user_id = u.id
+                WHERE u.location_id = %(farm_id)s
+                GROUP BY u.id, u.first_name, u.last_name, r.name
+            ),
+            farm_images AS (
+                SELECT DISTINCT i.id, i.image_url, i.upload_date
+                FROM public.images AS i
+                JOIN public.user_images AS ui ON ui.image_id = i.id
+                JOIN public.users AS u ON ui.user_id = u.id
+                WHERE u.location_id = %(farm_id)s
+            ),
+            recent_images AS (
+                SELECT fi.id, fi.image_url AS url, fi.upload_date,
+                       (SELECT COUNT(*) FROM public.predictions p WHERE p.image_id = fi.id) AS bean_count
+                FROM farm_images AS fi
+                ORDER BY fi.upload_date DESC
+                LIMIT 6
+            ),
+            farm_beans AS (
+                SELECT {_averages_json(VIEW_FEATURES)} AS averages
+                FROM public.extracted_features AS ef
+                JOIN public.predictions AS p ON ef.prediction_id = p.id
+                JOIN farm_images AS fi ON fi.id = p.image_id
+            ),
+            monthly AS (
+                SELECT TO_CHAR(upload_date, 'YYYY-MM') AS month, COUNT(*) AS uploads
+                FROM farm_images
+                WHERE upload_date >= NOW() - INTERVAL '12 months'
+                GROUP BY TO_CHAR(upload_date, 'YYYY-MM')
+            ),
+            bean_types AS (
+                SELECT DISTINCT p.predicted_label->>'bean_type' AS bean_type
+                FROM public.predictions AS p
+                JOIN farm_images AS fi ON fi.id = p.image_id
+                WHERE p.predicted_label->>'bean_type' IS NOT NULL
+            )
+            SELECT farm.id, farm.name, farm.lon, farm.lat,
+                (SELECT COALESCE(json_agg(farm_users ORDER BY uploads DESC), '[]') FROM farm_users),
+                (SELECT COALESCE(json_agg(recent_images ORDER BY upload_date DESC), '[]') FROM recent_images),
+                farm_beans.averages,
+                (SELECT COALESCE(json_agg(monthly ORDER BY month), '[]') FROM monthly),
+                (SELECT COALESCE(array_agg(bean_type), '{{}}') FROM bean_types)
+            FROM farm, farm_beans
+        """, {'farm_id': farm_id})
+        row = cursor.fetchone()
+
+    if not row:
+        return None, None
+    (farm_pk, name, lon, lat, users_data, images_data,
+     farm_averages, monthly_data, bean_types) = row
+
+    payload = {
+        'id': str(farm_pk),
+        'name': name,
+        'lng': lon,
+        'lat': lat,
+        'users': users_data,
+        'recentImages': [
+            {
+                'id': str(image['id']),
+                'url': BEANS_PUBLIC_URL + image['url'] if image['url'] else '',
+                'uploadDate': image['upload_date'] or '',
+                'beanCount': image['bean_count'] or 0
+            } for image in images_data
+        ],
+        'aggregatedData': {},
+        'beanTypes': [bean_type for bean_type in bean_types if bean_type],
+        'monthlyUploads': monthly_data
+    }
+    return payload, farm_averages
@@ -0,0 +1,32 @@
+"""
+Helpers around the farm_summaries table (see models/sql/003_farm_summaries.sql).
+
+Triggers on users, user_roles, user_images, annotations and extracted_features
+only flag the affected farms as stale; the counts are recomputed here, one
+farm at a time, the next time someone reads them.
+"""
+
+from django.db import connection
+
+
+def refresh_stale_farm_summaries():
+    """Recompute every stale farm summary. Returns how many were refreshed."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT public.refresh_farm_summary(location_id)
+            FROM public.farm_summaries
+            WHERE stale
+        """)
+        return cursor.rowcount
+
+
+def mark_all_farm_summaries_stale():
+    """Flag every farm for recomputation (e.g. after a bulk import)."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO public.farm_summaries (location_id)
+            SELECT id FROM public.locations
+            ON CONFLICT (location_id) DO UPDATE SET
+                stale = true,
+                version = public.farm_summaries.version + 1
+        """)
@@ -0,0 +1,208 @@
+"""
+Background poller behind the admin system status page.
+
+A daemon thread refreshes the Supabase status page, the database uptime and
+the current payment plan every HEALTH_POLL_INTERVAL seconds and keeps the
+latest snapshot in memory. Requests only read that snapshot, so a slow or
+unreachable status page never holds up a worker thread.
+
+Point SUPABASE_STATUS_URL at services.fake_status_server to exercise the
+poller without reaching the real status page.
+"""
+
+import threading
+import requests
+from datetime import datetime
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+DEFAULT_PAYMENT_PLAN = {
+    'plan_type': 'free',
+    'end_date': None,
+    'current_bill': 0,
+    'days_remaining': None
+}
+
+
+def parse_supabase_status(status_data):
+    """
+    Overall, database and storage status plus the last update time from a
+    statuspage.io v2 summary payload.
+    """
+    overall_status = status_data.get('status', {}).get('indicator', 'unknown')
+
+    database_status = 'unknown'
+    storage_status = 'unknown'
+    for component in status_data.get('components', []):
+        if 'database' in component.get('name', '').lower():
+            database_status = component.get('status', 'unknown')
+        elif 'storage' in component.get('name', '').lower():
+            storage_status = component.get('status', 'unknown')
+
+    last_update = status_data.get('page', {}).get('updated_at', '')
+    if last_update:
+        try:
+            last_update_dt = datetime.fromisoformat(last_update.replace('Z', '+00:00'))
+            last_update_str = last_update_dt.strftime('%Y-%m-%d %H:%M UTC')
+        except ValueError:
+            last_update_str = last_update
+    else:
+        last_update_str = 'Unknown'
+
+    return {
+        'serverStatus': overall_status,
+        'databaseStatus': database_status,
+        'storageStatus': storage_status,
+        'lastBackup': last_update_str,
+    }
+
+
+def fetch_supabase_status(status_url, timeout):
+    try:
+        response = requests.get(status_url, timeout=timeout)
+        if response.status_code == 200:
+            return parse_supabase_status(response.json())
+        last_update_str = 'Failed to fetch'
+    except Exception as e:
+        print(f"Error fetching Supabase status: {e}")
+        last_update_str = 'API unavailable'
+    return {
+        'serverStatus': 'unknown',
+        'databaseStatus': 'unknown',
+        'storageStatus': 'unknown',
+        'lastBackup': last_update_str,
+    }
+
+
+def fetch_uptime():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_postmaster_start_time() as uptime;")
+        uptime_result = cursor.fetchone()
+    if not uptime_result or not uptime_result[0]:
+        return "Unknown"
+    uptime_start = uptime_result[0]
+    if uptime_start.tzinfo is None:
+        uptime_start = timezone.make_aware(uptime_start)
+    return f"{(timezone.now() - uptime_start).days} days"
+
+
+def fetch_payment_plan():
+    with connection.cursor() as cursor:
+        cursor.execute("""
+        SELECT plan_type, end_date, current_bill,
+            CASE
+            WHEN end_date IS NOT NULL AND end_date > NOW()
+            THEN EXTRACT(DAY FROM (end_date - NOW()))::INTEGER
+            ELSE NULL
+            END as days_remaining
+        FROM public.plans
+        ORDER BY updated_at DESC
+        LIMIT 1
+        """)
+        plan_result = cursor.fetchone()
+        if not plan_result:
+            # No plan found, create default free plan
+            cursor.execute("""
+                INSERT INTO public.plans (plan_type, end_date, current_bill, created_at, updated_at)
+                VALUES ('free', NULL, 0, NOW(), NOW())
+            """)
+            return dict(DEFAULT_PAYMENT_PLAN)
+    return {
+        'plan_type': plan_result[0] if plan_result[0] else 'free',
+        'end_date': plan_result[1].isoformat() if plan_result[1] else None,
+        'current_bill': float(plan_result[2]) if plan_result[2] else 0,
+        'days_remaining': int(plan_result[3]) if plan_result[3] else None
+    }
+
+
+class HealthPoller:
+    """
+    Keeps the latest system status snapshot fresh from a background thread.
+    The thread starts on the first snapshot() call, so importing this module
+    (management commands, migrations) does not spawn it. That first call
+    waits for the thread's first poll rather than answering all-unknown.
+    """
+
+    def __init__(self, status_url=None, interval=None, timeout=10):
+        self.status_url = status_url or settings.SUPABASE_STATUS_URL
+        self.interval = interval or settings.HEALTH_POLL_INTERVAL
+        self.timeout = timeout
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._polled = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="health-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout + 1)
+
+    def request_refresh(self):
+        """Poll again now instead of waiting for the interval (e.g. after a plan change)."""
+        self._wake.set()
+
+    def poll_once(self):
+        snapshot = fetch_supabase_status(self.status_url, self.timeout)
+        try:
+            snapshot['systemUptime'] = fetch_uptime()
+        except Exception as e:
+            print(f"Error fetching database uptime: {e}")
+            snapshot['systemUptime'] = 'Unknown'
+        try:
+            snapshot['paymentPlan'] = fetch_payment_plan()
+        except Exception as e:
+            print(f"Error fetching payment plan: {e}")
+            snapshot['paymentPlan'] = dict(DEFAULT_PAYMENT_PLAN)
+        finally:
+            # This thread is not covered by Django's request cycle, so release
+            # its connection instead of holding it until the next poll
+            connection.close()
+        snapshot['activeSubscriptions'] = 1
+        snapshot['checkedAt'] = timezone.now().isoformat()
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def snapshot(self):
+        """The latest snapshot, or an all-unknown one if the first poll is stuck."""
+        self.start()
+        # Bounded by the status page timeout; the database queries have none
+        self._polled.wait(self.timeout + 5)
+        with self._lock:
+            if self._snapshot is not None:
+                return dict(self._snapshot)
+        return {
+            'systemUptime': 'Unknown',
+            'serverStatus': 'unknown',
+            'databaseStatus': 'unknown',
+            'storageStatus': 'unknown',
+            'lastBackup': 'Unknown',
+            'activeSubscriptions': 1,
+            'paymentPlan': dict(DEFAULT_PAYMENT_PLAN),
+            'checkedAt': None,
+        }
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling system health: {e}")
+            self._polled.set()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+health_poller = HealthPoller()
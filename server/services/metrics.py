@@ -0,0 +1,240 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Everything is aggregated in memory into fixed-bucket histograms; gauges
+and counters kept elsewhere are read by collectors at scrape time.
+Recording a value is a bisect and a few additions under a lock, so this is
+cheap enough to leave on in production. Values are per worker process, so
+Prometheus should scrape each worker (or run one worker per container).
+
+    http_request_duration_seconds   per route, method and status (MetricsMiddleware)
+    http_request_db_queries         queries per request, per route
+    http_request_db_seconds         time spent in the database per request, per route
+    db_query_duration_seconds       every query, inside or outside requests
+    bean_stage_duration_seconds     BeanFeatureExtractor stages and the process DB save
+    cv_admission_*                  the CV admission controller (services/admission.py)
+
+Stage timings are recorded with `with stage_timer('yolo'):` or
+observe_stage(stage, seconds) for time accumulated over several pieces.
+The query timer is hooked onto every new connection in services/apps.py.
+Set METRICS_TOKEN to require `Authorization: Bearer <token>` on /metrics.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = list(zip(labelnames, labels)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self, *labels):
+        """(cumulative bucket counts keyed by upper bound, sum, count) for one label set."""
+        with self._lock:
+            counts, total, count = self._series.get(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            counts = list(counts)
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return cumulative, total, count
+
+    def render(self):
+        with self._lock:
+            label_sets = list(self._series)
+        lines = []
+        for labels in label_sets:
+            cumulative, total, count = self.series(*labels)
+            for bound, running in cumulative.items():
+                bucket_labels = _format_labels(self.labelnames, labels, ('le', _format_bound(bound)))
+                lines.append(f'{self.name}_bucket{bucket_labels} {running}')
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{plain} {total}')
+            lines.append(f'{self.name}_count{plain} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns (name, kind, documentation, [(labels dict, value)]) tuples at scrape time."""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response (streamed bodies excluded)',
+    ('method', 'route', 'status'),
+)
+request_db_queries = registry.histogram(
+    'http_request_db_queries', 'Database queries per request', ('route',), QUERY_COUNT_BUCKETS,
+)
+request_db_seconds = registry.histogram(
+    'http_request_db_seconds', 'Time spent in the database per request', ('route',),
+)
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds', 'Duration of every database query', (), DB_QUERY_BUCKETS,
+)
+stage_duration = registry.histogram(
+    'bean_stage_duration_seconds', 'Time per bean pipeline stage and image', ('stage',),
+)
+
+
+def observe_stage(stage, seconds):
+    stage_duration.observe(seconds, stage)
+
+
+@contextmanager
+def stage_timer(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - started, stage)
+
+
+# [query count, seconds] of the request being handled, shared with the
+# worker threads sync views run in (asgiref copies the context)
+_request_db = contextvars.ContextVar('request_db', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        db_query_duration.observe(elapsed)
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency plus query count and database time for every request.
+    Routes are the URL patterns (e.g. api/beans/images/<int:image_id>/overlay/),
+    so the number of series stays bounded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = [0, 0.0]
+        token = _request_db.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = [0, 0.0]
+        token = _request_db.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, stats):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        request_duration.observe(elapsed, request.method, route, str(response.status_code))
+        request_db_queries.observe(stats[0], route)
+        request_db_seconds.observe(stats[1], route)
+
+
+def metrics_endpoint(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,188 @@
+"""
+Notification feed: personal notifications plus fan-out-on-read broadcasts.
+
+A broadcast is stored once in `broadcasts` (see models/sql/006_broadcasts.sql)
+and shown to every user in its audience who was registered when it was sent.
+Per-user state lives in `broadcast_receipts`, which only gets a row once the
+user reads or clears the broadcast. Broadcast ids are sent to the client as
+"b-<id>" so they cannot collide with personal notification ids.
+"""
+
+import base64
+from datetime import datetime
+from django.db import connection
+from models.models import Broadcast, Notification
+from services.event_broker import event_broker
+
+BROADCAST_ID_PREFIX = 'b-'
+
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 100
+
+# Broadcasts visible to %(user_id)s, with that user's receipt (if any) as r
+VISIBLE_BROADCASTS = """
+    FROM public.broadcasts b
+    JOIN public.users u ON u.id = %(user_id)s
+    LEFT JOIN public.broadcast_receipts r ON r.broadcast_id = b.id AND r.user_id = u.id
+    WHERE b.created_at >= COALESCE(u.registration_date, '-infinity')
+      AND (
+          b.audience = 'all'
+          OR (u.is_active AND EXISTS (
+              SELECT 1 FROM public.user_roles ur
+              JOIN public.roles ro ON ro.id = ur.role_id
+              WHERE ur.user_id = u.id AND ro.name = b.audience
+          ))
+      )
+      AND NOT COALESCE(r.is_cleared, false)
+"""
+
+FEED_COLUMNS = ['id', 'title', 'message', 'type', 'is_read', 'created_at']
+
+
+def create_broadcast(title, message, notification_type, audience='all'):
+    """Send a notification to a whole audience ('all' or 'admin') with one insert."""
+    broadcast = Broadcast.objects.create(title=title, message=message, type=notification_type, audience=audience)
+    event_broker.publish_on_commit(f'broadcast:{audience}', 'notification', {
+        'id': f'{BROADCAST_ID_PREFIX}{broadcast.id}',
+        'title': broadcast.title,
+        'message': broadcast.message,
+        'type': broadcast.type,
+        'is_read': False,
+        'created_at': broadcast.created_at,
+    })
+    return broadcast
+
+
+def create_notification(user, title, message, notification_type):
+    """Send a personal notification and push it to the user's open streams."""
+    notification = Notification.objects.create(user=user, title=title, message=message, type=notification_type)
+    event_broker.publish_on_commit(f'user:{user.id}', 'notification', {
+        'id': str(notification.id),
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.type,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at,
+    })
+    return notification
+
+
+def encode_feed_cursor(created_at, notification_id):
+    raw = f"{created_at.isoformat()}|{notification_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_feed_cursor(cursor_value):
+    created_at, notification_id = base64.urlsafe_b64decode(cursor_value.encode()).decode().split('|', 1)
+    return datetime.fromisoformat(created_at), notification_id
+
+
+def get_feed(user_id, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    One page of a user's personal notifications and visible broadcasts,
+    newest first. Returns (entries, next_cursor); next_cursor is None on the
+    last page. Raises ValueError for a malformed cursor.
+    """
+    params = {'user_id': user_id, 'prefix': BROADCAST_ID_PREFIX, 'limit': limit + 1}
+    personal_after = broadcast_after = ""
+    if cursor:
+        params['after_created'], params['after_id'] = decode_feed_cursor(cursor)
+        # The plain created_at bound lets each branch range-scan its index;
+        # the row comparison breaks ties on the id
+        personal_after = """
+            AND n.created_at <= %(after_created)s
+            AND (n.created_at, n.id::text) < (%(after_created)s, %(after_id)s)"""
+        broadcast_after = """
+            AND b.created_at <= %(after_created)s
+            AND (b.created_at, %(prefix)s || b.id) < (%(after_created)s, %(after_id)s)"""
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(f"""
+            SELECT id, title, message, type, is_read, created_at FROM (
+                (SELECT n.id::text AS id, n.title, n.message, n.type, n.is_read, n.created_at
+                 FROM public.notifications n
+                 WHERE n.user_id = %(user_id)s {personal_after}
+                 ORDER BY n.created_at DESC, n.id::text DESC
+                 LIMIT %(limit)s)
+                UNION ALL
+                (SELECT %(prefix)s || b.id, b.title, b.message, b.type, COALESCE(r.is_read, false), b.created_at
+                 {VISIBLE_BROADCASTS} {broadcast_after}
+                 ORDER BY b.created_at DESC, %(prefix)s || b.id DESC
+                 LIMIT %(limit)s)
+            ) feed
+            ORDER BY created_at DESC, id DESC
+            LIMIT %(limit)s
+        """, params)
+        entries = [dict(zip(FEED_COLUMNS, row)) for row in db_cursor.fetchall()]
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_feed_cursor(entries[-1]['created_at'], entries[-1]['id'])
+    return entries, next_cursor
+
+
+def unread_count(user_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT
+                (SELECT COUNT(*) FROM public.notifications
+                 WHERE user_id = %(user_id)s AND is_read = false)
+              + (SELECT COUNT(*) {VISIBLE_BROADCASTS} AND NOT COALESCE(r.is_read, false))
+        """, {'user_id': user_id})
+        return cursor.fetchone()[0]
+
+
+def mark_read(notification_id, user_id=None):
+    """
+    Mark one feed entry as read. Broadcast entries need the user whose
+    receipt to write. Returns False when nothing matched.
+    """
+    notification_id = str(notification_id)
+    with connection.cursor() as cursor:
+        if notification_id.startswith(BROADCAST_ID_PREFIX):
+            broadcast_id = notification_id[len(BROADCAST_ID_PREFIX):]
+            if not user_id or not broadcast_id.isdigit():
+                return False
+            cursor.execute(f"""
+                INSERT INTO public.broadcast_receipts (broadcast_id, user_id, is_read)
+                SELECT b.id, u.id, true
+                {VISIBLE_BROADCASTS}
+                  AND b.id = %(broadcast_id)s
+                ON CONFLICT (broadcast_id, user_id) DO UPDATE SET is_read = true, updated_at = NOW()
+            """, {'user_id': user_id, 'broadcast_id': int(broadcast_id)})
+        else:
+            if not notification_id.isdigit():
+                return False
+            cursor.execute("UPDATE public.notifications SET is_read = true WHERE id = %s", [int(notification_id)])
+        return cursor.rowcount > 0
+
+
+def mark_all_read(user_id):
+    """Mark the user's unread notifications and broadcasts as read in one statement."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH personal AS (
+                UPDATE public.notifications SET is_read = true
+                WHERE user_id = %(user_id)s AND is_read = false
+            )
+            INSERT INTO public.broadcast_receipts (broadcast_id, user_id, is_read)
+            SELECT b.id, u.id, true
+            {VISIBLE_BROADCASTS}
+              AND NOT COALESCE(r.is_read, false)
+            ON CONFLICT (broadcast_id, user_id) DO UPDATE SET is_read = true, updated_at = NOW()
+        """, {'user_id': user_id})
+
+
+def clear_feed(user_id):
+    """Delete the user's personal notifications and hide their broadcasts. Returns how many entries went away."""
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM public.notifications WHERE user_id = %s", [user_id])
+        cleared = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO public.broadcast_receipts (broadcast_id, user_id, is_cleared)
+            SELECT b.id, u.id, true
+            {VISIBLE_BROADCASTS}
+            ON CONFLICT (broadcast_id, user_id) DO UPDATE SET is_cleared = true, updated_at = NOW()
+        """, {'user_id': user_id})
+        return cleared + cursor.rowcount
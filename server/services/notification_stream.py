@@ -0,0 +1,101 @@
+"""
+Server-Sent Events stream of new notifications, served straight from the ASGI
+entry point (config/asgi.py) so an open stream never ties up a Django worker
+thread.
+
+    GET /api/notifications/stream/<user_id>/
+
+Each event is `event: notification` with the same JSON shape as the
+notification list (plus `event: activity` log entries for admins). Clients
+load the list once and then prepend what arrives here instead of polling.
+A comment line is sent every STREAM_KEEPALIVE seconds so proxies keep the
+connection open. Unknown or deleted users get 404.
+"""
+
+import asyncio
+import json
+import re
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from models.models import User, UserRole
+from services.event_broker import event_broker
+
+STREAM_PATH = re.compile(r'^/api/notifications/stream/(?P<user_id>[0-9a-fA-F-]{36})/?$')
+STREAM_KEEPALIVE = 15
+
+
+def match_stream_path(path):
+    match = STREAM_PATH.match(path)
+    return match.group('user_id') if match else None
+
+
+@sync_to_async
+def stream_channels(user_id):
+    """The channels user_id may listen on, or None if there is no such user."""
+    close_old_connections()
+    try:
+        if not User.objects.filter(id=user_id, is_deleted=False).exists():
+            return None
+        # A user can hold several roles; any admin role opens the admin channels
+        is_admin = UserRole.objects.filter(user_id=user_id, role__name='admin').exists()
+    finally:
+        close_old_connections()
+    channels = [f'user:{user_id}', 'broadcast:all']
+    if is_admin:
+        channels += ['broadcast:admin', 'activity']
+    return channels
+
+
+def format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"event: {event['event']}\ndata: {data}\n\n".encode()
+
+
+async def notification_stream(scope, receive, send, user_id):
+    if scope['method'] != 'GET':
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    channels = await stream_channels(user_id)
+    if channels is None:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Unknown user\n'})
+        return
+
+    subscription = event_broker.subscribe(channels)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+        while not disconnected.is_set():
+            event = await subscription.get(timeout=STREAM_KEEPALIVE)
+            if disconnected.is_set():
+                break
+            body = format_event(event) if event else b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        # Client went away mid-write
+        pass
+    finally:
+        subscription.close()
+        watcher.cancel()
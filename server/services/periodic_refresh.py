@@ -0,0 +1,55 @@
+"""
+Out-of-band refreshes for data the dashboards read (the analytics cube, the
+scatter reservoirs, ...).
+
+A PeriodicRefresh runs its refresh function on a daemon thread every
+`interval` seconds, so requests only ever read what the last run produced.
+Like services.health_poller, the thread starts on the first start() call
+(made by the views that read the data), not on import, so management
+commands do not spawn it. Each refresh is expected to be safe to run from
+several workers at once (advisory locks, max_age checks); the matching
+management commands do the same work from cron or a deploy hook.
+"""
+
+import threading
+from django.db import connection
+
+
+class PeriodicRefresh:
+    def __init__(self, name, refresh, interval, delay_first=False):
+        """delay_first: wait one interval before the first run instead of running right away."""
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.delay_first = delay_first
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run_once(self):
+        try:
+            return self.refresh()
+        except Exception as e:
+            print(f"Error in {self.name}: {e}")
+        finally:
+            # Not covered by Django's request cycle; don't hold a connection
+            # between runs
+            connection.close()
+
+    def _run(self):
+        if self.delay_first:
+            self._stopped.wait(self.interval)
+        while not self._stopped.is_set():
+            self.run_once()
+            self._stopped.wait(self.interval)
@@ -0,0 +1,221 @@
+"""
+Stratified reservoir sample for the aspect-ratio/roundness scatter.
+
+Beans are stratified by the analytics cube keys: farm, uploader role
+(UPLOADER_ROLE_SQL) and upload year and month. Each stratum keeps at most
+SCATTER_SAMPLE_PER_STRATUM beans in scatter_stratum_samples (see
+models/sql/001_scatter_samples.sql), so the dashboard filters pick whole
+reservoirs and the scatter agrees with the counters next to it. A bean's
+role is taken when it is offered; later role changes don't move it.
+New extracted_features rows are offered to their stratum's reservoir in id
+order past a watermark, so a refresh only costs the rows added since the
+last one. Ids are assigned before their
+transaction commits, so a bean can become visible after a higher id was
+already read; every refresh therefore re-scans the last SCATTER_RESCAN_WINDOW
+ids below the watermark and skips the ones recorded in
+scatter_sample_offered (models/sql/011_scatter_sample_offered.sql).
+
+Slots are kept in random order (inside-out shuffle while filling, Algorithm R
+once full), which means any prefix of slots is itself a uniform sample and
+reads can take `slot < quota`.
+
+The dashboard only reads the reservoirs; scatter_refresher feeds them from a
+background thread every SCATTER_REFRESH_INTERVAL seconds, as does
+`python manage.py refresh_scatter_sample`.
+"""
+
+import random
+from django.conf import settings
+from django.db import connection, transaction
+from services.analytics_cube import UPLOADER_ROLE_SQL
+from services.periodic_refresh import PeriodicRefresh
+
+SCATTER_SAMPLE_PER_STRATUM = 1000   # reservoir capacity per stratum
+SCATTER_SAMPLE_SIZE = 3000       # points returned across all farms
+SCATTER_REFRESH_BATCH = 5000     # new beans consumed per refresh call
+SCATTER_RESCAN_WINDOW = 10000    # ids below the watermark checked again for late commits
+SCATTER_REFRESH_INTERVAL = getattr(settings, 'SCATTER_REFRESH_INTERVAL', 60)
+
+# Arbitrary key so only one worker refreshes the reservoirs at a time
+_ADVISORY_LOCK_KEY = 2700270027
+
+
+def _ratio_and_roundness(major, minor, perimeter, area):
+    # Same formulas the dashboard used when it returned every bean
+    aspect_ratio = float(major) / float(minor) if minor else 0
+    roundness = (4 * 3.1416 * float(area)) / (float(perimeter) ** 2) if perimeter else 0
+    return aspect_ratio, roundness
+
+
+def refresh_scatter_sample(batch_size=SCATTER_REFRESH_BATCH, capacity=SCATTER_SAMPLE_PER_STRATUM, rng=random):
+    """
+    Offer up to batch_size beans added since the last refresh (or committed
+    late inside the re-scan window) to their stratum's reservoir. Returns the
+    number of beans consumed (0 when another worker holds the refresh lock or
+    there is nothing new).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [_ADVISORY_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            return 0
+
+        cursor.execute("SELECT last_feature_id FROM scatter_sample_meta WHERE id = 1")
+        row = cursor.fetchone()
+        last_feature_id = row[0] if row else 0
+
+        cursor.execute(f"""
+            SELECT ef.id, images.location_id, {UPLOADER_ROLE_SQL},
+                   EXTRACT(YEAR FROM images.upload_date)::int,
+                   EXTRACT(MONTH FROM images.upload_date)::int,
+                   ef.major_axis_length, ef.minor_axis_length, ef.perimeter, ef.area
+            FROM extracted_features ef
+            JOIN predictions p ON ef.prediction_id = p.id
+            JOIN images ON p.image_id = images.id
+            WHERE ef.id > %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM scatter_sample_offered o WHERE o.extracted_feature_id = ef.id
+              )
+            ORDER BY ef.id
+            LIMIT %s
+        """, [max(0, last_feature_id - SCATTER_RESCAN_WINDOW), batch_size])
+        new_beans = cursor.fetchall()
+        if not new_beans:
+            return 0
+
+        # Beans without a farm or with missing measurements are skipped
+        sampled = [
+            row for row in new_beans
+            if row[1] is not None and None not in row[5:]
+        ]
+        stratum_keys = list({tuple(row[1:5]) for row in sampled})
+        stratum_ids = {}
+        seen = {}
+        slots = {}
+        if stratum_keys:
+            cursor.executemany("""
+                INSERT INTO scatter_strata (location_id, role, year, month)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT DO NOTHING
+            """, stratum_keys)
+            cursor.execute("""
+                SELECT id, location_id, role, year, month, seen
+                FROM scatter_strata
+                WHERE location_id = ANY(%s)
+            """, [list({key[0] for key in stratum_keys})])
+            wanted = set(stratum_keys)
+            for stratum_id, location_id, role, year, month, stratum_seen in cursor.fetchall():
+                key = (location_id, role, year, month)
+                if key in wanted:
+                    stratum_ids[key] = stratum_id
+                    seen[stratum_id] = stratum_seen
+                    slots[stratum_id] = {}
+            cursor.execute("""
+                SELECT stratum_id, slot, extracted_feature_id, aspect_ratio, roundness
+                FROM scatter_stratum_samples
+                WHERE stratum_id = ANY(%s)
+            """, [list(slots)])
+            for stratum_id, slot, feature_id, aspect_ratio, roundness in cursor.fetchall():
+                slots[stratum_id][slot] = (feature_id, aspect_ratio, roundness)
+
+        dirty = set()
+        for feature_id, location_id, role, year, month, major, minor, perimeter, area in sampled:
+            stratum_id = stratum_ids[(location_id, role, year, month)]
+            point = (feature_id, *_ratio_and_roundness(major, minor, perimeter, area))
+            seen[stratum_id] += 1
+            n = seen[stratum_id]
+            reservoir = slots[stratum_id]
+            if n <= capacity:
+                # Inside-out shuffle: new bean takes a random slot, the
+                # previous occupant of that slot moves to the end
+                j = rng.randrange(n)
+                if j != n - 1:
+                    reservoir[n - 1] = reservoir[j]
+                    dirty.add((stratum_id, n - 1))
+                reservoir[j] = point
+                dirty.add((stratum_id, j))
+            else:
+                j = rng.randrange(n)
+                if j < capacity:
+                    reservoir[j] = point
+                    dirty.add((stratum_id, j))
+
+        if dirty:
+            cursor.executemany("""
+                INSERT INTO scatter_stratum_samples (stratum_id, slot, extracted_feature_id, aspect_ratio, roundness)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (stratum_id, slot) DO UPDATE SET
+                    extracted_feature_id = EXCLUDED.extracted_feature_id,
+                    aspect_ratio = EXCLUDED.aspect_ratio,
+                    roundness = EXCLUDED.roundness
+            """, [(stratum_id, slot, *slots[stratum_id][slot]) for stratum_id, slot in dirty])
+        if seen:
+            cursor.executemany(
+                "UPDATE scatter_strata SET seen = %s WHERE id = %s",
+                [(stratum_seen, stratum_id) for stratum_id, stratum_seen in seen.items()]
+            )
+        last_feature_id = max(last_feature_id, new_beans[-1][0])
+        cursor.execute("""
+            INSERT INTO scatter_sample_offered (extracted_feature_id)
+            SELECT UNNEST(%s::bigint[])
+            ON CONFLICT DO NOTHING
+        """, [[row[0] for row in new_beans]])
+        cursor.execute(
+            "DELETE FROM scatter_sample_offered WHERE extracted_feature_id <= %s",
+            [last_feature_id - SCATTER_RESCAN_WINDOW]
+        )
+        cursor.execute(
+            "UPDATE scatter_sample_meta SET last_feature_id = %s, updated_at = NOW() WHERE id = 1",
+            [last_feature_id]
+        )
+        return len(new_beans)
+
+
+def catch_up_scatter_sample(batch_size=SCATTER_REFRESH_BATCH):
+    """refresh_scatter_sample until nothing new is left; returns the beans consumed."""
+    total = 0
+    while True:
+        consumed = refresh_scatter_sample(batch_size=batch_size)
+        if consumed == 0:
+            return total
+        total += consumed
+
+
+scatter_refresher = PeriodicRefresh('scatter-sample-refresh', catch_up_scatter_sample, SCATTER_REFRESH_INTERVAL)
+
+
+def get_scatter_sample(total_points=SCATTER_SAMPLE_SIZE, location_id=None, role=None, year=None, month=None):
+    """
+    Return at most ~total_points {aspect_ratio, roundness} points from the
+    strata matching the dashboard filters (same meaning as dashboard_filters).
+    Points are split evenly across the matching farms, and within a farm in
+    proportion to each stratum's bean count, so each farm's points are a
+    uniform sample of its matching beans. The read only touches the
+    reservoirs, so it does not grow with the number of beans.
+    """
+    conditions = []
+    params = []
+    for column, value in (('location_id', location_id), ('role', role), ('year', year), ('month', month)):
+        if value:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH matching AS (
+                SELECT id, location_id, seen FROM scatter_strata {where_clause}
+            ),
+            quotas AS (
+                SELECT id,
+                       CEIL(%s::float / (SELECT COUNT(DISTINCT location_id) FROM matching)
+                            * seen / NULLIF(SUM(seen) OVER (PARTITION BY location_id), 0)) AS quota
+                FROM matching
+            )
+            SELECT s.aspect_ratio, s.roundness
+            FROM scatter_stratum_samples s
+            JOIN quotas q ON q.id = s.stratum_id
+            WHERE s.slot < q.quota
+        """, params + [total_points])
+        return [
+            {"aspect_ratio": aspect_ratio, "roundness": roundness}
+            for aspect_ratio, roundness in cursor.fetchall()
+        ]